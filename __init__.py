@@ -6,12 +6,26 @@ from src import Posn
 from src import rad, frac, sep_rad, frac_to_float, rad_to_float
 from src import even, odd, is_truthy, close_enough, can_be_int
 from src import Fraction, gcd, lcm, divide, frac_abs
-from src import identity, add_n, sub_n, mult_n, div_n, n_div, n_sub, floordiv_n, n_floordiv, exp_n, n_exp
+from src import identity, variable, add_n, sub_n, mult_n, div_n, n_div, n_sub, floordiv_n, n_floordiv, exp_n, n_exp
 from src import sine, cosine, tangent, arccosine, arcsine, arctangent, const, identity, f_raised_to_g
 from src import chain, f_plus_g, f_minus_g, f_times_g, f_divided_by_g, mx_plus_b, log_base_n, log_of_n
 from src import lt_n, le_n, gt_n, ge_n, get_n, set_n_to_val, invert
-from src import parse_expr, shunting_yard, find_tokens, disp_operator
+from src import parse_expr, shunting_yard, find_tokens, tokenize, Lexeme, token_tree, disp_operator
 from src import Num, Var, Plus, Minus, Times, Divide, Exponent
 from src import Log, Sin, Cos, Tan, ArcSin, ArcCos, ArcTan
 from src import derivative
-from src import rolling_average
\ No newline at end of file
+from src import Program, to_program, run_program
+from src import LRUCache, CacheInfo, clear_derivative_cache, set_derivative_cache_size, derivative_cache_info
+from src import clear_expression_cache, set_expression_cache_size, expression_cache_info
+from src import DagPlan, plan_dag
+from src import simplify
+from src import TreeMetrics, tree_metrics, count_rules
+from src import admath, Tape, RevValue, grad, jacobian, hessian_vector_product
+from src import Dual, tangent_of
+from src import rolling_average
+from src import BatchResult, parse_many, derivative_many
+from src import tree_to_bytes, tree_from_bytes
+from src import deferred_reduction
+from src import FractionArray
+from src import frac_sum, frac_dot, frac_mean
+from src import continued_fraction, convergents
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""Compares plain recursive evaluation with DAG evaluation on derivative trees.
+
+Run from the repository root with python -m benchmarks.bench_dag
+"""
+from timeit import timeit
+from src import parse_expr, TwoFunctionsBase
+
+_EXPRS = ['(x^2 + 1) / (sin(x) + 2)', 'x ^ ln(x)', '(x / 2) / x^2', 'sin(x) / cos(x)']
+_ORDERS = [1, 2, 3]
+_CALLS = 2000
+
+def _tree_size(op) -> int:
+    """Counts the nodes of op as a tree, i.e. counting shared subtrees every time they appear."""
+    total = 0
+    stack = [op]
+    while stack:
+        node = stack.pop()
+        total += 1
+        if isinstance(node, TwoFunctionsBase):
+            stack.append(node.first)
+            stack.append(node.second)
+    return total
+
+def main() -> None:
+    print(f'{"expression":<28}{"order":>6}{"nodes":>8}{"steps":>8}{"tree (us)":>12}{"dag (us)":>12}{"speedup":>9}')
+    for expr in _EXPRS:
+        func = parse_expr(expr)
+        for order in _ORDERS:
+            deriv = func.nth_derivative(order)
+            deriv.evaluate_dag(1.3)
+            tree = timeit(lambda: deriv(1.3), number = _CALLS) / _CALLS * 1e6
+            dag = timeit(lambda: deriv.evaluate_dag(1.3), number = _CALLS) / _CALLS * 1e6
+            print(f'{expr:<28}{order:>6}{_tree_size(deriv):>8}{len(deriv._dag_plan):>8}'
+                  f'{tree:>12.1f}{dag:>12.1f}{tree / dag:>8.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Compares src.fractions.Fraction with the standard library's fractions.Fraction.
+
+Each case runs the same arithmetic on both, and on src.fractions.Fraction
+inside deferred_reduction, and checks that all three give the same value.
+
+Run from the repository root with python -m benchmarks.bench_fractions
+"""
+import fractions
+import random
+from timeit import timeit
+from src.fractions import Fraction, deferred_reduction
+
+_REPEATS = 5
+_RNG = random.Random(0)
+_SMALL_DENS = [(_RNG.randint(-100, 100), _RNG.choice([2, 3, 4, 6, 8, 12])) for _ in range(20000)]
+_PAIRS = [(_RNG.randint(1, 50), _RNG.randint(2, 50), _RNG.randint(1, 50), _RNG.randint(2, 50)) for _ in range(20000)]
+
+def _harmonic(frac, n: int = 1000):
+    """1 + 1/2 + ... + 1/n, whose denominators are all different."""
+    total = 0
+    for k in range(1, n + 1):
+        total = total + frac(1, k)
+    return total
+
+def _repeated_denominators(frac):
+    """A sum of fractions whose denominators are all from a small set."""
+    total = 0
+    for num, den in _SMALL_DENS:
+        total = total + frac(num, den)
+    return total
+
+def _products(frac):
+    """The sum of the products of pairs of small random fractions."""
+    total = 0
+    for a, b, c, d in _PAIRS:
+        total = total + frac(a, b) * frac(c, d)
+    return total
+
+def _horner(frac, n: int = 300):
+    """A polynomial with fraction coefficients evaluated at a fraction with Horner's method."""
+    x = frac(3, 7)
+    res = 0
+    for k in range(1, n + 1):
+        res = res * x + frac(k, k + 1)
+    return res
+
+_CASES = [_harmonic, _repeated_denominators, _products, _horner]
+
+def _deferred(case):
+    """Runs case on Fraction with deferred_reduction."""
+    with deferred_reduction():
+        res = case(Fraction)
+    return res.reduced() if isinstance(res, Fraction) else res
+
+def _same(res, expected) -> bool:
+    """Returns whether res, from src.fractions, equals the stdlib result expected."""
+    if isinstance(res, Fraction):
+        return fractions.Fraction(res._num, res._den) == expected
+    return res == expected
+
+def main() -> None:
+    print(f'{"case":<24}{"stdlib (ms)":>13}{"Fraction (ms)":>15}{"deferred (ms)":>15}{"speedup":>9}{"deferred":>10}')
+    for case in _CASES:
+        expected = case(fractions.Fraction)
+        assert _same(case(Fraction), expected) and _same(_deferred(case), expected), case.__name__
+        std = timeit(lambda: case(fractions.Fraction), number = _REPEATS) / _REPEATS * 1e3
+        ours = timeit(lambda: case(Fraction), number = _REPEATS) / _REPEATS * 1e3
+        deferred = timeit(lambda: _deferred(case), number = _REPEATS) / _REPEATS * 1e3
+        print(f'{case.__name__.lstrip("_"):<24}{std:>13.2f}{ours:>15.2f}{deferred:>15.2f}'
+              f'{std / ours:>8.1f}x{std / deferred:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""Times tokenizing and ordering expressions of growing length.
+
+Run from the repository root with python -m benchmarks.bench_lexer
+"""
+from timeit import timeit
+from src import find_tokens, shunting_yard, tokenize
+
+_TERM = '3.5x^2 * sin(2x) - log2(x + 1)'
+_LENGTHS = [1, 10, 100]
+_CALLS = 200
+
+def main() -> None:
+    print(f'{"terms":>6}{"chars":>8}{"tokens":>8}{"tokenize (us)":>15}{"find_tokens (us)":>18}{"shunting (us)":>15}')
+    for length in _LENGTHS:
+        expr = ' + '.join([_TERM] * length)
+        tokens = timeit(lambda: tokenize(expr), number = _CALLS) / _CALLS * 1e6
+        found = timeit(lambda: find_tokens(expr), number = _CALLS) / _CALLS * 1e6
+        postfix = timeit(lambda: shunting_yard(expr), number = _CALLS) / _CALLS * 1e6
+        print(f'{length:>6}{len(expr):>8}{len(tokenize(expr)):>8}{tokens:>15.1f}{found:>18.1f}{postfix:>15.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Measures how much memory the nodes of large derivative trees take.
+
+The derivatives are encoded with to_bytes, dropped, and then decoded again
+under tracemalloc, so the measurement only covers the nodes themselves (and
+their entries in the interning table), not the caches filled while
+differentiating. The shallow column is sys.getsizeof of each node plus its
+__dict__ if it has one.
+
+Run from the repository root with python -m benchmarks.bench_memory
+"""
+import gc
+import sys
+import tracemalloc
+from src import parse_expr, ArithmeticOpBase, TwoFunctionsBase, clear_derivative_cache, clear_expression_cache
+
+_EXPRS = ['(x^2 + 1) / (sin(x) + 2)', 'x ^ ln(x)', 'sin(x) / cos(x) * 3^x', 'atan(x^2) * ln(x + 2)']
+_ORDER = 5
+
+def _distinct_nodes(op):
+    """Returns every distinct node reachable from op."""
+    seen = {}
+    stack = [op]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen[id(node)] = node
+        if isinstance(node, TwoFunctionsBase):
+            stack.append(node.first)
+            stack.append(node.second)
+    return list(seen.values())
+
+def _shallow_size(node) -> int:
+    """Returns the size of node itself, including its __dict__ but not what it refers to."""
+    size = sys.getsizeof(node)
+    attrs = getattr(node, '__dict__', None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+    return size
+
+def main() -> None:
+    print(f'{"expression":<28}{"nodes":>8}{"shallow (B/node)":>18}{"traced (B/node)":>17}')
+    for expr in _EXPRS:
+        data = parse_expr(expr).nth_derivative(_ORDER).to_bytes()
+        clear_derivative_cache()
+        clear_expression_cache()
+        gc.collect()
+
+        tracemalloc.start()
+        func = ArithmeticOpBase.from_bytes(data)
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        nodes = _distinct_nodes(func)
+        shallow = sum(map(_shallow_size, nodes)) / len(nodes)
+        print(f'{expr:<28}{len(nodes):>8}{shallow:>18.1f}{traced / len(nodes):>17.1f}')
+        del func, nodes
+        gc.collect()
+
+if __name__ == '__main__':
+    main()
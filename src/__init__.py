@@ -8,4 +8,7 @@ from .string_math import *
 from .utilities import *
 from .fractions import *
 from .operators import *
-from .stats import *
\ No newline at end of file
+from .stats import *
+from . import admath
+from .autodiff import *
+from .dual import *
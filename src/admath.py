@@ -0,0 +1,90 @@
+from __future__ import annotations
+from typing import Any, Callable, Union
+import math
+
+class ADNumber:
+    """Abstract base class for numbers that carry derivatives along with their value.
+
+    The functions in this module work on plain numbers and on ADNumbers alike, so
+    code written with them instead of the math module can be differentiated
+    automatically. Converting an ADNumber to a float would silently drop its
+    derivative, so it raises a TypeError instead, which is what happens if one is
+    passed to the math module.
+    """
+    __slots__ = ()
+
+    def _apply(self, func: Callable[[Any], Any], deriv: Callable[[Any], Any]) -> ADNumber:
+        """Returns func(self).
+
+        Args:
+        :   func (function) : a function of one argument from this module
+        :   deriv (function) : the derivative of func, also built from this module
+
+        Returns:
+        :   res (ADNumber) : func applied to this number, with its derivative
+        """
+        raise NotImplementedError
+
+    def __float__(self) -> float:
+        raise TypeError(f'Cannot convert {type(self).__name__} to float without losing its '
+                        'derivative. Use the functions in src.admath instead of math')
+
+ad_input = Union[ADNumber, int, float]
+
+def sin(x: ad_input) -> ad_input:
+    """Returns the sine of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(sin, cos)
+    return math.sin(x)
+
+def cos(x: ad_input) -> ad_input:
+    """Returns the cosine of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(cos, lambda v: -sin(v))
+    return math.cos(x)
+
+def tan(x: ad_input) -> ad_input:
+    """Returns the tangent of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(tan, lambda v: 1 + tan(v) ** 2)
+    return math.tan(x)
+
+def asin(x: ad_input) -> ad_input:
+    """Returns the arcsine of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(asin, lambda v: 1 / sqrt(1 - v * v))
+    return math.asin(x)
+
+def acos(x: ad_input) -> ad_input:
+    """Returns the arccosine of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(acos, lambda v: -1 / sqrt(1 - v * v))
+    return math.acos(x)
+
+def atan(x: ad_input) -> ad_input:
+    """Returns the arctangent of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(atan, lambda v: 1 / (1 + v * v))
+    return math.atan(x)
+
+def exp(x: ad_input) -> ad_input:
+    """Returns e to the power of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(exp, exp)
+    return math.exp(x)
+
+def sqrt(x: ad_input) -> ad_input:
+    """Returns the square root of x."""
+    if isinstance(x, ADNumber):
+        return x._apply(sqrt, lambda v: 0.5 / sqrt(v))
+    return math.sqrt(x)
+
+def log(x: ad_input, base: Union[ad_input, None] = None) -> ad_input:
+    """Returns the logarithm of x, natural unless base is given like math.log."""
+    if base is not None:
+        if isinstance(x, ADNumber) or isinstance(base, ADNumber):
+            return log(x) / log(base)
+        return math.log(x, base)
+    if isinstance(x, ADNumber):
+        return x._apply(log, lambda v: 1 / v)
+    return math.log(x)
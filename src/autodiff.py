@@ -0,0 +1,268 @@
+from __future__ import annotations
+import itertools
+from typing import Any, Callable, Iterator, List, Sequence, Tuple, Union
+from . import admath
+from .admath import ADNumber
+from .utilities import number
+
+# every tape gets a higher level than the ones made before it, so when tapes are
+# nested (e.g. for second derivatives) the inner one can tell its values apart
+_LEVELS: Iterator[int] = itertools.count()
+
+_partials = Callable[[], Tuple[Any, ...]]
+
+class Tape:
+    """Records operations on RevValues so their derivatives can be found in one backward pass.
+
+    Values are appended in the order they were computed, which is already an
+    order where every value comes after the values it was computed from.
+    """
+    __slots__ = ('nodes', 'level')
+
+    def __init__(self):
+        self.nodes: List[RevValue] = []
+        self.level: int = next(_LEVELS)
+
+    def variable(self, value: Any) -> RevValue:
+        """Returns a new input on this tape.
+
+        Args:
+        :   value (number) : the value of the input. Can itself be a value on an
+                outer tape, to take derivatives of derivatives
+
+        Returns:
+        :   var (RevValue) : the input, to pass to the function being differentiated
+        """
+        return RevValue(self, value, (), None)
+
+    def backward(self, output: RevValue) -> List[Any]:
+        """Returns the derivative of output with respect to every value on the tape.
+
+        Args:
+        :   output (RevValue) : the value to differentiate, recorded on this tape
+
+        Returns:
+        :   adjoints (list) : the derivative of output with respect to each value,
+                indexed like nodes, with None for values output doesn't depend on
+        """
+        if output.tape is not self:
+            raise ValueError('Cannot differentiate a value recorded on another tape')
+        # None rather than 0 for no contribution, since an adjoint that is a value
+        # on an outer tape can be 0 and still have a derivative of its own
+        adjoints: List[Any] = [None] * (output.index + 1)
+        adjoints[output.index] = 1
+        for i in range(output.index, -1, -1):
+            adjoint = adjoints[i]
+            node = self.nodes[i]
+            if adjoint is None or not node.parents:
+                continue
+            for parent, partial in zip(node.parents, node.partials()):
+                contrib = adjoint * partial
+                j = parent.index
+                adjoints[j] = contrib if adjoints[j] is None else adjoints[j] + contrib
+        return adjoints
+
+class RevValue (ADNumber):
+    """A number that records how it was computed, for reverse-mode differentiation.
+
+    Supports the arithmetic operators and the functions in src.admath. The local
+    partial derivatives of each operation are only computed during the backward
+    pass, by a closure stored with the value.
+
+    Args:
+        tape (Tape) : the tape to record on
+        value (number) : the value of this number
+        parents (tuple) : the values on the same tape this one was computed from
+        partials (function) : returns the derivative of this value with respect to
+            each parent, or None if there are no parents
+    """
+    __slots__ = ('tape', 'value', 'parents', 'partials', 'index')
+
+    def __init__(self, tape: Tape, value: Any, parents: Tuple[RevValue, ...], partials: Union[_partials, None]):
+        self.tape: Tape = tape
+        self.value: Any = value
+        self.parents: Tuple[RevValue, ...] = parents
+        self.partials: Union[_partials, None] = partials
+        self.index: int = len(tape.nodes)
+        tape.nodes.append(self)
+
+    def __repr__(self) -> str:
+        return f'RevValue({self.value!r})'
+
+    def _apply(self, func: Callable[[Any], Any], deriv: Callable[[Any], Any]) -> RevValue:
+        v = self.value
+        return RevValue(self.tape, func(v), (self,), lambda: (deriv(v),))
+
+    def _binop(self, other: Any, reflected: bool, func: Callable[[Any, Any], Any],
+               da: Callable[[Any, Any], Any], db: Callable[[Any, Any], Any]) -> Any:
+        """Returns func(self, other), or func(other, self) if reflected.
+
+        da and db give the partial derivatives of func(a, b) with respect to a and b.
+        """
+        if isinstance(other, RevValue) and other.tape is not self.tape:
+            if other.tape.level > self.tape.level:
+                # other is on an inner tape, where this value is just a constant
+                return other._binop(self, not reflected, func, da, db)
+            other_var = False
+        else:
+            other_var = isinstance(other, RevValue)
+        a = self.value
+        b = other.value if other_var else other
+        if other_var:
+            return RevValue(self.tape, func(a, b), (self, other), lambda: (da(a, b), db(a, b)))
+        if reflected:
+            return RevValue(self.tape, func(b, a), (self,), lambda: (db(b, a),))
+        return RevValue(self.tape, func(a, b), (self,), lambda: (da(a, b),))
+
+    def __add__(self, other: Any) -> Any:
+        return self._binop(other, False, _add, _one, _one)
+
+    def __radd__(self, other: Any) -> Any:
+        return self._binop(other, True, _add, _one, _one)
+
+    def __sub__(self, other: Any) -> Any:
+        return self._binop(other, False, _sub, _one, _minus_one)
+
+    def __rsub__(self, other: Any) -> Any:
+        return self._binop(other, True, _sub, _one, _minus_one)
+
+    def __mul__(self, other: Any) -> Any:
+        return self._binop(other, False, _mul, _second, _first)
+
+    def __rmul__(self, other: Any) -> Any:
+        return self._binop(other, True, _mul, _second, _first)
+
+    def __truediv__(self, other: Any) -> Any:
+        return self._binop(other, False, _div, _div_da, _div_db)
+
+    def __rtruediv__(self, other: Any) -> Any:
+        return self._binop(other, True, _div, _div_da, _div_db)
+
+    def __pow__(self, other: Any) -> Any:
+        return self._binop(other, False, _pow, _pow_da, _pow_db)
+
+    def __rpow__(self, other: Any) -> Any:
+        return self._binop(other, True, _pow, _pow_da, _pow_db)
+
+    def __neg__(self) -> RevValue:
+        return RevValue(self.tape, -self.value, (self,), lambda: (-1,))
+
+    def __pos__(self) -> RevValue:
+        return self
+
+    def __abs__(self) -> RevValue:
+        v = self.value
+        return RevValue(self.tape, abs(v), (self,), lambda: (1 if v >= 0 else -1,))
+
+    def __eq__(self, other: Any) -> bool:
+        return self.value == _value(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return self.value != _value(other)
+
+    def __lt__(self, other: Any) -> bool:
+        return self.value < _value(other)
+
+    def __le__(self, other: Any) -> bool:
+        return self.value <= _value(other)
+
+    def __gt__(self, other: Any) -> bool:
+        return self.value > _value(other)
+
+    def __ge__(self, other: Any) -> bool:
+        return self.value >= _value(other)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+def _value(x: Any) -> Any:
+    """Returns the value of x if it is a RevValue, otherwise x."""
+    return x.value if isinstance(x, RevValue) else x
+
+_add = lambda a, b: a + b
+_sub = lambda a, b: a - b
+_mul = lambda a, b: a * b
+_div = lambda a, b: a / b
+_pow = lambda a, b: a ** b
+_one = lambda a, b: 1
+_minus_one = lambda a, b: -1
+_first = lambda a, b: a
+_second = lambda a, b: b
+_div_da = lambda a, b: 1 / b
+_div_db = lambda a, b: -a / (b * b)
+_pow_da = lambda a, b: b * a ** (b - 1)
+
+def _pow_db(a: Any, b: Any) -> Any:
+    """The partial derivative of a^b with respect to b, which is nan where log(a) isn't defined."""
+    if a > 0:
+        return a ** b * admath.log(a)
+    return float('nan')
+
+def grad(func: Callable[[Any], Any], xs: Union[number, Sequence[number]]) -> Union[Any, List[Any]]:
+    """Returns the gradient of func at xs, using one forward and one backward pass.
+
+    func is called once with RevValues in place of the numbers, so it can be any
+    Python function built from arithmetic operators and the functions in
+    src.admath, like the ones part_derivative takes. Its cost doesn't depend on
+    the number of inputs, unlike calling part_derivative for every input.
+
+    Args:
+    :   func (function) : takes a list of numbers (or a single number) and returns a number
+    :   xs (number | list) : the point to find the gradient at
+
+    Returns:
+    :   gradient (number | list) : the partial derivative with respect to each
+            number in xs, or the derivative if xs is a single number
+    """
+    if not hasattr(xs, '__len__'):
+        return grad(lambda arr: func(arr[0]), [xs])[0]
+    tape = Tape()
+    inputs = [tape.variable(x) for x in xs]
+    return _gradient(tape, func(inputs), inputs)
+
+def jacobian(func: Callable[[List[Any]], Sequence[Any]], xs: Sequence[number]) -> List[List[Any]]:
+    """Returns the Jacobian of func at xs.
+
+    func is called once, then there is one backward pass per output.
+
+    Args:
+    :   func (function) : takes a list of numbers and returns a list of numbers
+    :   xs (list) : the point to find the Jacobian at
+
+    Returns:
+    :   jac (list of lists) : jac[i][j] is the derivative of output i with respect to xs[j]
+    """
+    tape = Tape()
+    inputs = [tape.variable(x) for x in xs]
+    return [_gradient(tape, out, inputs) for out in func(inputs)]
+
+def hessian_vector_product(func: Callable[[List[Any]], Any], xs: Sequence[number], v: Sequence[number]) -> List[Any]:
+    """Returns H v, where H is the Hessian of func at xs, without building H.
+
+    The gradient is taken on a tape whose inputs are themselves recorded on an
+    outer tape, and the dot product of the gradient with v is then differentiated
+    on the outer tape. This costs a small multiple of one gradient.
+
+    Args:
+    :   func (function) : takes a list of numbers and returns a number
+    :   xs (list) : the point to find the Hessian at
+    :   v (list) : the vector to multiply by, as long as xs
+
+    Returns:
+    :   hv (list) : the product of the Hessian and v
+    """
+    if len(v) != len(xs):
+        raise ValueError(f'v has {len(v)} entries, but there are {len(xs)} inputs')
+    outer = Tape()
+    inputs = [outer.variable(x) for x in xs]
+    dot = sum(g * vi for g, vi in zip(grad(func, inputs), v))
+    return _gradient(outer, dot, inputs)
+
+def _gradient(tape: Tape, output: Any, inputs: List[RevValue]) -> List[Any]:
+    """Returns the derivative of output with respect to each input on tape."""
+    if not isinstance(output, RevValue) or output.tape is not tape:
+        # output doesn't depend on the inputs at all
+        return [0] * len(inputs)
+    adjoints = tape.backward(output)
+    return [0 if var.index >= len(adjoints) or adjoints[var.index] is None else adjoints[var.index]
+            for var in inputs]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+from typing import Any, Callable, List, Sequence
+import numpy as np
+from . import admath
+from .admath import ADNumber
+from .utilities import number
+
+class Dual (ADNumber):
+    """A number along with its derivative, for forward-mode differentiation.
+
+    Passing Dual(x) to a function built from arithmetic operators, the functions
+    in src.admath, or the operators in src.operators returns a Dual holding f(x)
+    and f'(x), exactly and in a single call. The tangent can also be a vector, in
+    which case it tracks the derivatives with respect to several inputs at once
+    (see Dual.inputs).
+
+    Args:
+        value (number) : the value of the number
+        tangent (number | array-like) : the derivative of the value. Defaults to 1,
+            which makes this the input being differentiated with respect to
+    """
+    __slots__ = ('value', 'tangent')
+
+    def __init__(self, value: Any, tangent: Any = 1):
+        if isinstance(tangent, (list, tuple)):
+            tangent = np.asarray(tangent, dtype = float)
+        self.value: Any = value
+        self.tangent: Any = tangent
+
+    @staticmethod
+    def inputs(xs: Sequence[number]) -> List[Dual]:
+        """Returns a Dual for each number in xs, with one-hot vector tangents.
+
+        Passing these to a function of several inputs gives an output whose
+        tangent is the whole gradient.
+
+        Args:
+        :   xs (list) : the values of the inputs
+
+        Returns:
+        :   duals (list) : the inputs as Duals
+        """
+        eye = np.eye(len(xs))
+        return [Dual(x, eye[i]) for i, x in enumerate(xs)]
+
+    def __repr__(self) -> str:
+        return f'Dual({self.value!r}, {self.tangent!r})'
+
+    def _apply(self, func: Callable[[Any], Any], deriv: Callable[[Any], Any]) -> Dual:
+        return Dual(func(self.value), deriv(self.value) * self.tangent)
+
+    def __add__(self, other: Any) -> Dual:
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.tangent + other.tangent)
+        return Dual(self.value + other, self.tangent)
+
+    def __radd__(self, other: Any) -> Dual:
+        return Dual(other + self.value, self.tangent)
+
+    def __sub__(self, other: Any) -> Dual:
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.tangent - other.tangent)
+        return Dual(self.value - other, self.tangent)
+
+    def __rsub__(self, other: Any) -> Dual:
+        return Dual(other - self.value, -self.tangent)
+
+    def __mul__(self, other: Any) -> Dual:
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value, self.tangent * other.value + self.value * other.tangent)
+        return Dual(self.value * other, self.tangent * other)
+
+    def __rmul__(self, other: Any) -> Dual:
+        return Dual(other * self.value, other * self.tangent)
+
+    def __truediv__(self, other: Any) -> Dual:
+        if isinstance(other, Dual):
+            value = self.value / other.value
+            return Dual(value, (self.tangent - value * other.tangent) / other.value)
+        return Dual(self.value / other, self.tangent / other)
+
+    def __rtruediv__(self, other: Any) -> Dual:
+        value = other / self.value
+        return Dual(value, -value / self.value * self.tangent)
+
+    def __floordiv__(self, other: Any) -> Dual:
+        # floor is flat wherever it is differentiable
+        return Dual(self.value // _value(other), 0 * self.tangent)
+
+    def __rfloordiv__(self, other: Any) -> Dual:
+        return Dual(other // self.value, 0 * self.tangent)
+
+    def __pow__(self, other: Any) -> Dual:
+        if isinstance(other, Dual):
+            value = self.value ** other.value
+            return Dual(value, other.value * self.value ** (other.value - 1) * self.tangent +
+                               _exponent_term(value, self.value, other.tangent))
+        if other == 0:
+            # x^0 is 1 everywhere, even where x^-1 isn't defined
+            return Dual(self.value ** other, 0 * self.tangent)
+        return Dual(self.value ** other, other * self.value ** (other - 1) * self.tangent)
+
+    def __rpow__(self, other: Any) -> Dual:
+        value = other ** self.value
+        return Dual(value, _exponent_term(value, other, self.tangent))
+
+    def __neg__(self) -> Dual:
+        return Dual(-self.value, -self.tangent)
+
+    def __pos__(self) -> Dual:
+        return self
+
+    def __abs__(self) -> Dual:
+        return self if self.value >= 0 else -self
+
+    def __eq__(self, other: Any) -> bool:
+        return self.value == _value(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return self.value != _value(other)
+
+    def __lt__(self, other: Any) -> bool:
+        return self.value < _value(other)
+
+    def __le__(self, other: Any) -> bool:
+        return self.value <= _value(other)
+
+    def __gt__(self, other: Any) -> bool:
+        return self.value > _value(other)
+
+    def __ge__(self, other: Any) -> bool:
+        return self.value >= _value(other)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+def _value(x: Any) -> Any:
+    """Returns the value of x if it is a Dual, otherwise x."""
+    return x.value if isinstance(x, Dual) else x
+
+def _exponent_term(value: Any, base: Any, tangent: Any) -> Any:
+    """Returns value * log(base) * tangent, the part of the derivative of base^e that comes from e.
+
+    log(base) isn't defined for base <= 0, so that part is nan there, like in
+    reverse mode, except for the entries of tangent that are 0.
+    """
+    if base > 0:
+        return value * admath.log(base) * tangent
+    if isinstance(tangent, np.ndarray):
+        return np.where(tangent == 0, 0.0, np.nan)
+    return 0 * tangent if tangent == 0 else float('nan')
+
+def tangent_of(y: Any) -> Any:
+    """Returns the derivative carried by y, which is 0 if y is a plain number.
+
+    Args:
+    :   y (Dual | number) : the output of a function called on Duals
+
+    Returns:
+    :   tangent (number | np.ndarray) : the derivative of y
+    """
+    return y.tangent if isinstance(y, Dual) else 0
@@ -1,29 +1,108 @@
 from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from math import gcd as _gcd, inf, isfinite
+import sys
+from numbers import Rational
 import numpy as np
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Tuple, Union
+from itertools import zip_longest
+import operator
 if TYPE_CHECKING:
     from .utilities import number
 
+_HASH_MODULUS: int = sys.hash_info.modulus
+_HASH_INF: int = sys.hash_info.inf
+
+# how many deferred_reduction blocks are open in the current thread (or asyncio
+# task); arithmetic doesn't reduce its results while it's nonzero
+_DEFERRED: ContextVar[int] = ContextVar('_DEFERRED', default = 0)
+
 class Fraction:
     """An alternative way of storing (rational) floating-point numbers.
     
-    Stores them as a numerator-denominator pair. If num divides den, the
-    constructor will return the integer quotient.
+    Stores them as a numerator-denominator pair in lowest terms, with a positive
+    denominator. If den divides num, the constructor will return the integer quotient.
+
+    Arithmetic between fractions keeps its intermediates small by cancelling
+    common factors before multiplying, so it only ever takes the gcd of small
+    numbers. Inside deferred_reduction it skips reducing altogether.
+
+    Fractions are immutable and hashable, with the same hash as an equal int,
+    float or fractions.Fraction, so they can be used as keys of dicts and sets
+    and mixed with those freely.
 
     Args:
         num (int) : the numerator
 
         den (int) : the denominator
     """
-    def __init__(self, num: int, den: int):
-        self._num: int = num
-        self._den: int = den
-        self._reduce()
+    __slots__ = ('_num', '_den', '_reduced')
+
+    def __new__(cls, num: int, den: int):
+        if den == 0:
+            raise ZeroDivisionError(f'Fraction with a denominator of 0: {num} / 0')
+        g = _gcd(num, den)
+        if den < 0:
+            g = -g
+        return _make(num // g, den // g)
+
+    @staticmethod
+    def from_float(x: float, max_den: Union[int, None] = None) -> number:
+        """Returns the fraction closest to x whose denominator is at most max_den.
+
+        Useful for snapping float results (e.g. of analytical_limit or get_root)
+        to small exact fractions, which are much cheaper to compute with than
+        the exact value of the float, whose denominator is usually around 2^52.
+
+        Args:
+        :   x (float) : the number to convert
+        :   max_den (int) : the largest denominator allowed. If None (the
+                default), returns the exact value of x
+
+        Returns:
+        :   frac (Fraction | int) : the fraction, which is an int if it is whole
+        """
+        num, den = _as_ratio(x)
+        if max_den is None:
+            return Fraction(num, den)
+        return _limit_denominator(num, den, max_den)
+
+    def limit_denominator(self, max_den: int = 1000000) -> number:
+        """Returns the fraction closest to this one whose denominator is at most max_den.
+
+        Args:
+        :   max_den (int) : the largest denominator allowed
+
+        Returns:
+        :   frac (Fraction | int) : the closest fraction, which is an int if it is whole
+        """
+        return _limit_denominator(*self._lowest(), max_den)
+
+    @property
+    def numerator(self) -> int:
+        """The numerator, in lowest terms."""
+        return self._lowest()[0]
+
+    @property
+    def denominator(self) -> int:
+        """The denominator, in lowest terms, which is always positive."""
+        return self._lowest()[1]
+
+    def __repr__(self) -> str:
+        num, den = self._lowest()
+        return f'Fraction({num}, {den})'
+
+    def __reduce__(self) -> tuple:
+        """Pickles the fraction as a call to the constructor."""
+        return (Fraction, self._lowest())
 
-    def __new__(cls, num, den):
-        if num % den == 0:
-            return num // den
-        return super().__new__(cls)
+    def __copy__(self) -> Fraction:
+        # immutable, so there's no need for a new object
+        return self
+
+    def __deepcopy__(self, memo: dict) -> Fraction:
+        return self
 
     def __add__(first: Fraction, second: number) -> number:
         """Adds the two numbers or fractions and returns the result.
@@ -36,14 +115,14 @@ class Fraction:
         :   third (Fraction | int | float) : the sum of the two
         """
         if isinstance(second, Fraction):
-            prod = lcm(first._den, second._den)
-            num = ((prod * first._num // first._den) +
-                   (prod * second._num // second._den))
-            return Fraction(num, prod)
+            return _add(first._num, first._den, second._num, second._den,
+                        first._reduced and second._reduced)
         if isinstance(second, int):
-            return Fraction(first._num + second * first._den, first._den)
+            return _make(first._num + second * first._den, first._den, first._reduced)
         if isinstance(second, float):
             return float(first) + second
+        if isinstance(second, FractionArray):
+            return NotImplemented
         raise ValueError(f'Unsupported argument to Fraction operation: {second}')
 
     __radd__ = __add__
@@ -59,9 +138,12 @@ class Fraction:
         :   third (Fraction | int | float) : the difference of the two
         """
         if isinstance(second, Fraction):
-            return first + Fraction(-second._num, second._den)
+            return _add(first._num, first._den, -second._num, second._den,
+                        first._reduced and second._reduced)
         if isinstance(second, int) or isinstance(second, float):
             return first + -second
+        if isinstance(second, FractionArray):
+            return NotImplemented
         raise ValueError(f'Unsupported argument to Fraction operation: {second}')
 
     def __rsub__(frac: Fraction, first: number) -> number:
@@ -74,7 +156,7 @@ class Fraction:
         Returns:
         :   third (Fraction | int | float) : the difference of the two
         """
-        return first + Fraction(-frac._num, frac._den)
+        return -frac + first
 
     def __mul__(first: Fraction, second: number) -> number:
         """Returns the product of the two numbers.
@@ -87,19 +169,21 @@ class Fraction:
         :   third (Fraction | int | float) : the product of the two
         """
         if isinstance(second, Fraction):
-            return Fraction(first._num * second._num,
-                            first._den * second._den)
+            return _mul(first._num, first._den, second._num, second._den,
+                        first._reduced and second._reduced)
         if isinstance(second, int):
-            return Fraction(first._num * second, first._den)
+            return _mul(first._num, first._den, second, 1, first._reduced)
         if isinstance(second, float):
             return float(first) * second
+        if isinstance(second, FractionArray):
+            return NotImplemented
         raise ValueError(f'Unsupported argument to Fraction operation: {second}')
 
     __rmul__ = __mul__
 
     def __str__(self) -> str:
         """A string representation of the fraction."""
-        strs = [str(self._num), str(self._den)]
+        strs = list(map(str, self._lowest()))
         lens = list(map(len, strs))
         big_ind = np.argmax(lens)
         sml_ind = 1 - big_ind
@@ -119,11 +203,17 @@ class Fraction:
         :   third (Fraction | float) : the quotient of the two
         """
         if isinstance(second, Fraction):
-            return first * Fraction(second._den, second._num)
+            return first * second.reciprocal()
         if isinstance(second, int):
-            return Fraction(first._num, first._den * second)
+            if second == 0:
+                raise ZeroDivisionError('Fraction division by zero')
+            if second < 0:
+                return _mul(-first._num, first._den, 1, -second, first._reduced)
+            return _mul(first._num, first._den, 1, second, first._reduced)
         if isinstance(second, float):
             return float(first) / second
+        if isinstance(second, FractionArray):
+            return NotImplemented
         raise ValueError(f'Unsupported argument to Fraction operation: {second}')
 
     def __rtruediv__(frac: Fraction, first: number) -> number:
@@ -136,7 +226,7 @@ class Fraction:
         Returns:
         :   third (Fraction | float) : the quotient of the two
         """
-        return first * Fraction(frac._den, frac._num)
+        return frac.reciprocal() * first
 
     def __rpow__(frac: Fraction, base: number) -> number:
         """Raises base to the power of frac.
@@ -161,7 +251,10 @@ class Fraction:
         :   third (Fraction | float) : frac raised to power
         """
         if isinstance(power, int):
-            return Fraction(frac._num ** power, frac._den ** power)
+            if power < 0:
+                return frac.reciprocal() ** -power
+            # powers of coprime numbers are coprime, so there is nothing to reduce
+            return _make(frac._num ** power, frac._den ** power, frac._reduced)
         if isinstance(power, Fraction) or isinstance(power, float):
             return float(frac) ** float(power)
         raise ValueError(f'Unsupported argument to Fraction operation: {power}')
@@ -174,37 +267,102 @@ class Fraction:
         """Divides the numberator by the denominator and provides a more exact value."""
         return self._num / self._den
 
-    def _reduce(self) -> None:
-        """Simplifies the fraction"""
-        q = gcd(self._num, self._den)
-        self._num //= q
-        self._den //= q
+    def _lowest(self) -> Tuple[int, int]:
+        """Returns the numerator and denominator in lowest terms.
+
+        Fractions made inside deferred_reduction are reduced into new ints each
+        time, rather than in place, so that they stay immutable (and safe to
+        share between threads).
+        """
+        if self._reduced:
+            return self._num, self._den
+        q = _gcd(self._num, self._den)
+        return self._num // q, self._den // q
+
+    def reduced(self) -> number:
+        """Returns the fraction in lowest terms, which is an int if it is whole.
+
+        Only fractions made inside deferred_reduction need this, as every other
+        fraction is already in lowest terms.
+
+        Args:
+        :   None
+
+        Returns:
+        :   frac (Fraction | int) : the reduced fraction
+        """
+        if self._reduced:
+            return self
+        return _make(*self._lowest())
 
     def __eq__(first, second) -> bool:
-        """Returns whether the two fractions are equal."""
+        """Returns whether the two numbers are exactly equal."""
         if isinstance(second, Fraction):
-            return first._num == second._num and first._den == second._den
+            # the denominators are positive, so cross-multiplying compares exactly
+            return first._num * second._den == second._num * first._den
         if isinstance(second, float):
-            return float(first) == second
+            # compared exactly rather than by rounding first to a float, so that
+            # equal numbers always have equal hashes
+            if not isfinite(second):
+                return False
+            return first._lowest() == second.as_integer_ratio()
         if isinstance(second, int):
-            return False
-        raise ValueError(f'Unsupported argument to Fraction comparison: {second}')
+            return first._num == second * first._den
+        if isinstance(second, Rational):
+            # e.g. fractions.Fraction
+            return first._lowest() == (second.numerator, second.denominator)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        """Returns the same hash as an equal int, float or fractions.Fraction."""
+        num, den = self._lowest()
+        # the same as CPython's hash for rationals, see the numeric types section
+        # of the standard library docs
+        try:
+            inverse = pow(den, -1, _HASH_MODULUS)
+        except ValueError:
+            # the denominator is a multiple of the modulus
+            res = _HASH_INF
+        else:
+            res = hash(hash(abs(num)) * inverse)
+        res = res if num >= 0 else -res
+        return -2 if res == -1 else res
+
+    def __bool__(self) -> bool:
+        return self._num != 0
+
+    def _compare(first, second: Any, op: Callable[[Any, Any], bool]) -> bool:
+        """Returns op(first, second), compared exactly."""
+        # the denominators are positive, so cross-multiplying compares exactly
+        if isinstance(second, Fraction):
+            return op(first._num * second._den, second._num * first._den)
+        if isinstance(second, int):
+            return op(first._num, second * first._den)
+        if isinstance(second, float):
+            if not isfinite(second):
+                # any fraction is between -inf and inf, and every comparison with nan is False
+                return op(0, second)
+            num, den = second.as_integer_ratio()
+            return op(first._num * den, num * first._den)
+        if isinstance(second, FractionArray):
+            return NotImplemented
+        return op(float(first), float(second))
 
     def __lt__(first, second) -> bool:
         """Returns whether the first is less than the second."""
-        return float(first) < float(second)
+        return first._compare(second, operator.lt)
 
     def __le__(first, second) -> bool:
         """Returns whether the first is less than or equal to the second."""
-        return first < second or first == second
+        return first._compare(second, operator.le)
 
     def __gt__(first, second) -> bool:
         """Returns whether the first is greater than the second."""
-        return not first <= second
+        return first._compare(second, operator.gt)
 
     def __ge__(first, second) -> bool:
         """Returns whether the first is greater than or equal to the second."""
-        return not first < second
+        return first._compare(second, operator.ge)
 
     def reciprocal(self) -> number:
         """Returns the reciprocal of the fraction i.e. 1 / self.
@@ -215,7 +373,11 @@ class Fraction:
         Returns:
         :   recip (Fraction) : the reciprocal
         """
-        return Fraction(self._num, self._den)
+        if self._num == 0:
+            raise ZeroDivisionError('Reciprocal of a Fraction equal to 0')
+        if self._num < 0:
+            return _make(-self._den, -self._num, self._reduced)
+        return _make(self._den, self._num, self._reduced)
 
     def __neg__(self) -> Fraction:
         """Returns -1 * self.
@@ -226,7 +388,7 @@ class Fraction:
         Returns:
         :   negated (Fraction) : the negation of self
         """
-        return Fraction(-self._num, self._den)
+        return _make(-self._num, self._den, self._reduced)
 
     def __floordiv__(first: Fraction, second: number) -> number:
         """Floor divides first by second.
@@ -252,6 +414,167 @@ class Fraction:
         """
         return numerator // float(frac)
 
+def _make(num: int, den: int, reduced: bool = True) -> number:
+    """Returns num / den without reducing it, or num if den is 1.
+
+    den must be positive, and num / den must be in lowest terms unless reduced is False.
+    """
+    if den == 1:
+        return num
+    o = object.__new__(Fraction)
+    o._num = num
+    o._den = den
+    o._reduced = reduced
+    return o
+
+def _add(a: int, b: int, c: int, d: int, reduced: bool) -> number:
+    """Returns a / b + c / d, for positive b and d, which are in lowest terms if reduced is True."""
+    if _DEFERRED.get():
+        # reuse the denominator when one divides the other, so that sums of
+        # fractions with a few repeated denominators don't keep growing
+        if b % d == 0:
+            return _make(a + c * (b // d), b, False)
+        if d % b == 0:
+            return _make(a * (d // b) + c, d, False)
+        return _make(a * d + b * c, b * d, False)
+    if not reduced:
+        return Fraction(a * d + b * c, b * d)
+    # Henrici's method: only factors of gcd(b, d) can be shared by the new numerator
+    # and denominator, so there's no need to take the gcd of the full products
+    g = _gcd(b, d)
+    if g == 1:
+        return _make(a * d + b * c, b * d)
+    s = b // g
+    t = a * (d // g) + c * s
+    g2 = _gcd(t, g)
+    if g2 == 1:
+        return _make(t, s * d)
+    return _make(t // g2, s * (d // g2))
+
+def _mul(a: int, b: int, c: int, d: int, reduced: bool) -> number:
+    """Returns (a / b) * (c / d), for positive b and d, which are in lowest terms if reduced is True."""
+    if _DEFERRED.get():
+        return _make(a * c, b * d, False)
+    if not reduced:
+        return Fraction(a * c, b * d)
+    # cancel across before multiplying, so the products come out in lowest terms
+    g1 = _gcd(a, d)
+    if g1 > 1:
+        a //= g1
+        d //= g1
+    g2 = _gcd(c, b)
+    if g2 > 1:
+        c //= g2
+        b //= g2
+    return _make(a * c, b * d)
+
+@contextmanager
+def deferred_reduction() -> Iterator[None]:
+    """Lets Fraction arithmetic skip reducing its results while the block runs.
+
+    Reducing takes a gcd per operation, which dominates long chains of
+    arithmetic such as sums. Inside this block each operation just multiplies
+    out, and the fractions are only brought to lowest terms when they are
+    printed or hashed, without changing them, or explicitly with
+    Fraction.reduced, which returns a new fraction. Values are always correct;
+    only how they are stored changes, and whole results stay Fractions instead
+    of becoming ints. Numerators and denominators can grow quickly, so this
+    pays off most when the denominators repeat or share factors.
+
+    Only affects the thread (or asyncio task) that opened the block, so other
+    threads keep getting reduced results.
+
+    Args:
+    :   None
+
+    Returns:
+    :   context (context manager) : the block to run without reducing
+    """
+    token = _DEFERRED.set(_DEFERRED.get() + 1)
+    try:
+        yield
+    finally:
+        _DEFERRED.reset(token)
+
+def continued_fraction(x: number) -> Iterator[int]:
+    """Yields the terms of the continued fraction of x.
+
+    The terms a0, a1, a2, ... satisfy x = a0 + 1 / (a1 + 1 / (a2 + ...)), with
+    every term after a0 positive. Floats are expanded exactly, so there are
+    always finitely many terms, but the later terms of a float mostly reflect
+    its rounding error.
+
+    Args:
+    :   x (int | Fraction | float) : the number to expand
+
+    Returns:
+    :   terms (iterator) : the terms, in order
+    """
+    num, den = _as_ratio(x)
+    while den:
+        term = num // den
+        yield term
+        num, den = den, num - term * den
+
+def convergents(x: Union[number, Iterable[int]]) -> Iterator[number]:
+    """Yields the convergents of the continued fraction of x.
+
+    Each convergent is the closest fraction to x with a denominator no bigger
+    than its own, and they alternate between being below and above x while
+    getting closer to it.
+
+    Args:
+    :   x (int | Fraction | float | iterable) : the number to approximate, or
+            the terms of a continued fraction, which can be infinite (e.g.
+            itertools.chain([1], itertools.repeat(2)) for sqrt(2))
+
+    Returns:
+    :   fracs (iterator) : the convergents, as Fractions or ints
+    """
+    terms = iter(x) if not isinstance(x, (int, float, np.floating, Rational, Fraction)) else continued_fraction(x)
+    p0, q0, p1, q1 = 0, 1, 1, 0
+    for term in terms:
+        p0, q0, p1, q1 = p1, q1, term * p1 + p0, term * q1 + q0
+        yield _make(p1, q1)
+
+def _as_ratio(x: number) -> Tuple[int, int]:
+    """Returns x as a numerator and positive denominator in lowest terms."""
+    if isinstance(x, Fraction):
+        return x._lowest()
+    if isinstance(x, int):
+        return x, 1
+    if isinstance(x, (float, np.floating)):
+        if not isfinite(x):
+            raise ValueError(f'{x} has no value as a fraction')
+        return float(x).as_integer_ratio()
+    if isinstance(x, Rational):
+        return int(x.numerator), int(x.denominator)
+    raise TypeError(f'Cannot convert {x!r} to a fraction')
+
+def _limit_denominator(num: int, den: int, max_den: int) -> number:
+    """Returns the closest fraction to num / den, in lowest terms, whose denominator is at most max_den."""
+    if max_den < 1:
+        raise ValueError(f'The largest denominator must be at least 1, not {max_den}')
+    if den <= max_den:
+        return _make(num, den)
+    # walks the convergents until the next one's denominator is too big. The answer
+    # is then the last convergent or the best semiconvergent after it
+    p0, q0, p1, q1 = 0, 1, 1, 0
+    n, d = num, den
+    while True:
+        term = n // d
+        q2 = q0 + term * q1
+        if q2 > max_den:
+            break
+        p0, q0, p1, q1 = p1, q1, p0 + term * p1, q2
+        n, d = d, n - term * d
+    k = (max_den - q0) // q1
+    # p1 / q1 is d / (q1 * den) from num / den, and 1 / (q1 * (q0 + k * q1)) from
+    # the semiconvergent, so this picks whichever is closer (p1 / q1 on a tie)
+    if 2 * d * (q0 + k * q1) <= den:
+        return _make(p1, q1)
+    return _make(p0 + k * p1, q0 + k * q1)
+
 def gcd(x: int, y: int) -> int:
     """Returns the greatest common denominator between x and y.
 
@@ -264,10 +587,7 @@ def gcd(x: int, y: int) -> int:
     Args:
     :   gcd (int) : the greatest number that divides both x and y
     """
-    if x > y: return gcd(y, x)
-    while y:
-        x, y = y, x % y
-    return x
+    return _gcd(x, y)
 
 def lcm(x: int, y: int) -> int:
     """Returns the least common multiple of x and y.
@@ -283,7 +603,7 @@ def lcm(x: int, y: int) -> int:
     Returns:
     :   lcm (int) : the smallest number that both x and y are factors of
     """
-    return (x * y) // gcd(x, y)
+    return (x * y) // _gcd(x, y)
 
 def divide(num: int, den: int) -> number:
     """Divides num by den, returning an exact Fraction if they do not divide.
@@ -310,3 +630,457 @@ def frac_abs(n: number) -> number:
     :   abs (int | float | Fraction) : the absolute value
     """
     return -n if n < 0 else n
+
+# how many values frac_sum, frac_dot and frac_mean add between reductions of their running total
+_REDUCE_EVERY: int = 256
+
+def frac_sum(values: Iterable[number]) -> number:
+    """Returns the exact sum of values, which can be a generator.
+
+    Keeps a single running numerator over the least common denominator of the
+    values so far, and only reduces it every few hundred values and at the end,
+    instead of reducing a new Fraction after every addition. Floats are added
+    exactly too, and make the result the correctly rounded float of the exact
+    sum.
+
+    Args:
+    :   values (iterable) : ints, Fractions or floats, or a FractionArray
+
+    Returns:
+    :   total (int | Fraction | float) : the sum, which is 0 if there are no values
+    """
+    if isinstance(values, FractionArray):
+        return values.sum()
+    total = _Total()
+    total.add_all(values)
+    return total.result()
+
+def frac_dot(first: Iterable[number], second: Iterable[number]) -> number:
+    """Returns the exact dot product of first and second, which can be generators.
+
+    Accumulates like frac_sum, without reducing each product.
+
+    Args:
+    :   first (iterable) : ints, Fractions or floats
+    :   second (iterable) : ints, Fractions or floats, as many as in first
+
+    Returns:
+    :   dot (int | Fraction | float) : the sum of the products of each pair
+    """
+    total = _Total()
+    total.add_products(first, second)
+    return total.result()
+
+def frac_mean(values: Iterable[number]) -> number:
+    """Returns the exact mean of values, which can be a generator. See frac_sum.
+
+    Args:
+    :   values (iterable) : ints, Fractions or floats
+
+    Returns:
+    :   mean (int | Fraction | float) : the mean
+    """
+    total = _Total()
+    total.add_all(values)
+    if not total.count:
+        raise ValueError('frac_mean needs at least one value')
+    total.den *= total.count
+    return total.result()
+
+class _Total:
+    """A running exact sum for frac_sum, frac_dot and frac_mean.
+
+    The sum is num / den, where den is the least common multiple of the
+    denominators added so far, so adding a value whose denominator divides it
+    (e.g. any int) is one multiplication and one addition. The loops keep the
+    total in local variables, since attribute access per value would cost as
+    much as the arithmetic.
+    """
+    __slots__ = ('num', 'den', 'count', 'inexact', 'special')
+
+    def __init__(self):
+        self.num: int = 0
+        self.den: int = 1
+        self.count: int = 0
+        self.inexact: bool = False # whether a float was added
+        self.special: float = 0.0 # the infinities and nans, which have no exact value
+
+    def add_all(self, values: Iterable[number]) -> None:
+        """Adds every value in values to the total."""
+        num, den, count = self.num, self.den, self.count
+        for value in values:
+            count += 1
+            if isinstance(value, Fraction):
+                n, d = value._num, value._den
+            elif isinstance(value, int):
+                num += value * den
+                continue
+            else:
+                parts = self._parts(value)
+                if parts is None:
+                    self.special += float(value)
+                    continue
+                n, d = parts
+            g = _gcd(den, d)
+            if g == d:
+                num += n * (den // d)
+            else:
+                scale = d // g
+                num = num * scale + n * (den // g)
+                den *= scale
+            if not count % _REDUCE_EVERY:
+                g = _gcd(num, den)
+                num //= g
+                den //= g
+        self.num, self.den, self.count = num, den, count
+
+    def add_products(self, first: Iterable[number], second: Iterable[number]) -> None:
+        """Adds the product of each pair of values in first and second to the total."""
+        num, den, count = self.num, self.den, self.count
+        missing = object()
+        for x, y in zip_longest(first, second, fillvalue = missing):
+            if x is missing or y is missing:
+                raise ValueError('frac_dot needs two sequences of the same length')
+            count += 1
+            px = (x._num, x._den) if isinstance(x, Fraction) else (x, 1) if isinstance(x, int) else self._parts(x)
+            py = (y._num, y._den) if isinstance(y, Fraction) else (y, 1) if isinstance(y, int) else self._parts(y)
+            if px is None or py is None:
+                self.special += float(x) * float(y)
+                continue
+            n = px[0] * py[0]
+            d = px[1] * py[1]
+            g = _gcd(den, d)
+            if g == d:
+                num += n * (den // d)
+            else:
+                scale = d // g
+                num = num * scale + n * (den // g)
+                den *= scale
+            if not count % _REDUCE_EVERY:
+                g = _gcd(num, den)
+                num //= g
+                den //= g
+        self.num, self.den, self.count = num, den, count
+
+    def _parts(self, value: number) -> Union[Tuple[int, int], None]:
+        """Returns the numerator and denominator of value, or None if it is an infinity or nan.
+
+        Infinities and nans have no exact value, so the caller adds them as floats
+        to special, which is added to the total at the end.
+        """
+        if isinstance(value, Fraction):
+            return value._num, value._den
+        if isinstance(value, int):
+            return value, 1
+        if isinstance(value, (float, np.floating)):
+            self.inexact = True
+            if not isfinite(value):
+                return None
+            return float(value).as_integer_ratio()
+        if isinstance(value, Rational):
+            return int(value.numerator), int(value.denominator)
+        raise TypeError(f'Cannot add {value!r} exactly')
+
+    def result(self) -> number:
+        """Returns the total, as a float if any floats were added."""
+        if self.inexact:
+            try:
+                # Python ints divide to the correctly rounded float, however big they are
+                total = self.num / self.den
+            except OverflowError:
+                total = inf if self.num > 0 else -inf
+            return total + self.special
+        return Fraction(self.num, self.den)
+
+# int64 results are only kept while their magnitude is below this, which leaves
+# plenty of room for the rounding in the float estimates of their size
+_INT64_SAFE: int = 2 ** 62
+
+class FractionArray:
+    """An array of exact fractions, stored as parallel arrays of numerators and denominators.
+
+    Arithmetic, comparisons and sums work on the whole array at once, like
+    NumPy arrays, with every element kept in lowest terms with a positive
+    denominator. The arrays are int64 while the values fit, and switch to
+    object arrays of Python ints when a result could overflow, so the values
+    are always exact. Arithmetic with floats gives a float array, like
+    arithmetic between a Fraction and a float gives a float.
+
+    Args:
+        num (array-like) : the numerators, which must be ints
+
+        den (array-like) : the denominators, which must be ints. Defaults to 1,
+            and is broadcast against num
+    """
+    # makes NumPy arrays hand arithmetic with a FractionArray over to it
+    __array_ufunc__ = None
+
+    def __init__(self, num: Any, den: Any = 1):
+        num, den = np.broadcast_arrays(_as_ints(num), _as_ints(den))
+        if np.any(den == 0):
+            raise ZeroDivisionError('FractionArray with a denominator of 0')
+        g = np.gcd(num, den) * np.where(den < 0, -1, 1)
+        self._num, self._den = _narrow(num // g, den // g)
+
+    @classmethod
+    def _from_parts(cls, num: np.ndarray, den: np.ndarray) -> FractionArray:
+        """Wraps num and den, which must already be in lowest terms, without checking them."""
+        o = object.__new__(cls)
+        o._num, o._den = _narrow(num, den)
+        return o
+
+    @property
+    def numerators(self) -> np.ndarray:
+        """The numerators, in lowest terms."""
+        return self._num
+
+    @property
+    def denominators(self) -> np.ndarray:
+        """The denominators, which are all positive."""
+        return self._den
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """The shape of the array."""
+        return self._num.shape
+
+    def __len__(self) -> int:
+        return len(self._num)
+
+    def __getitem__(self, index: Any) -> Union[number, FractionArray]:
+        """Returns a single element as a Fraction or int, or a FractionArray for slices."""
+        num = self._num[index]
+        den = self._den[index]
+        if np.ndim(num) == 0:
+            return _make(int(num), int(den))
+        return FractionArray._from_parts(num, den)
+
+    def __iter__(self) -> Iterator[Union[number, FractionArray]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> List[number]:
+        """Returns every element as a Fraction or int, in row-major order.
+
+        Args:
+        :   None
+
+        Returns:
+        :   values (list) : the elements of the array
+        """
+        return [_make(num, den) for num, den in zip(self._num.ravel().tolist(), self._den.ravel().tolist())]
+
+    def __repr__(self) -> str:
+        elems = (f'{num}' if den == 1 else f'{num}/{den}'
+                 for num, den in zip(self._num.ravel().tolist(), self._den.ravel().tolist()))
+        return f'FractionArray([{", ".join(elems)}])'
+
+    def to_float(self) -> np.ndarray:
+        """Returns the nearest float to each fraction.
+
+        Args:
+        :   None
+
+        Returns:
+        :   floats (np.ndarray) : a float64 array with the same shape
+        """
+        # Python ints divide to the correctly rounded float, however big they are
+        return (self._num / self._den).astype(np.float64)
+
+    def sum(self) -> number:
+        """Returns the exact sum of every element.
+
+        Adds neighbouring pairs of elements all at once, halving the number of
+        fractions each time, so the sum takes a logarithmic number of passes.
+
+        Args:
+        :   None
+
+        Returns:
+        :   total (Fraction | int) : the sum
+        """
+        num = self._num.ravel()
+        den = self._den.ravel()
+        if not num.size:
+            return 0
+        while num.size > 1:
+            if num.size % 2:
+                num = np.append(num, 0)
+                den = np.append(den, 1)
+            half = num.size // 2
+            num, den = _add_parts(num[:half], den[:half], num[half:], den[half:])
+        return _make(int(num[0]), int(den[0]))
+
+    def __neg__(self) -> FractionArray:
+        return FractionArray._from_parts(-self._num, self._den)
+
+    def __abs__(self) -> FractionArray:
+        return FractionArray._from_parts(np.abs(self._num), self._den)
+
+    def __add__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return self.to_float() + other
+        return FractionArray._from_parts(*_add_parts(self._num, self._den, *parts))
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return self.to_float() - other
+        return FractionArray._from_parts(*_add_parts(self._num, self._den, -parts[0], parts[1]))
+
+    def __rsub__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return other - self.to_float()
+        return FractionArray._from_parts(*_add_parts(-self._num, self._den, *parts))
+
+    def __mul__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return self.to_float() * other
+        return FractionArray._from_parts(*_mul_parts(self._num, self._den, *parts))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return self.to_float() / other
+        return FractionArray._from_parts(*_div_parts(self._num, self._den, *parts))
+
+    def __rtruediv__(self, other: Any) -> Union[FractionArray, np.ndarray]:
+        parts = _parts(other)
+        if parts is None:
+            return other / self.to_float()
+        return FractionArray._from_parts(*_div_parts(*parts, self._num, self._den))
+
+    def _compare(self, other: Any, op: Callable[[Any, Any], Any]) -> np.ndarray:
+        """Returns op applied to each pair of elements, as a bool array.
+
+        Floats are compared by their exact values, like Fraction does, rather than
+        by rounding the fractions to floats.
+        """
+        parts = _parts(other)
+        finite = None
+        if parts is None:
+            arr = np.asarray(other)
+            if arr.dtype.kind != 'f':
+                return op(self.to_float(), other)
+            parts, finite = _float_parts(arr)
+        num, den = parts
+        # the denominators are positive, so cross-multiplying keeps the order
+        res = np.asarray(op(_checked_mul(self._num, den), _checked_mul(num, self._den)), dtype = bool)
+        if finite is not None and not finite.all():
+            # any fraction is between -inf and inf, and every comparison with nan is False
+            res = np.where(finite, res, op(np.zeros(self.shape), arr))
+        return res
+
+    def __eq__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.eq)
+
+    def __ne__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.ne)
+
+    def __lt__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other: Any) -> np.ndarray:
+        return self._compare(other, operator.ge)
+
+    __hash__ = None
+
+def _as_ints(values: Any) -> np.ndarray:
+    """Returns values as an int64 array, or an object array of Python ints if they don't fit."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'bi' or not arr.size:
+        return arr.astype(np.int64, copy = False)
+    if arr.dtype.kind == 'u' or arr.dtype == object:
+        if arr.dtype == object and not all(isinstance(v, (int, np.integer)) for v in arr.flat):
+            raise TypeError('FractionArray needs integer numerators and denominators')
+        if _fits(arr):
+            return arr.astype(np.int64)
+        return np.array([int(v) for v in arr.flat], dtype = object).reshape(arr.shape)
+    raise TypeError(f'FractionArray needs integer numerators and denominators, not {arr.dtype}')
+
+def _fits(arr: np.ndarray) -> bool:
+    """Returns whether every value in arr is comfortably inside the range of int64."""
+    return not arr.size or (-_INT64_SAFE < int(arr.min()) and int(arr.max()) < _INT64_SAFE)
+
+def _narrow(num: np.ndarray, den: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Gives num and den the same dtype, which is int64 unless they need Python ints."""
+    if num.dtype == np.int64 and den.dtype == np.int64:
+        return num, den
+    if _fits(num) and _fits(den):
+        return num.astype(np.int64), den.astype(np.int64)
+    return num.astype(object), den.astype(object)
+
+def _parts(value: Any) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+    """Returns the numerators and denominators of value, or None if it has floats."""
+    if isinstance(value, FractionArray):
+        return value._num, value._den
+    if isinstance(value, Fraction):
+        num, den = value._lowest()
+        return _as_ints(num), _as_ints(den)
+    arr = np.asarray(value)
+    if arr.dtype.kind in 'biu' or (arr.dtype == object and all(isinstance(v, (int, np.integer)) for v in arr.flat)):
+        return _as_ints(arr), np.ones((), dtype = np.int64)
+    return None
+
+def _float_parts(arr: np.ndarray) -> Tuple[Tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """Returns the exact numerators and denominators of a float array, and where it is finite.
+
+    The values that aren't finite are given as 0.
+    """
+    finite = np.isfinite(arr)
+    ratios = [float(v).as_integer_ratio() if ok else (0, 1) for v, ok in zip(arr.flat, finite.flat)]
+    num = _as_ints(np.array([n for n, _ in ratios], dtype = object).reshape(arr.shape))
+    den = _as_ints(np.array([d for _, d in ratios], dtype = object).reshape(arr.shape))
+    return (num, den), finite
+
+def _checked_mul(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Returns x * y, switching to Python ints if int64 would overflow."""
+    if x.dtype == object or y.dtype == object:
+        return x * y
+    est = np.multiply(x, y, dtype = np.float64)
+    if est.size and np.abs(est).max() >= _INT64_SAFE:
+        return x.astype(object) * y.astype(object)
+    return x * y
+
+def _checked_add(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Returns x + y, switching to Python ints if int64 would overflow."""
+    if x.dtype == object or y.dtype == object:
+        return x + y
+    est = np.add(x, y, dtype = np.float64)
+    if est.size and np.abs(est).max() >= _INT64_SAFE:
+        return x.astype(object) + y.astype(object)
+    return x + y
+
+def _add_parts(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns a / b + c / d in lowest terms, like _add but elementwise."""
+    g = np.gcd(b, d)
+    s = b // g
+    t = _checked_add(_checked_mul(a, d // g), _checked_mul(c, s))
+    g2 = np.gcd(t, g)
+    return t // g2, _checked_mul(s, d // g2)
+
+def _mul_parts(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (a / b) * (c / d) in lowest terms, like _mul but elementwise."""
+    g1 = np.gcd(a, d)
+    g2 = np.gcd(c, b)
+    return _checked_mul(a // g1, c // g2), _checked_mul(b // g2, d // g1)
+
+def _div_parts(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (a / b) / (c / d) in lowest terms."""
+    if np.any(c == 0):
+        raise ZeroDivisionError('FractionArray division by zero')
+    sign = np.where(c < 0, -1, 1)
+    return _mul_parts(a, b, d * sign, c * sign)
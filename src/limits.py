@@ -5,6 +5,12 @@ from .frange import frange
 from .utilities import close_enough, number
 from typing import Callable, List
 from .fractions import frac_abs
+from .dual import Dual, tangent_of
+from .operators.base_arithmetic import ArithmeticOpBase
+
+def _fast(func: Callable[[number], number]) -> Callable[[number], number]:
+    """Returns the compiled version of func if it is an operator tree, otherwise func."""
+    return func.compile() if isinstance(func, ArithmeticOpBase) else func
 
 def analytical_limit(
     func: Callable[[number], number], 
@@ -23,6 +29,7 @@ def analytical_limit(
     Returns:
     :   limit (float) : the analytical limit of the function
     """
+    func = _fast(func)
     total_y: number = 0
     total_w: number = 0
     for i in frange(approaching - step * precision, approaching + step * (precision + 1), step):
@@ -57,16 +64,27 @@ def limit(
     except:
         return analytical_limit(func, approaching, precision, step)
 
-def diff_quo(func: Callable[[number], number], x: number) -> number:
+def diff_quo(func: Callable[[number], number], x: number, mode: str = 'numeric') -> number:
     """Returns the derivative of func at x using the difference quotient.
 
+    With mode='forward', func is instead called once on a Dual number, which gives
+    the exact derivative. That needs func to be built from arithmetic, the
+    operators in src.operators, or the functions in src.admath (not math).
+
     Args:
     :   func (function: float -> float) : the function to evaluate
     :   x (int | float) : the value to evaluate the function at
+    :   mode (str) : 'numeric' for the difference quotient or 'forward' for
+            forward-mode automatic differentiation
 
     Returns:
     :   quo (float) : the difference quotient of the function at x
     """
+    if mode == 'forward':
+        return tangent_of(func(Dual(x)))
+    if mode != 'numeric':
+        raise ValueError(f'Unknown differentiation mode: {mode}')
+    func = _fast(func)
     return analytical_limit(lambda h: (func(x + h) - func(x)) / h, 0)
 
 def assign_return(lst: List[number], ind: int, new_val: number) -> List[number]:
@@ -108,7 +126,8 @@ def get_root(
     func: Callable[[number], number], 
     guess: number, 
     thresh: number = 1e-3, 
-    max_iters: number = 20
+    max_iters: number = 20,
+    mode: str = 'numeric'
     ) -> number:
     """Returns an approximation of the root (where it equals zero) of the function.
 
@@ -120,11 +139,19 @@ def get_root(
             needs to be reasonably good
     :   thresh (float) : how exact the estimate should be
     :   max_iters (int) : the maximum number of iterations to use
+    :   mode (str) : how to find the derivative, see diff_quo
 
     Returns:
     :   root (float) : where the function equals zero
     """
-    get_new = lambda g: g - func(g) / diff_quo(func, g)
+    if mode == 'forward':
+        def get_new(g: number) -> number:
+            y = func(Dual(g))
+            value = y.value if isinstance(y, Dual) else y
+            return g - value / tangent_of(y)
+    else:
+        func = _fast(func)
+        get_new = lambda g: g - func(g) / diff_quo(func, g, mode)
     new = get_new(guess)
     iters = 0
     while frac_abs(new - guess) > thresh and iters < max_iters:
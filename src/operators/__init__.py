@@ -5,3 +5,10 @@ from .trig_functions import *
 from .parsing import *
 from .string_derivative import *
 from .combos import *
+from .bytecode import *
+from .caching import *
+from .dag import *
+from .simplify import *
+from .metrics import *
+from .batch import *
+from .serialize import *
@@ -1,21 +1,27 @@
 from __future__ import annotations
-from math import log, e
+from math import e
+from ..admath import log
 import numpy as np
 from ..fractions import Fraction
-from .base_arithmetic import ArithmeticOpBase, _single_arg, operator_input, simple_return
+from .base_arithmetic import ArithmeticOpBase, _single_arg, operator_input, simple_return, _number_source
 from ..utilities import number
-from typing import Union
+from typing import Any, Dict, Mapping, Union
 
 class const (ArithmeticOpBase):
     """Always returns n i.e. f(x) = n."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 6
+    __slots__ = ()
+    priority: int = 6
 
     def f(self, x: number) -> number:
         return self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.full(x.shape, self.n, dtype=float)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return _number_source(self.n, names)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(0)
 
     def __str__(self) -> str:
@@ -81,6 +87,8 @@ class const (ArithmeticOpBase):
 
     def _simple_exp(self, other: operator_input) -> simple_return:
         other = self._get_func(other)
+        if self.n == 0 and isinstance(other, const) and other.n < 0:
+            raise ZeroDivisionError(f'Cannot raise 0 to the power of {other.n}')
         if self.n == 0 or self.n == 1:
             return self
         if isinstance(other, const):
@@ -89,13 +97,19 @@ class const (ArithmeticOpBase):
 
 class identity (_single_arg):
     """Always returns x i.e. f(x) = x."""
-    def __init__(self):
-        self.priority: int = 6
+    __slots__ = ()
+    priority: int = 6
 
     def f(self, x: number) -> number:
         return x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return x
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return x
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1)
 
     def __str__(self) -> str:
@@ -137,16 +151,60 @@ class identity (_single_arg):
             return const(other.n)
         return super()._simple_div(other)
 
+class variable (ArithmeticOpBase):
+    """Returns the value of the variable named n, whatever x is.
+
+    Used for functions of several variables, which are called with the value of
+    each variable, as keywords or a mapping e.g. f(x = 1, y = 2) or
+    f({'x' : 1, 'y' : 2}). The variable x is identity, so variable('x') returns
+    identity().
+
+    Args:
+        n (str) : the name of the variable
+    """
+    __slots__ = ()
+    priority: int = 6
+
+    def f(self, x: Any) -> number:
+        if isinstance(x, Mapping) and self.n in x:
+            return x[self.n]
+        raise ValueError(f'No value given for variable {self.n}')
+
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        raise ValueError(f'No value given for variable {self.n}')
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'_env[{self.n!r}]'
+
+    def _f_prime(self) -> ArithmeticOpBase:
+        return const(0)
+
+    def _partial(self, var: str) -> ArithmeticOpBase:
+        return const(1 if var == self.n else 0)
+
+    def __str__(self) -> str:
+        return self.n
+
+    def __new__(cls, n):
+        if n == 'x':
+            return identity()
+        return super(variable, cls).__new__(cls, n)
+
 class add_n (ArithmeticOpBase):
     """Adds x to n i.e. f(x) = x + n."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 0
+    __slots__ = ()
+    priority: int = 0
 
     def f(self, x: number) -> number:
         return self.n + x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return x + self.n
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({_number_source(self.n, names)} + {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1)
 
     def __str__(self) -> str:
@@ -191,14 +249,19 @@ class add_n (ArithmeticOpBase):
 
 class sub_n (ArithmeticOpBase):
     """Subtracts n from x i.e. f(x) = x - n."""
-    def __init__(self, n):
-        super().__init__(n)
-        self.priority: int = 1
+    __slots__ = ()
+    priority: int = 1
 
     def f(self, x: number) -> number:
         return x - self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return x - self.n
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({x} - {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1)
 
     def __str__(self) -> str:
@@ -239,14 +302,19 @@ class sub_n (ArithmeticOpBase):
 
 class n_sub (ArithmeticOpBase):
     """Subtracts x from n i.e. f(x) = n - x."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 1
+    __slots__ = ()
+    priority: int = 1
 
     def f(self, x: number) -> number:
         return self.n - x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.n - x
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({_number_source(self.n, names)} - {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(-1)
 
     def __str__(self) -> str:
@@ -283,14 +351,19 @@ class n_sub (ArithmeticOpBase):
 
 class mult_n (ArithmeticOpBase):
     """Multiplies n with the output i.e. f(x) = nx."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 2
+    __slots__ = ()
+    priority: int = 2
 
     def f(self, x: number) -> number:
         return x * self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return x * self.n
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({x} * {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(self.n)
 
     def __str__(self) -> str:
@@ -337,9 +410,10 @@ class mult_n (ArithmeticOpBase):
 
 class div_n (ArithmeticOpBase):
     """Divides x by n i.e. f(x) = x / n."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 3
+    __slots__ = ('recip',)
+    priority: int = 3
+
+    def _init(self) -> None:
         if self.n == 0:
             raise ZeroDivisionError('Cannot create div_n class with n = 0')
         self.recip: number = 1 / self.n
@@ -352,7 +426,13 @@ class div_n (ArithmeticOpBase):
     def f(self, x: number) -> number:
         return x / self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return x / self.n
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({x} / {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(self.recip)
 
     def __str__(self) -> str:
@@ -386,14 +466,19 @@ class div_n (ArithmeticOpBase):
 
 class n_div (ArithmeticOpBase):
     """Divides n by x i.e. f(x) = n / x."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 3
+    __slots__ = ()
+    priority: int = 3
 
     def f(self, x: number) -> number:
         return self.n / x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.n / x
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({_number_source(self.n, names)} / {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(-self.n) / exp_n(2)
 
     def __str__(self) -> str:
@@ -430,14 +515,19 @@ class n_div (ArithmeticOpBase):
 
 class floordiv_n (ArithmeticOpBase):
     """Floor divides x by n i.e. f(x) = x // n."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 3
+    __slots__ = ()
+    priority: int = 3
 
     def f(self, x: number) -> number:
         return x // self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.floor_divide(x, self.n)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({x} // {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(0)
 
     def __str__(self) -> str:
@@ -445,14 +535,19 @@ class floordiv_n (ArithmeticOpBase):
 
 class n_floordiv (ArithmeticOpBase):
     """Floor divides x by n i.e. f(x) = n // x."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 3
+    __slots__ = ()
+    priority: int = 3
 
     def f(self, x: number) -> number:
         return self.n // x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.floor_divide(self.n, x)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({_number_source(self.n, names)} // {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(0)
 
     def __str__(self) -> str:
@@ -465,14 +560,19 @@ class n_floordiv (ArithmeticOpBase):
 
 class exp_n (ArithmeticOpBase):
     """Raises x to the power of n i.e. f(x) = x ** n."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 4
+    __slots__ = ()
+    priority: int = 4
 
     def f(self, x: number) -> number:
         return x ** self.n
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.power(x, self.n)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({x} ** {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return exp_n(self.n - 1) * self.n
 
     def __str__(self):
@@ -493,15 +593,22 @@ class exp_n (ArithmeticOpBase):
 
 class n_exp (ArithmeticOpBase):
     """Raises n to the power of x i.e. f(x) = n ** x."""
-    def __init__(self, n: number):
-        super().__init__(n)
-        self.priority: int = 4
+    __slots__ = ('ln',)
+    priority: int = 4
+
+    def _init(self) -> None:
         self.ln: Union[float, None] = log(self.n) if self.n > 0 else None
 
     def f(self, x: number) -> number:
         return self.n ** x
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.power(self.n, x)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'({_number_source(self.n, names)} ** {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         if self.ln is None:
             raise ValueError(f'Derivative of n ^ x is undefined with n = {self.n}')
         return n_exp(self.n) * self.ln
@@ -516,17 +623,24 @@ class n_exp (ArithmeticOpBase):
 
 class log_base_n (ArithmeticOpBase):
     """Returns log_n(x) i.e. the argument to the log varies based on the input."""
-    def __init__(self, n: number):
-        super().__init__(n)
+    __slots__ = ('ln',)
+    priority: int = 5
+
+    def _init(self) -> None:
         if self.n <= 0:
             raise ValueError(f'Log base must be greater than 0, not {self.n}')
         self.ln: float = log(self.n)
-        self.priority: int = 5
 
     def f(self, x: number) -> number:
         return log(x, self.n)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.log(x) / self.ln
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'log({x}, {_number_source(self.n, names)})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1) / mult_n(self.ln)
 
     def __str__(self) -> str:
@@ -536,17 +650,24 @@ class log_base_n (ArithmeticOpBase):
 
 class log_of_n (ArithmeticOpBase):
     """Returns log_x(n) i.e. the base of the log varies based on the input."""
-    def __init__(self, n: number):
-        super().__init__(n)
+    __slots__ = ('ln',)
+    priority: int = 5
+
+    def _init(self) -> None:
         if self.n <= 0:
             raise ValueError(f'Log argument must be greater than 0, not {self.n}')
         self.ln: float = log(self.n)
-        self.priority: int = 5
 
     def f(self, x: number) -> number:
         return log(self.n, x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.ln / np.log(x)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'log({_number_source(self.n, names)}, {x})'
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(-self.ln) / (identity() * log_base_n(e) ** 2)
     
     def __str__(self) -> str:
@@ -1,5 +1,9 @@
 from __future__ import annotations
-from typing import Callable, Union
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Set, Tuple, Union
+from math import sin, cos, tan, asin, acos, atan, log, isfinite
+from weakref import WeakValueDictionary
+import numpy as np
+from .caching import _DERIVATIVES
 from src.fractions import Fraction
 from ..utilities import number
 
@@ -20,17 +24,64 @@ class ArithmeticOpBase:
     appropriate operators (e.g. +, *). Doing so will return a new function that 
     combines the two given functions appropriately. You can also add numbers and 
     strings to functions. The strings should be parsable expressions.
+
+    Nodes are immutable and interned: constructing a node that is structurally
+    identical to one that is still alive returns the existing object, so equal
+    subtrees are shared and equality checks are usually just pointer comparisons.
     
     Args:
         n (number) : the constant to use in the operation
     """
-    def __init__(self, n: number):
-        self.n: number = n
-        self.priority: int = -1 #higher means it should go first
+    # _compiled and _dag_plan cache the results of compile and evaluate_dag
+    __slots__ = ('n', '_compiled', '_dag_plan', '__weakref__')
+    priority: int = -1 #higher means it should go first
 
     def __new__(cls, n: number):
-        """We define this to allow simplification."""
-        return super(ArithmeticOpBase, cls).__new__(cls)
+        """We define this to allow simplification and interning."""
+        try:
+            key = (cls, type(n), n)
+            o = _INTERNED.get(key)
+        except TypeError:
+            # n is unhashable, so this node can't be shared
+            return cls._make(n)
+        if o is None:
+            o = _INTERNED.setdefault(key, cls._make(n))
+        return o
+
+    @classmethod
+    def _make(cls, n: number) -> ArithmeticOpBase:
+        """Returns a new node holding n.
+
+        Nodes have no __init__, since Python would run it again every time
+        __new__ hands back an existing shared node. They are set up here instead,
+        exactly once, before they can be shared.
+        """
+        o = _new_node(cls)
+        o.n = n
+        o._init()
+        return o
+
+    def _init(self) -> None:
+        """Sets up anything else the node needs from n. Called once, by _make."""
+        pass
+
+    def __eq__(self, other) -> bool:
+        """Returns whether the two functions have the same structure."""
+        if self is other:
+            return True
+        if not isinstance(other, ArithmeticOpBase):
+            return NotImplemented
+        return type(self) is type(other) and type(self.n) is type(other.n) and self.n == other.n
+
+    def __hash__(self) -> int:
+        try:
+            return hash((type(self), type(self.n), self.n))
+        except TypeError:
+            return hash((type(self), type(self.n), float(self.n)))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Pickles the node as a call to its constructor, so unpickling interns it again."""
+        return (type(self), (self.n,))
         
     def f(self, x: number) -> number:
         """Returns the result of the function called on x.
@@ -43,34 +94,245 @@ class ArithmeticOpBase:
         """
         raise NotImplementedError
 
-    def derivative(self) -> str:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        """Returns the result of the function called on every element of x.
+
+        The vectorized counterpart of f, built from NumPy ufuncs. Points outside
+        the domain of the function become nan or inf instead of raising.
+
+        Args:
+        :   x (np.ndarray) : a float array of inputs
+
+        Returns:
+        :   res (np.ndarray) : an array with the same shape as x
+        """
+        raise NotImplementedError
+
+    def evaluate_array(self, x: Any = None, **values: Any) -> np.ndarray:
+        """Evaluates the function over a whole array at once.
+
+        Much faster than mapping the function over x, since each node in the
+        expression tree does a single ufunc call instead of one call per element.
+
+        Args:
+        :   x (array-like) : the inputs to pass to the function
+        :   values (array-like) : the inputs for the other variables, if there are any
+
+        Returns:
+        :   res (np.ndarray) : a float array with the same shape as the inputs
+        """
+        if values or isinstance(x, Mapping):
+            x, env = _split_env(x, values)
+            arrays = {name : np.asarray(value, dtype=float) for name, value in env.items()}
+            return self.evaluate_dag(None if x is None else np.asarray(x, dtype=float), **arrays)
+        return self.f_array(np.asarray(x, dtype=float))
+
+    def evaluate_dag(self, x: Any = None, **values: Any) -> Union[number, np.ndarray]:
+        """Evaluates the function, computing each distinct subtree only once.
+
+        Derivative trees reuse the same subtrees many times (e.g. f and g in the
+        quotient rule), and plain evaluation recomputes them at every use. This
+        builds a schedule of the distinct subtrees once and caches it, then each
+        call fills a table of values in a single pass. Works on numbers or NumPy arrays.
+
+        Args:
+        :   x (number | np.ndarray | Mapping) : the input to the function, or a
+                mapping from variable names to values
+        :   values (number | np.ndarray) : the values of the other variables
+
+        Returns:
+        :   res (number | np.ndarray) : the output of the function
+        """
+        if self._dag_plan is None:
+            from .dag import plan_dag
+            self._dag_plan = plan_dag(self)
+        if values or isinstance(x, Mapping):
+            return self._dag_plan(*_split_env(x, values))
+        return self._dag_plan(x)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        """Returns a Python expression computing f, with x being the source of the input.
+
+        Any values that can't be written as literals are added to names, which
+        becomes the globals of the compiled function.
+        """
+        raise NotImplementedError
+
+    def compile(self) -> Callable[[number], number]:
+        """Returns a plain Python function with the same output as this one.
+
+        The whole expression tree is turned into a single lambda and compiled once,
+        so calling the result does no per-node dispatch. The function is cached, so
+        calling compile again is free. Trees too deep for the Python compiler fall
+        back to the regular evaluation. The values of variables other than x are
+        passed to the compiled function as keywords.
+
+        Args:
+        :   None
+
+        Returns:
+        :   func (function (number -> number)) : a function that computes f
+        """
+        if self._compiled is None:
+            names = dict(_COMPILE_GLOBALS)
+            try:
+                src = f'lambda x = None, **_env: {self._source("x", names)}'
+                self._compiled = eval(compile(src, '<ArithmeticOpBase>', 'eval'), names)
+            except (SyntaxError, RecursionError, MemoryError):
+                self._compiled = self.f
+        return self._compiled
+
+    def derivative(self, var: str = 'x') -> str:
         """Returns a string form of the derivative of this function.
 
         Formatted as an expression (i.e. no 'f(x) = ') for recursive reasons.
         
         Args:
-        :   None
+        :   var (str) : the variable to differentiate with respect to
 
         Returns:
         :   f_prime (str) : the symbolic derivative as a string
         """
-        return str(self.f_prime())
+        return str(self.f_prime(var))
+
+    def __call__(self, x: Any = None, **values: Any) -> number:
+        """Allows the object to pretend to be a function. Returns f(x).
 
-    def __call__(self, x: number) -> number:
-        """Allows the object to pretend to be a function. Returns f(x)."""
+        Functions of several variables are given the value of each one, as
+        keywords or as a mapping e.g. f(x = 1, y = 2) or f({'x' : 1, 'y' : 2}).
+        """
+        if values or isinstance(x, Mapping):
+            return self.evaluate_dag(x, **values)
         return self.f(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_prime(self, var: str = 'x') -> ArithmeticOpBase:
         """Returns a function that returns the instantaneous slope at x.
+
+        The derivative is run through simplify so that repeated differentiation
+        doesn't make the tree grow exponentially. Derivatives are cached, so
+        differentiating the same function again (or calling derivative after
+        f_prime) is a lookup. See set_derivative_cache_size and
+        clear_derivative_cache to bound or reset the cache.
         
         Args:
-        :   None
+        :   var (str) : the variable to differentiate with respect to, for
+                functions of several variables
 
         Returns:
         :   derivative (ArithmeticBaseOp) : a function that computes the derivative
         """
+        res = _DERIVATIVES.get((self, var))
+        if res is None:
+            from .simplify import simplify
+            res = simplify(self._f_prime() if var == 'x' else self._partial(var))
+            _DERIVATIVES.put((self, var), res)
+        return res
+
+    def _f_prime(self) -> ArithmeticOpBase:
+        """Computes the derivative without looking at the cache."""
         raise NotImplementedError
 
+    def _partial(self, var: str) -> ArithmeticOpBase:
+        """Computes the derivative with respect to var, a variable other than x."""
+        from .arithmetic import const
+        return const(0)
+
+    def variables(self) -> Set[str]:
+        """Returns the names of the variables the function depends on.
+
+        Args:
+        :   None
+
+        Returns:
+        :   names (set) : the names of the variables, including 'x' for the input
+        """
+        from .combos import TwoFunctionsBase, chain
+        from .arithmetic import const, variable
+        found: Dict[int, Set[str]] = {}
+        work: List[Tuple[Any, bool]] = [(self, False)]
+        while work:
+            node, expanded = work.pop()
+            if id(node) in found:
+                continue
+            if isinstance(node, const):
+                found[id(node)] = set()
+            elif isinstance(node, variable):
+                found[id(node)] = {node.n}
+            elif not isinstance(node, TwoFunctionsBase):
+                found[id(node)] = {'x'}
+            elif not expanded:
+                work.append((node, True))
+                work.append((node.second, False))
+                work.append((node.first, False))
+            elif type(node) is chain:
+                # the x in first is replaced by second
+                found[id(node)] = (found[id(node.first)] - {'x'}) | found[id(node.second)]
+            else:
+                found[id(node)] = found[id(node.first)] | found[id(node.second)]
+        return found[id(self)]
+
+    def gradient(self) -> Dict[str, ArithmeticOpBase]:
+        """Returns the partial derivative with respect to each variable of the function.
+
+        Args:
+        :   None
+
+        Returns:
+        :   partials (dict) : maps the name of each variable to the derivative
+                with respect to it
+        """
+        return {var : self.f_prime(var) for var in sorted(self.variables())}
+
+    def nth_derivative(self, n: int, var: str = 'x') -> ArithmeticOpBase:
+        """Returns the nth derivative of this function.
+
+        Each step goes through the derivative cache, so asking for a higher
+        derivative of the same function reuses all the lower ones.
+
+        Args:
+        :   n (int) : how many times to differentiate, at least 0
+        :   var (str) : the variable to differentiate with respect to
+
+        Returns:
+        :   derivative (ArithmeticOpBase) : a function that computes the nth derivative
+        """
+        if n < 0:
+            raise ValueError(f'Cannot take a negative number of derivatives: {n}')
+        res = self
+        for _ in range(n):
+            res = res.f_prime(var)
+        return res
+
+    def to_bytes(self) -> bytes:
+        """Returns a compact binary encoding of this function, readable by from_bytes.
+
+        Unlike Program.to_bytes this keeps the whole tree, including exact int and
+        Fraction constants, so precomputed derivatives can be stored on disk and
+        loaded again without parsing or differentiating them.
+
+        Args:
+        :   None
+
+        Returns:
+        :   data (bytes) : the encoded function
+        """
+        from .serialize import tree_to_bytes
+        return tree_to_bytes(self)
+
+    @staticmethod
+    def from_bytes(data: Any) -> ArithmeticOpBase:
+        """Reads a function written by to_bytes.
+
+        Args:
+        :   data (bytes | memoryview | mmap) : the encoded function, which can be
+                a slice of a memory-mapped file
+
+        Returns:
+        :   func (ArithmeticOpBase) : the decoded function
+        """
+        from .serialize import tree_from_bytes
+        return tree_from_bytes(data)
+
     def __str__(self) -> str:
         """Returns string representation of expression."""
         raise NotImplementedError
@@ -139,43 +401,123 @@ class ArithmeticOpBase:
 
     def __add__(self, other: operator_input) -> ArithmeticOpBase: 
         s = self._simple_add(other)
-        if s: return s
+        if s:
+            if _RULE_COUNTERS: _count_rule(self, '_simple_add')
+            return s
         from .combos import f_plus_g
         return self._binop(other, f_plus_g)
 
     def __sub__(self, other: operator_input) -> ArithmeticOpBase:
         s = self._simple_sub(other)
-        if s: return s
+        if s:
+            if _RULE_COUNTERS: _count_rule(self, '_simple_sub')
+            return s
         from .combos import f_minus_g
         return self._binop(other, f_minus_g)
 
     def __mul__(self, other: operator_input) -> ArithmeticOpBase:
         s = self._simple_mul(other)
-        if s: return s
+        if s:
+            if _RULE_COUNTERS: _count_rule(self, '_simple_mul')
+            return s
         from .combos import f_times_g
         return self._binop(other, f_times_g)
 
     def __truediv__(self, other: operator_input) -> ArithmeticOpBase:
         s = self._simple_div(other)
-        if s: return s
+        if s:
+            if _RULE_COUNTERS: _count_rule(self, '_simple_div')
+            return s
         from .combos import f_divided_by_g
         return self._binop(other, f_divided_by_g)
 
     def __pow__(self, other: operator_input) -> ArithmeticOpBase:
         s = self._simple_exp(other)
-        if s: return s
+        if s:
+            if _RULE_COUNTERS: _count_rule(self, '_simple_exp')
+            return s
         from .combos import f_raised_to_g
         return self._binop(other, f_raised_to_g)
 
 class _single_arg (ArithmeticOpBase):
     """Abstract base class for single-argument functions."""
-    def __init__(self):
-        self.priority: int = 5
+    __slots__ = ()
+    _func_name: str = '' #the name of the math function in compiled code
+    priority: int = 5
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return f'{self._func_name}({x})'
 
     def __new__(cls):
-        o = object.__new__(cls)
-        o.__init__()
+        o = _INTERNED.get(cls)
+        if o is None:
+            o = _INTERNED.setdefault(cls, _new_node(cls))
         return o
 
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, ArithmeticOpBase):
+            return NotImplemented
+        return type(self) is type(other)
+
+    def __hash__(self) -> int:
+        return hash(type(self))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), ())
+
+# every live node, keyed by its structure, so identical nodes can be shared
+_INTERNED: WeakValueDictionary[Hashable, ArithmeticOpBase] = WeakValueDictionary()
+
+def _new_node(cls: type) -> Any:
+    """Returns an empty node of type cls, with nothing cached yet."""
+    o = object.__new__(cls)
+    o._compiled = None
+    o._dag_plan = None
+    return o
+
+_COMPILE_GLOBALS: Dict[str, Any] = {
+    'sin' : sin,
+    'cos' : cos,
+    'tan' : tan,
+    'asin' : asin,
+    'acos' : acos,
+    'atan' : atan,
+    'log' : log
+}
+
+# the counters of every active metrics.count_rules block
+_RULE_COUNTERS: List[Any] = []
+
+def _count_rule(op: ArithmeticOpBase, rule: str) -> None:
+    """Records that the simplification method named rule fired on op."""
+    name = getattr(type(op), rule).__qualname__
+    for counts in _RULE_COUNTERS:
+        counts[name] += 1
+
+def _split_env(x: Any, values: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    """Returns the value of x and the values of every variable from the arguments of a call."""
+    if isinstance(x, Mapping):
+        values = {**x, **values}
+        x = None
+    if 'x' in values:
+        x = values['x']
+    return x, values
+
+def _number_source(n: Any, names: Dict[str, Any]) -> str:
+    """Returns a Python expression for the constant n, adding it to names if it has no literal."""
+    if (type(n) is int or type(n) is float) and isfinite(n):
+        return f'({n!r})' if n < 0 else repr(n)
+    name = f'_c{len(names)}'
+    names[name] = n
+    return name
+
+def _temp_name(names: Dict[str, Any]) -> str:
+    """Reserves a unique local variable name for the compiled function."""
+    name = f'_t{len(names)}'
+    names[name] = None
+    return name
+
 simple_return = Union[ArithmeticOpBase, None]
 operator_input = Union[ArithmeticOpBase, int, float, Fraction, str]
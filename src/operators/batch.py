@@ -0,0 +1,114 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Iterable, Iterator, List, NamedTuple, Union
+from .parsing import parse_expr
+from .string_derivative import derivative
+
+class BatchResult (NamedTuple):
+    """The outcome of one expression in a batch.
+
+    Exactly one of value and error is None: value is the result for expr, and
+    error describes what went wrong with it e.g. 'SyntaxError: ...'.
+    """
+    expr: str
+    value: Any
+    error: Union[str, None]
+
+def parse_many(exprs: Iterable[str], workers: int = 1, chunksize: int = 256) -> Iterator[BatchResult]:
+    """Parses every expression in exprs, spread over several processes.
+
+    The expressions are read lazily and handed out to the workers in chunks, and
+    the results come back in the same order as exprs. An expression that fails
+    to parse gets a result with its error instead of stopping the whole batch.
+    The parsed functions are pickled back to this process, so for very large
+    batches derivative_many (which sends back strings) is cheaper.
+
+    Args:
+    :   exprs (iterable) : the expressions to parse
+    :   workers (int) : how many processes to use. 1 or less parses everything
+            in this process
+    :   chunksize (int) : how many expressions to send to a worker at once
+
+    Returns:
+    :   results (iterator) : a BatchResult for each expression, whose value is
+            the parsed function
+    """
+    return _run_batch(_parse_chunk, exprs, (), workers, chunksize)
+
+def derivative_many(exprs: Iterable[str], var: str = 'x', workers: int = 1,
+                    chunksize: int = 256) -> Iterator[BatchResult]:
+    """Finds the derivative of every expression in exprs, spread over several processes.
+
+    Works like parse_many, but the value of each result is the string returned
+    by derivative.
+
+    Args:
+    :   exprs (iterable) : the expressions to differentiate
+    :   var (str) : the variable to differentiate with respect to
+    :   workers (int) : how many processes to use. 1 or less differentiates
+            everything in this process
+    :   chunksize (int) : how many expressions to send to a worker at once
+
+    Returns:
+    :   results (iterator) : a BatchResult for each expression, whose value is
+            the derivative
+    """
+    return _run_batch(_derivative_chunk, exprs, (var,), workers, chunksize)
+
+def _run_batch(func: Callable[..., List[BatchResult]], exprs: Iterable[str], args: tuple,
+               workers: int, chunksize: int) -> Iterator[BatchResult]:
+    """Yields the results of func(chunk, *args) for each chunk of exprs, in order."""
+    if chunksize < 1:
+        raise ValueError(f'chunksize must be at least 1, not {chunksize}')
+    chunks = _chunks(exprs, chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from func(chunk, *args)
+        return
+
+    pool = ProcessPoolExecutor(workers)
+    try:
+        # only a few chunks per worker are in flight, so memory doesn't grow with the input
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk, *args))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures = True)
+
+def _chunks(exprs: Iterable[str], chunksize: int) -> Iterator[List[str]]:
+    """Yields lists of up to chunksize consecutive expressions."""
+    it = iter(exprs)
+    chunk = list(islice(it, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, chunksize))
+
+def _parse_chunk(exprs: List[str]) -> List[BatchResult]:
+    """Parses each expression, catching the errors. Runs in the worker processes."""
+    res: List[BatchResult] = []
+    for expr in exprs:
+        try:
+            res.append(BatchResult(expr, parse_expr(expr), None))
+        except Exception as err:
+            res.append(BatchResult(expr, None, _describe(err)))
+    return res
+
+def _derivative_chunk(exprs: List[str], var: str) -> List[BatchResult]:
+    """Differentiates each expression, catching the errors. Runs in the worker processes."""
+    res: List[BatchResult] = []
+    for expr in exprs:
+        try:
+            res.append(BatchResult(expr, derivative(expr, var), None))
+        except Exception as err:
+            res.append(BatchResult(expr, None, _describe(err)))
+    return res
+
+def _describe(err: Exception) -> str:
+    """Returns the type and message of err, which unlike err itself always pickles."""
+    return f'{type(err).__name__}: {err}'
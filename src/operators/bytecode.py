@@ -0,0 +1,359 @@
+from __future__ import annotations
+from array import array
+from ..admath import log, sin, cos, tan, asin, acos, atan
+from typing import Any, Callable, Dict, List, Tuple, Type, Union
+import operator
+import struct
+import sys
+import numpy as np
+from ..utilities import number
+from .base_arithmetic import ArithmeticOpBase
+from .arithmetic import const, identity, variable, add_n, sub_n, n_sub, mult_n, div_n, n_div
+from .arithmetic import floordiv_n, n_floordiv, exp_n, n_exp, log_base_n, log_of_n
+from .trig_functions import sine, cosine, tangent, arcsine, arccosine, arctangent
+from .combos import chain, f_plus_g, f_minus_g, f_times_g, f_divided_by_g, f_raised_to_g
+
+# opcodes that push a value
+_LOAD_X = 0
+_CONST = 1
+
+# opcodes that replace the top of the stack v with leaf(v), using the operand as n
+_ADD_N = 2
+_SUB_N = 3
+_N_SUB = 4
+_MULT_N = 5
+_DIV_N = 6
+_N_DIV = 7
+_FLOORDIV_N = 8
+_N_FLOORDIV = 9
+_EXP_N = 10
+_N_EXP = 11
+_LOG_BASE_N = 12
+_LOG_OF_N = 13
+_SIN = 14
+_COS = 15
+_TAN = 16
+_ASIN = 17
+_ACOS = 18
+_ATAN = 19
+
+# opcodes that pop r, then replace the top of the stack l with l op r
+_ADD = 20
+_SUB = 21
+_MUL = 22
+_DIV = 23
+_POW = 24
+
+# opcodes that switch the input of the function for chain
+_ENTER = 25 #pops the stack and makes it the new x
+_LEAVE = 26 #restores the previous x
+
+# pushes the value of the variable whose name is at the index in the operand
+_LOAD_VAR = 27
+
+_LEAF_OPS: Dict[Type[ArithmeticOpBase], int] = {
+    add_n : _ADD_N,
+    sub_n : _SUB_N,
+    n_sub : _N_SUB,
+    mult_n : _MULT_N,
+    div_n : _DIV_N,
+    n_div : _N_DIV,
+    floordiv_n : _FLOORDIV_N,
+    n_floordiv : _N_FLOORDIV,
+    exp_n : _EXP_N,
+    n_exp : _N_EXP,
+    log_base_n : _LOG_BASE_N,
+    log_of_n : _LOG_OF_N,
+    sine : _SIN,
+    cosine : _COS,
+    tangent : _TAN,
+    arcsine : _ASIN,
+    arccosine : _ACOS,
+    arctangent : _ATAN
+}
+
+_BINARY_OPS: Dict[Type[ArithmeticOpBase], int] = {
+    f_plus_g : _ADD,
+    f_minus_g : _SUB,
+    f_times_g : _MUL,
+    f_divided_by_g : _DIV,
+    f_raised_to_g : _POW
+}
+
+_unary = Callable[[Any, float], Any]
+
+_SCALAR_UNARY: List[_unary] = [
+    lambda v, n: n + v,
+    lambda v, n: v - n,
+    lambda v, n: n - v,
+    lambda v, n: v * n,
+    lambda v, n: v / n,
+    lambda v, n: n / v,
+    lambda v, n: v // n,
+    lambda v, n: n // v,
+    lambda v, n: v ** n,
+    lambda v, n: n ** v,
+    lambda v, n: log(v, n),
+    lambda v, n: log(n, v),
+    lambda v, n: sin(v),
+    lambda v, n: cos(v),
+    lambda v, n: tan(v),
+    lambda v, n: asin(v),
+    lambda v, n: acos(v),
+    lambda v, n: atan(v)
+]
+
+_ARRAY_UNARY: List[_unary] = [
+    lambda v, n: n + v,
+    lambda v, n: v - n,
+    lambda v, n: n - v,
+    lambda v, n: v * n,
+    lambda v, n: v / n,
+    lambda v, n: n / v,
+    np.floor_divide,
+    lambda v, n: np.floor_divide(n, v),
+    np.power,
+    lambda v, n: np.power(n, v),
+    lambda v, n: np.log(v) / np.log(n),
+    lambda v, n: np.log(n) / np.log(v),
+    lambda v, n: np.sin(v),
+    lambda v, n: np.cos(v),
+    lambda v, n: np.tan(v),
+    lambda v, n: np.arcsin(v),
+    lambda v, n: np.arccos(v),
+    lambda v, n: np.arctan(v)
+]
+
+_SCALAR_BINARY: List[Callable[[Any, Any], Any]] = [
+    operator.add, operator.sub, operator.mul, operator.truediv, operator.pow
+]
+
+_ARRAY_BINARY: List[Callable[[Any, Any], Any]] = [
+    np.add, np.subtract, np.multiply, np.true_divide, np.power
+]
+
+_MAGIC: bytes = b'MLVM'
+_HEADER: struct.Struct = struct.Struct('<4sI')
+_COUNT: struct.Struct = struct.Struct('<I')
+_NAME_LEN: struct.Struct = struct.Struct('<H')
+
+class Program:
+    """A flat postfix form of an operator tree, executed by a small stack machine.
+
+    Opcodes are stored in a byte array and their numeric operands in a parallel
+    array of doubles, so the program is compact, cheap to copy, and can be pickled
+    or turned into bytes and shipped to other processes. Note that every constant
+    is stored as a float, so Fraction constants lose their exactness.
+
+    Args:
+        code (array) : the opcodes, as an array of unsigned bytes
+        args (array) : the operand of each opcode, as an array of doubles
+        names (tuple) : the names of the variables other than x, which _LOAD_VAR
+            refers to by index
+    """
+    def __init__(self, code: array, args: array, names: Tuple[str, ...] = ()):
+        if len(code) != len(args):
+            raise ValueError(f'Program needs one operand per opcode, not {len(args)} for {len(code)}')
+        self.code: array = code
+        self.args: array = args
+        self.names: Tuple[str, ...] = tuple(names)
+
+    def __call__(self, x: Union[number, np.ndarray, None] = None, **values: Any) -> Union[number, np.ndarray]:
+        """Runs the program on x, with the other variables given as keywords. See run_program."""
+        return run_program(self, x, values)
+
+    def __len__(self) -> int:
+        """The number of instructions in the program."""
+        return len(self.code)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Program) and self.code == other.code and \
+            self.args == other.args and self.names == other.names
+
+    def to_bytes(self) -> bytes:
+        """Returns the program as bytes, readable by Program.from_bytes.
+
+        Args:
+        :   None
+
+        Returns:
+        :   data (bytes) : a little-endian encoding of the program
+        """
+        args = self.args
+        if sys.byteorder == 'big':
+            args = array('d', args)
+            args.byteswap()
+        data = _HEADER.pack(_MAGIC, len(self.code)) + self.code.tobytes() + args.tobytes()
+        if not self.names:
+            return data
+        # the names go after the operands, so programs of x alone are encoded as before
+        parts = [data, _COUNT.pack(len(self.names))]
+        for name in self.names:
+            encoded = name.encode('utf-8')
+            parts.append(_NAME_LEN.pack(len(encoded)))
+            parts.append(encoded)
+        return b''.join(parts)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Program:
+        """Reads a program written by Program.to_bytes.
+
+        Args:
+        :   data (bytes) : the encoded program
+
+        Returns:
+        :   program (Program) : the decoded program
+        """
+        magic, length = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError('Not an operator program')
+        start = _HEADER.size
+        code = array('B')
+        code.frombytes(data[start:start + length])
+        args = array('d')
+        args.frombytes(data[start + length:start + length + 8 * length])
+        if len(args) != length:
+            raise ValueError('Truncated operator program')
+        if sys.byteorder == 'big':
+            args.byteswap()
+        names: List[str] = []
+        pos = start + 9 * length
+        if pos < len(data):
+            try:
+                count, = _COUNT.unpack_from(data, pos)
+                pos += _COUNT.size
+                for _ in range(count):
+                    size, = _NAME_LEN.unpack_from(data, pos)
+                    pos += _NAME_LEN.size
+                    if pos + size > len(data):
+                        raise ValueError('Truncated operator program')
+                    names.append(bytes(data[pos:pos + size]).decode('utf-8'))
+                    pos += size
+            except struct.error:
+                raise ValueError('Truncated operator program')
+        return Program(code, args, tuple(names))
+
+def to_program(op: ArithmeticOpBase) -> Program:
+    """Lowers the operator tree into a postfix Program.
+
+    Uses an explicit stack instead of recursion, so arbitrarily deep trees
+    (e.g. from repeated f_prime calls) can be lowered.
+
+    Args:
+    :   op (ArithmeticOpBase) : the function to lower
+
+    Returns:
+    :   program (Program) : a program that computes the same function
+    """
+    code = array('B')
+    args = array('d')
+    names: Dict[str, int] = {}
+    # each item is either a node still to lower or an instruction ready to emit
+    work: List[Union[ArithmeticOpBase, Tuple[int, float]]] = [op]
+    while work:
+        item = work.pop()
+        if isinstance(item, tuple):
+            code.append(item[0])
+            args.append(item[1])
+            continue
+
+        typ = type(item)
+        if typ is const:
+            code.append(_CONST)
+            args.append(float(item.n))
+
+        elif typ is identity:
+            code.append(_LOAD_X)
+            args.append(0.0)
+
+        elif typ is variable:
+            code.append(_LOAD_VAR)
+            args.append(float(names.setdefault(item.n, len(names))))
+
+        elif typ in _LEAF_OPS:
+            code.append(_LOAD_X)
+            args.append(0.0)
+            code.append(_LEAF_OPS[typ])
+            args.append(float(getattr(item, 'n', 0.0)))
+
+        elif typ in _BINARY_OPS:
+            work.append((_BINARY_OPS[typ], 0.0))
+            work.append(item.second)
+            work.append(item.first)
+
+        elif typ is chain:
+            first_typ = type(item.first)
+            if first_typ in _LEAF_OPS:
+                # a leaf can be applied directly to the value of second
+                work.append((_LEAF_OPS[first_typ], float(getattr(item.first, 'n', 0.0))))
+            else:
+                work.append((_LEAVE, 0.0))
+                work.append(item.first)
+                work.append((_ENTER, 0.0))
+            work.append(item.second)
+
+        else:
+            raise ValueError(f'Cannot lower {typ.__name__} to a program')
+
+    return Program(code, args, tuple(names))
+
+def run_program(program: Program, x: Union[number, np.ndarray, None],
+                env: Union[Dict[str, Any], None] = None) -> Union[number, np.ndarray]:
+    """Runs the program on x without any recursion.
+
+    If x is a NumPy array the whole batch is computed at once with ufuncs
+    (invalid points become nan or inf), otherwise it is computed like calling
+    the operator itself, so x can also be a Dual.
+
+    Args:
+    :   program (Program) : the program to run
+    :   x (number | np.ndarray) : the input to the function
+    :   env (dict) : maps the names of the other variables to their values
+
+    Returns:
+    :   res (number | np.ndarray) : the output of the function
+    """
+    env = env or {}
+    if 'x' in env:
+        x = env['x']
+    missing = [name for name in program.names if name not in env]
+    if missing:
+        raise ValueError(f'No value given for variable {missing[0]}')
+    inputs = [env[name] for name in program.names]
+    if x is not None:
+        inputs.append(x)
+    is_array = any(isinstance(value, np.ndarray) for value in inputs)
+    if isinstance(x, np.ndarray):
+        x = x.astype(float, copy = False)
+    unary = _ARRAY_UNARY if is_array else _SCALAR_UNARY
+    binary = _ARRAY_BINARY if is_array else _SCALAR_BINARY
+    stack: List[Any] = []
+    xs: List[Any] = []
+    for op, arg in zip(program.code, program.args):
+        if op == _LOAD_X:
+            if x is None:
+                raise ValueError('No value given for variable x')
+            stack.append(x)
+        elif op == _CONST:
+            stack.append(arg)
+        elif op < _ADD:
+            stack[-1] = unary[op - _ADD_N](stack[-1], arg)
+        elif op < _ENTER:
+            r = stack.pop()
+            stack[-1] = binary[op - _ADD](stack[-1], r)
+        elif op == _ENTER:
+            xs.append(x)
+            x = stack.pop()
+        elif op == _LEAVE:
+            x = xs.pop()
+        elif op == _LOAD_VAR:
+            stack.append(env[program.names[int(arg)]])
+        else:
+            raise ValueError(f'Invalid opcode {op}')
+
+    if len(stack) != 1:
+        raise ValueError(f'Malformed program left {len(stack)} values on the stack')
+    res = stack[0]
+    if is_array and np.ndim(res) == 0:
+        return np.full(np.broadcast_shapes(*(np.shape(value) for value in inputs)), res)
+    return res
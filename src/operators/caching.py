@@ -0,0 +1,174 @@
+from __future__ import annotations
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, NamedTuple, Union
+
+class CacheInfo (NamedTuple):
+    """Statistics about an LRUCache, in the same form as functools.lru_cache."""
+    hits: int
+    misses: int
+    maxsize: Union[int, None]
+    currsize: int
+
+class LRUCache:
+    """A thread-safe mapping that forgets its least recently used entries.
+
+    Args:
+        maxsize (int | None) : how many entries to keep. None means no limit
+            and 0 disables the cache
+    """
+    def __init__(self, maxsize: Union[int, None] = 128):
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock: Lock = Lock()
+        self.maxsize: Union[int, None] = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value stored for key, or default if there isn't one.
+
+        Args:
+        :   key (hashable) : the key to look up
+        :   default (any) : what to return on a miss
+
+        Returns:
+        :   value (any) : the cached value
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Stores value for key, evicting the oldest entries if the cache is full.
+
+        Args:
+        :   key (hashable) : the key to store under
+        :   value (any) : the value to store
+
+        Returns:
+        :   None
+        """
+        with self._lock:
+            if self.maxsize == 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._trim()
+
+    def resize(self, maxsize: Union[int, None]) -> None:
+        """Changes the maximum size, evicting entries if needed.
+
+        Args:
+        :   maxsize (int | None) : the new limit, with None meaning no limit
+
+        Returns:
+        :   None
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def clear(self) -> None:
+        """Removes every entry and resets the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the hit and miss counts along with the size of the cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def _trim(self) -> None:
+        """Evicts the least recently used entries until the cache fits. Needs the lock."""
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last = False)
+
+# maps a function to its derivative
+_DERIVATIVES: LRUCache = LRUCache(10000)
+
+# maps ('parse', text) to the parsed function and ('derivative', text, var) to
+# the string derivative, where text is the expression without whitespace
+_EXPRESSIONS: LRUCache = LRUCache(4096)
+
+def clear_derivative_cache() -> None:
+    """Forgets every cached derivative.
+
+    Args:
+    :   None
+
+    Returns:
+    :   None
+    """
+    _DERIVATIVES.clear()
+
+def set_derivative_cache_size(maxsize: Union[int, None]) -> None:
+    """Bounds how many derivatives are remembered by f_prime.
+
+    Args:
+    :   maxsize (int | None) : the number of derivatives to keep. None means no
+            limit and 0 turns the cache off
+
+    Returns:
+    :   None
+    """
+    _DERIVATIVES.resize(maxsize)
+
+def derivative_cache_info() -> CacheInfo:
+    """Returns the statistics of the derivative cache.
+
+    Args:
+    :   None
+
+    Returns:
+    :   info (CacheInfo) : the hits, misses, maximum size and current size
+    """
+    return _DERIVATIVES.info()
+
+def clear_expression_cache() -> None:
+    """Forgets every cached result of parse_expr and derivative.
+
+    Args:
+    :   None
+
+    Returns:
+    :   None
+    """
+    _EXPRESSIONS.clear()
+
+def set_expression_cache_size(maxsize: Union[int, None]) -> None:
+    """Bounds how many expression strings parse_expr and derivative remember.
+
+    Args:
+    :   maxsize (int | None) : the number of results to keep. None means no
+            limit and 0 turns the cache off
+
+    Returns:
+    :   None
+    """
+    _EXPRESSIONS.resize(maxsize)
+
+def expression_cache_info() -> CacheInfo:
+    """Returns the statistics of the cache used by parse_expr and derivative.
+
+    Args:
+    :   None
+
+    Returns:
+    :   info (CacheInfo) : the hits, misses, maximum size and current size
+    """
+    return _EXPRESSIONS.info()
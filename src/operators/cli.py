@@ -0,0 +1,133 @@
+"""Differentiates expressions read line by line from files or stdin.
+
+Run with python -m src.operators.cli, see --help for the options. Each line
+holds one expression and gets exactly one line of output, in the same order,
+so the output can be pasted next to the input. Blank lines get a blank line
+of output (or an object with just the empty expr in JSON), and lines that fail
+get an error message instead of stopping the run.
+"""
+from __future__ import annotations
+import argparse
+import fileinput
+import json
+import math
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Sequence, TextIO, Union
+import numpy as np
+from .batch import BatchResult, _run_batch, _describe
+from .parsing import parse_expr
+from .parsing.parser import _input_var
+
+def main(argv: Union[Sequence[str], None] = None, out: TextIO = sys.stdout, err: TextIO = sys.stderr) -> int:
+    """Runs the command line tool.
+
+    Args:
+    :   argv (list) : the command line arguments, not including the program name.
+            Defaults to sys.argv
+    :   out (file) : where to write the results
+    :   err (file) : where to write the statistics
+
+    Returns:
+    :   status (int) : 0 if every expression worked, otherwise 1
+    """
+    args = _parser().parse_args(argv)
+    grid = None
+    if args.grid is not None:
+        start, stop, num = args.grid
+        if num != int(num) or num < 1:
+            raise SystemExit(f'The number of grid points must be a positive integer, not {num}')
+        grid = np.linspace(start, stop, int(num))
+
+    count = errors = 0
+    began = time.perf_counter()
+    lines = _read_lines(args.files)
+    try:
+        for res in _run_batch(_process_chunk, lines, (args.var, args.order, grid),
+                              args.workers, args.chunksize):
+            if res.expr:
+                count += 1
+            if res.error is not None:
+                errors += 1
+            out.write(_format(res, grid is not None, args.format))
+            out.write('\n')
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head), which isn't an error
+        return 0
+    elapsed = time.perf_counter() - began
+    if not args.quiet:
+        rate = count / elapsed if elapsed > 0 else math.inf
+        err.write(f'{count} expressions ({errors} errors) in {elapsed:.3f}s, {rate:.1f} per second\n')
+    return 1 if errors else 0
+
+def _parser() -> argparse.ArgumentParser:
+    """Returns the parser for the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog = 'python -m src.operators.cli',
+        description = 'Differentiates one expression per line, from files or stdin.'
+    )
+    parser.add_argument('files', nargs = '*', help = 'files to read, with - or nothing meaning stdin')
+    parser.add_argument('--var', default = 'x', help = 'the variable to differentiate with respect to')
+    parser.add_argument('--order', type = int, default = 1,
+                        help = 'how many times to differentiate, with 0 meaning the expression itself')
+    parser.add_argument('--grid', type = float, nargs = 3, metavar = ('START', 'STOP', 'NUM'),
+                        help = 'evaluate the result at NUM evenly spaced points instead of printing it')
+    parser.add_argument('--format', choices = ['text', 'json'], default = 'text',
+                        help = 'plain lines, or one JSON object per line')
+    parser.add_argument('--workers', type = int, default = 1, help = 'how many processes to use')
+    parser.add_argument('--chunksize', type = int, default = 256,
+                        help = 'how many lines to send to a worker at once')
+    parser.add_argument('--quiet', action = 'store_true', help = "don't print statistics to stderr")
+    return parser
+
+def _read_lines(files: List[str]) -> Iterator[str]:
+    """Yields the lines of the files one at a time, without their newlines or surrounding whitespace."""
+    with fileinput.input(files or ('-',)) as lines:
+        for line in lines:
+            yield line.strip()
+
+def _process_chunk(exprs: List[str], var: str, order: int, grid: Union[np.ndarray, None]) -> List[BatchResult]:
+    """Differentiates each expression and evaluates it on grid if given. Runs in the worker processes."""
+    res: List[BatchResult] = []
+    for expr in exprs:
+        if not expr:
+            # keeps the output lined up with the input
+            res.append(BatchResult(expr, None, None))
+            continue
+        try:
+            func = parse_expr(expr).nth_derivative(order, _input_var(expr, var))
+            if grid is None:
+                value: Any = str(func)
+            else:
+                with np.errstate(all = 'ignore'):
+                    value = func.evaluate_array(grid).tolist()
+            res.append(BatchResult(expr, value, None))
+        except Exception as e:
+            res.append(BatchResult(expr, None, _describe(e)))
+    return res
+
+def _format(res: BatchResult, is_grid: bool, fmt: str) -> str:
+    """Returns the line of output for res."""
+    if fmt == 'json':
+        record: Dict[str, Any] = {'expr' : res.expr}
+        if res.error is not None:
+            record['error'] = res.error
+        elif not res.expr:
+            pass
+        elif is_grid:
+            # JSON has no nan or infinity
+            record['values'] = [v if math.isfinite(v) else None for v in res.value]
+        else:
+            record['derivative'] = res.value
+        return json.dumps(record)
+
+    if res.error is not None:
+        return f'error: {res.error}'
+    if not res.expr:
+        return ''
+    if is_grid:
+        return ' '.join(map(repr, res.value))
+    return res.value
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,12 @@
 from __future__ import annotations
-from typing import Tuple, Any
+from typing import Tuple, Any, Dict, List, Mapping, Union
+import numpy as np
 from ..utilities import number
 
-from .arithmetic import mult_n, const, identity, log_base_n
-from .base_arithmetic import ArithmeticOpBase, simple_return, operator_input
+from .arithmetic import mult_n, const, identity, log_base_n, variable
+from .base_arithmetic import ArithmeticOpBase, simple_return, operator_input, _temp_name, _INTERNED, _new_node
+from .base_arithmetic import _RULE_COUNTERS, _count_rule
+from .caching import _DERIVATIVES
 from math import e
 
 class TwoFunctionsBase (ArithmeticOpBase):
@@ -15,42 +18,169 @@ class TwoFunctionsBase (ArithmeticOpBase):
         second (ArithmeticOpBase) : an object derived from ArithmeticOpBase which 
             acts as the second function
     """
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        self.first: ArithmeticOpBase = first
-        self.second: ArithmeticOpBase = second
+    __slots__ = ('first', 'second', '_hash')
+    _op_str: str = '' #the operator written between first and second
 
     def __new__(cls, f, g):
-        o = object.__new__(cls)
-        o.__init__(f, g)
+        """Returns the interned node for f and g, without simplifying."""
+        key = (cls, f, g)
+        o = _INTERNED.get(key)
+        if o is None:
+            o = _new_node(cls)
+            o.first = f
+            o.second = g
+            o._hash = hash(key)
+            o = _INTERNED.setdefault(key, o)
         return o
 
-    def _fg_str(self) -> Tuple[str, str]:
-        """Returns how f and g should be represented as strings, with parenthesis and such."""
-        res = []
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArithmeticOpBase):
+            return NotImplemented
+        # compares pairs of subtrees with an explicit stack, so deep trees are fine
+        pairs = [(self, other)]
+        while pairs:
+            a, b = pairs.pop()
+            if a is b:
+                continue
+            if not isinstance(a, TwoFunctionsBase):
+                if a != b:
+                    return False
+                continue
+            if type(a) is not type(b) or a._hash != b._hash:
+                return False
+            pairs.append((a.second, b.second))
+            pairs.append((a.first, b.first))
+        return True
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Pickles the tree as a flat list of its distinct nodes. See _flatten."""
+        return (_unflatten, (_flatten(self),))
+
+    def __call__(self, x: Any = None, **values: Any) -> number:
+        """Returns f(x), evaluated without recursion. See evaluate_dag."""
+        return self.evaluate_dag(x, **values)
+
+    def evaluate_array(self, x: Any = None, **values: Any) -> np.ndarray:
+        if values or isinstance(x, Mapping):
+            return super().evaluate_array(x, **values)
+        return self.evaluate_dag(np.asarray(x, dtype=float))
+
+    def f_prime(self, var: str = 'x') -> ArithmeticOpBase:
+        """Returns a function that returns the instantaneous slope at x.
+
+        Works like ArithmeticOpBase.f_prime, but differentiates the subtrees bottom
+        up with an explicit stack instead of recursing, so the depth of the tree is
+        only limited by memory. Cached derivatives of subtrees are reused, and the
+        result is simplified once as a whole rather than at every level.
+
+        Args:
+        :   var (str) : the variable to differentiate with respect to, for
+                functions of several variables
+
+        Returns:
+        :   derivative (ArithmeticBaseOp) : a function that computes the derivative
+        """
+        res = _DERIVATIVES.get((self, var))
+        if res is not None:
+            return res
+        from .simplify import simplify
+        done: Dict[Tuple[int, str], ArithmeticOpBase] = {}
+        work: List[Tuple[ArithmeticOpBase, str, bool]] = [(self, var, False)]
+        while work:
+            node, v, expanded = work.pop()
+            key = (id(node), v)
+            if key in done:
+                continue
+            if not isinstance(node, TwoFunctionsBase):
+                done[key] = node.f_prime(v)
+            elif expanded:
+                done[key] = node._partial_from(v, done)
+            else:
+                res = _DERIVATIVES.get((node, v))
+                if res is not None:
+                    done[key] = res
+                    continue
+                work.append((node, v, True))
+                work.append((node.second, v, False))
+                work.append((node.first, v, False))
+                if type(node) is chain and v != 'x':
+                    work.append((node.first, 'x', False))
+        res = simplify(done[(id(self), var)])
+        _DERIVATIVES.put((self, var), res)
+        return res
+
+    def _partial_from(self, var: str, done: Dict[Tuple[int, str], ArithmeticOpBase]) -> ArithmeticOpBase:
+        """Returns the derivative with respect to var, given those of first and second in done."""
+        return self._fg_prime(done[(id(self.first), var)], done[(id(self.second), var)])
+
+    def _f_prime(self) -> ArithmeticOpBase:
+        return self._fg_prime(self.first.f_prime(), self.second.f_prime())
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        """Returns the derivative, given fp and gp, the derivatives of first and second."""
+        raise NotImplementedError
+
+    def __str__(self) -> str:
+        """Returns string representation of expression. See _render."""
+        return _render(self)
+
+    def _str_pieces(self) -> List[Union[str, ArithmeticOpBase]]:
+        """Returns the text of this function, with first and second in place of their strings."""
+        pieces: List[Union[str, ArithmeticOpBase]] = []
         for func in [self.first, self.second]:
-            f_str = str(func)
-            res.append(f'({f_str})' if func.priority < self.priority else f_str)
-        return res[0], res[1]
+            priority = _str_priority(func)
+            if pieces:
+                pieces.append(self._op_str)
+                # a - (b - c) and a / (b / c) need their parenthesis too
+                if priority == self.priority and self._op_str in (' - ', ' / '):
+                    priority -= 1
+            if priority < self.priority:
+                pieces += ['(', func, ')']
+            else:
+                pieces.append(func)
+        return pieces
+
+    def _fg_source(self, x: str, names: Dict[str, Any], op: str) -> str:
+        """Returns the compiled source for first(x) op second(x)."""
+        return f'({self.first._source(x, names)} {op} {self.second._source(x, names)})'
 
 class chain (TwoFunctionsBase):
     """Returns first(second(x)), with arbitrary functions first and second."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 5
+    __slots__ = ()
+    priority: int = 5
 
     def f(self, x: number) -> number:
         return self.first(self.second(x))
 
-    def f_prime(self) -> ArithmeticOpBase:
-        return chain(self.first.f_prime(), self.second) * self.second.f_prime()
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.first.f_array(self.second.f_array(x))
 
-    def __str__(self) -> str:
-        return str(self.first).replace('x', str(self.second))
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        inner = self.second._source(x, names)
+        if not isinstance(self.first, TwoFunctionsBase):
+            return self.first._source(inner, names)
+        # first may use its input many times, so compute second once and store it
+        tmp = _temp_name(names)
+        return f'(({tmp} := {inner}), {self.first._source(tmp, names)})[1]'
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        return chain(fp, self.second) * gp
+
+    def _partial_from(self, var: str, done: Dict[Tuple[int, str], ArithmeticOpBase]) -> ArithmeticOpBase:
+        if var == 'x':
+            return super()._partial_from(var, done)
+        # second is only substituted for x, so the other variables of first count too
+        return chain(done[(id(self.first), 'x')], self.second) * done[(id(self.second), var)] + \
+            chain(done[(id(self.first), var)], self.second)
 
     def __new__(cls, f, g):
-        if _isnum(f):
+        if _isnum(f) or isinstance(f, variable):
             return f
-        if _isnum(g):
+        if _isnum(g) and f.variables() <= {'x'}:
+            # f can only be folded into a number if it has no other variables
             return const(f(g.n))
         if isinstance(f, identity):
             return g
@@ -58,120 +188,239 @@ class chain (TwoFunctionsBase):
 
 class f_plus_g (TwoFunctionsBase):
     """Returns first(x) + second(x)."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 0
+    __slots__ = ()
+    _op_str: str = ' + '
+    priority: int = 0
 
     def f(self, x: number) -> number:
         return self.first(x) + self.second(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
-        return self.first.f_prime() + self.second.f_prime()
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.first.f_array(x) + self.second.f_array(x)
 
-    def __str__(self) -> str:
-        f_str, g_str = self._fg_str()
-        return f'{f_str} + {g_str}'
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return self._fg_source(x, names, '+')
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        return fp + gp
 
     def __new__(cls, f, g):
         s = f._simple_add(g)
-        return super(f_plus_g, cls).__new__(cls, f, g) if s is None else s
+        if s is None:
+            return super(f_plus_g, cls).__new__(cls, f, g)
+        if _RULE_COUNTERS: _count_rule(f, '_simple_add')
+        return s
 
 class f_minus_g (TwoFunctionsBase):
     """Returns first(x) - second(x)."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 1
+    __slots__ = ()
+    _op_str: str = ' - '
+    priority: int = 1
 
     def f(self, x: number) -> number:
         return self.first(x) - self.second(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
-        return self.first.f_prime() - self.second.f_prime()
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.first.f_array(x) - self.second.f_array(x)
 
-    def __str__(self) -> str:
-        f_str, g_str = self._fg_str()
-        return f'{f_str} - {g_str}'
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return self._fg_source(x, names, '-')
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        return fp - gp
 
     def __new__(cls, f, g):
         s = f._simple_sub(g)
-        return super(f_minus_g, cls).__new__(cls, f, g) if s is None else s
+        if s is None:
+            return super(f_minus_g, cls).__new__(cls, f, g)
+        if _RULE_COUNTERS: _count_rule(f, '_simple_sub')
+        return s
 
 class f_times_g (TwoFunctionsBase):
     """Returns first(x) * second(x)."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 2
+    __slots__ = ()
+    _op_str: str = ' * '
+    priority: int = 2
 
     def f(self, x: number) -> number:
         return self.first(x) * self.second(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
-        return self.first.f_prime() * self.second + self.first * self.second.f_prime()
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.first.f_array(x) * self.second.f_array(x)
 
-    def __str__(self) -> str:
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return self._fg_source(x, names, '*')
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        return fp * self.second + self.first * gp
+
+    def _str_pieces(self) -> List[Union[str, ArithmeticOpBase]]:
         both = [self.first, self.second]
         for i in range(len(both)):
             if _isnum(both[i]):
                 if both[i].n == 1:
-                    return str(both[1 - i])
+                    return [both[1 - i]]
                 if both[i].n == -1:
-                    return f'-({str(both[1 - i])})'
-                return f'{both[i].n}({str(both[1 - i])})'
-        
-        f_str, g_str = self._fg_str()
-        return f'{f_str} * {g_str}'
+                    return ['-(', both[1 - i], ')']
+                return [f'{both[i].n}(', both[1 - i], ')']
+        return super()._str_pieces()
 
     def __new__(cls, f, g):
         s = f._simple_mul(g)
-        return super(f_times_g, cls).__new__(cls, f, g) if s is None else s
+        if s is None:
+            return super(f_times_g, cls).__new__(cls, f, g)
+        if _RULE_COUNTERS: _count_rule(f, '_simple_mul')
+        return s
 
 class f_divided_by_g (TwoFunctionsBase):
     """Returns first(x) / second(x)."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 3
+    __slots__ = ()
+    _op_str: str = ' / '
+    priority: int = 3
 
     def f(self, x: number) -> number:
         return self.first(x) / self.second(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
-        # TODO : why can't we change the denominator to self.second ** 2?
-        return ((self.first.f_prime() * self.second - self.first * self.second.f_prime()) /
-                (self.second * self.second))
-                              
-    def __str__(self) -> str:
-        f_str, g_str = self._fg_str()
-        return f'{f_str} / {g_str}'
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return self.first.f_array(x) / self.second.f_array(x)
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return self._fg_source(x, names, '/')
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
+        return (fp * self.second - self.first * gp) / (self.second ** 2)
 
     def __new__(cls, f, g):
         s = f._simple_div(g)
-        return super(f_divided_by_g, cls).__new__(cls, f, g) if s is None else s
+        if s is None:
+            return super(f_divided_by_g, cls).__new__(cls, f, g)
+        if _RULE_COUNTERS: _count_rule(f, '_simple_div')
+        return s
 
 class f_raised_to_g (TwoFunctionsBase):
     """Returns first(x) ** second(x)."""
-    def __init__(self, first: ArithmeticOpBase, second: ArithmeticOpBase):
-        super().__init__(first, second)
-        self.priority: int = 4
+    __slots__ = ()
+    _op_str: str = ' ^ '
+    priority: int = 4
 
     def f(self, x: number) -> number:
         return self.first(x) ** self.second(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.power(self.first.f_array(x), self.second.f_array(x))
+
+    def _source(self, x: str, names: Dict[str, Any]) -> str:
+        return self._fg_source(x, names, '**')
+
+    def _fg_prime(self, fp: ArithmeticOpBase, gp: ArithmeticOpBase) -> ArithmeticOpBase:
         fx = self.first
-        fpx = self.first.f_prime()
         gx = self.second
-        gpx = self.second.f_prime()
-        return fx ** gx * (gpx * chain(log_base_n(e), fx) + gx * (fpx / fx))
-
-    def __str__(self) -> str:
-        f_str, g_str = self._fg_str()
-        return f'{f_str} ^ {g_str}'
+        if _isnum(gx):
+            # the general rule below takes ln(fx), which is undefined for fx <= 0
+            return const(gx.n) * fx ** (gx.n - 1) * fp
+        return fx ** gx * (gp * chain(log_base_n(e), fx) + gx * (fp / fx))
 
     def __new__(cls, f, g):
         if isinstance(f, const) and isinstance(g, log_base_n) and f.n == g.n:
             return identity()
         s = f._simple_exp(g)
-        return super(f_raised_to_g, cls).__new__(cls, f, g) if s is None else s
+        if s is None:
+            return super(f_raised_to_g, cls).__new__(cls, f, g)
+        if _RULE_COUNTERS: _count_rule(f, '_simple_exp')
+        return s
+
+def _render(op: ArithmeticOpBase) -> str:
+    """Returns the string of op, built in one pass into a single list of pieces.
+
+    Walks the tree with an explicit stack, so it takes time linear in the length
+    of the output and works for trees of any depth. A chain renders first with
+    each x in it standing for second, instead of building the string of first
+    and replacing the x's afterwards. The substituted function is put in
+    parenthesis when it would otherwise bind to the wrong operator, unless the
+    x already sits inside parenthesis like in sin(x).
+    """
+    parts: List[str] = []
+    # items are text ready to output, or (node, env), where env is None when x is
+    # just x, or else (function, env) to render in place of x
+    work: List[Any] = [(op, None)]
+    while work:
+        item = work.pop()
+        if type(item) is str:
+            parts.append(item)
+            continue
+        node, env = item
+        if type(node) is chain:
+            work.append((node.first, (node.second, env)))
+        elif isinstance(node, TwoFunctionsBase):
+            for piece in reversed(node._str_pieces()):
+                work.append(piece if type(piece) is str else (piece, env))
+        elif env is None or not isinstance(node, ArithmeticOpBase):
+            parts.append(str(node))
+        else:
+            text = str(node)
+            if text.count('x') != 1:
+                # no single slot for the input, e.g. a constant
+                parts.append(text)
+                continue
+            prefix, suffix = text.split('x')
+            inner, inner_env = env
+            if not prefix and not suffix:
+                paren = False
+            elif prefix.endswith('(') and suffix.startswith(')'):
+                paren = False
+            elif not prefix and suffix.startswith(' '):
+                # the left side of a binary operator, like x + n
+                paren = _str_priority(inner) < node.priority
+            else:
+                paren = _str_priority(inner) < 5
+            parts.append(prefix + '(' if paren else prefix)
+            work.append(')' + suffix if paren else suffix)
+            work.append((inner, inner_env))
+    return ''.join(parts)
+
+def _flatten(op: TwoFunctionsBase) -> List[Any]:
+    """Returns the distinct nodes of op in postorder, for pickling.
+
+    Leaves are kept as they are, and each combinator becomes a tuple of its type
+    and the indices of its two functions in the list, so there is no nesting for
+    pickle to recurse into and shared subtrees are only stored once. The root is
+    the last item.
+    """
+    items: List[Any] = []
+    index: Dict[int, int] = {}
+    work: List[Tuple[Any, bool]] = [(op, False)]
+    while work:
+        node, expanded = work.pop()
+        if id(node) in index:
+            continue
+        if not isinstance(node, TwoFunctionsBase):
+            items.append(node)
+        elif expanded:
+            items.append((type(node), index[id(node.first)], index[id(node.second)]))
+        else:
+            work.append((node, True))
+            work.append((node.second, False))
+            work.append((node.first, False))
+            continue
+        index[id(node)] = len(items) - 1
+    return items
+
+def _unflatten(items: List[Any]) -> TwoFunctionsBase:
+    """Rebuilds the tree written by _flatten, without simplifying it again."""
+    built: List[Any] = []
+    for item in items:
+        if isinstance(item, tuple):
+            typ, first, second = item
+            built.append(TwoFunctionsBase.__new__(typ, built[first], built[second]))
+        else:
+            built.append(item)
+    return built[-1]
+
+def _str_priority(func: Any) -> int:
+    """Returns the priority of the operation written outermost in the string of func."""
+    while type(func) is chain:
+        func = func.first
+    return getattr(func, 'priority', 5)
 
 def _isnum(func: Any) -> bool:
     """Returns whether func is a constant number."""
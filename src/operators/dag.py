@@ -0,0 +1,150 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Tuple, Type, Union
+import operator
+import numpy as np
+from ..utilities import number
+from .base_arithmetic import ArithmeticOpBase
+from .arithmetic import const, identity, variable
+from .combos import TwoFunctionsBase, chain, f_plus_g, f_minus_g, f_times_g, f_divided_by_g, f_raised_to_g
+
+# kinds of steps
+_CONST = 0
+_LEAF = 1
+_BINARY = 2
+_VAR = 3
+
+_BINARY_FUNCS: Dict[Type[TwoFunctionsBase], Callable[[Any, Any], Any]] = {
+    f_plus_g : operator.add,
+    f_minus_g : operator.sub,
+    f_times_g : operator.mul,
+    f_divided_by_g : operator.truediv,
+    f_raised_to_g : operator.pow
+}
+
+_step = Tuple[int, Any, Any, int, int]
+
+class DagPlan:
+    """A straight-line schedule that evaluates every distinct subtree exactly once.
+
+    The value table starts with the input in slot 0, and each step appends one
+    value computed from earlier slots. A subtree that appears several times in
+    the tree (e.g. f and g in the quotient rule) is scheduled once per input it
+    is applied to, and its slot is reused everywhere else. Variables other than
+    x are read from the values passed in when the plan is called.
+
+    Args:
+        steps (list) : tuples of (kind, scalar function, array function, slot, slot)
+        result (int) : the slot holding the output of the whole function
+    """
+    def __init__(self, steps: List[_step], result: int):
+        self.steps: List[_step] = steps
+        self.result: int = result
+        # whether the input in slot 0 is ever read
+        self.uses_x: bool = result == 0 or any(
+            (kind == _LEAF and a == 0) or (kind == _BINARY and 0 in (a, b)) for kind, _, _, a, b in steps)
+
+    def __len__(self) -> int:
+        """The number of values computed per evaluation."""
+        return len(self.steps)
+
+    def __call__(self, x: Union[number, np.ndarray, None], env: Union[Dict[str, Any], None] = None) -> Union[number, np.ndarray]:
+        """Evaluates the function at x, or over a whole NumPy array of inputs.
+
+        env maps the names of the other variables to their values, which can be
+        numbers or arrays that broadcast with x.
+        """
+        if x is None and self.uses_x:
+            raise ValueError('No value given for variable x')
+        inputs = [x] if env is None else [x, *env.values()]
+        is_array = any(isinstance(value, np.ndarray) for value in inputs)
+        if isinstance(x, np.ndarray):
+            x = x.astype(float, copy = False)
+        vals: List[Any] = [x]
+        for kind, scalar_func, array_func, a, b in self.steps:
+            if kind == _LEAF:
+                vals.append(array_func(vals[a]) if is_array else scalar_func(vals[a]))
+            elif kind == _BINARY:
+                vals.append(scalar_func(vals[a], vals[b]))
+            elif kind == _VAR:
+                if env is None or scalar_func not in env:
+                    raise ValueError(f'No value given for variable {scalar_func}')
+                vals.append(env[scalar_func])
+            else:
+                vals.append(scalar_func)
+        res = vals[self.result]
+        if is_array and np.ndim(res) == 0:
+            shape = np.broadcast_shapes(*(np.shape(value) for value in inputs if value is not None))
+            return np.full(shape, res, dtype = float)
+        return res
+
+def plan_dag(op: ArithmeticOpBase) -> DagPlan:
+    """Builds the DagPlan for op.
+
+    Subtrees are matched by identity, which finds every structurally identical
+    subtree since operator nodes are interned. Uses an explicit stack, so deep
+    trees are fine.
+
+    Args:
+    :   op (ArithmeticOpBase) : the function to plan
+
+    Returns:
+    :   plan (DagPlan) : a schedule computing op
+    """
+    steps: List[_step] = []
+    # maps (id of node, slot of its input) to the slot of its output
+    slots: Dict[Tuple[int, int], int] = {}
+
+    def add(step: _step) -> int:
+        steps.append(step)
+        return len(steps)
+
+    # items are (node, slot of its input, state), where state counts the visits
+    work: List[Tuple[ArithmeticOpBase, int, int]] = [(op, 0, 0)]
+    while work:
+        node, x_slot, state = work.pop()
+        key = (id(node), x_slot)
+        if state == 0 and key in slots:
+            continue
+
+        typ = type(node)
+        if typ is const:
+            slots[key] = add((_CONST, node.n, None, 0, 0))
+
+        elif typ is identity:
+            slots[key] = x_slot
+
+        elif typ is variable:
+            # a variable doesn't depend on the input, so it is read once
+            var_key = (id(node), -1)
+            if var_key not in slots:
+                slots[var_key] = add((_VAR, node.n, None, 0, 0))
+            slots[key] = slots[var_key]
+
+        elif typ is chain:
+            second_key = (id(node.second), x_slot)
+            if state == 0:
+                work.append((node, x_slot, 1))
+                work.append((node.second, x_slot, 0))
+            elif state == 1:
+                work.append((node, x_slot, 2))
+                work.append((node.first, slots[second_key], 0))
+            else:
+                slots[key] = slots[(id(node.first), slots[second_key])]
+
+        elif isinstance(node, TwoFunctionsBase):
+            if typ not in _BINARY_FUNCS:
+                raise ValueError(f'Cannot plan {typ.__name__}')
+            if state == 0:
+                work.append((node, x_slot, 1))
+                work.append((node.second, x_slot, 0))
+                work.append((node.first, x_slot, 0))
+            else:
+                slots[key] = add((_BINARY, _BINARY_FUNCS[typ], None,
+                                  slots[(id(node.first), x_slot)],
+                                  slots[(id(node.second), x_slot)]))
+
+        else:
+            # chain also accepts plain callables, which are used as they are
+            slots[key] = add((_LEAF, getattr(node, 'f', node), getattr(node, 'f_array', node), x_slot, 0))
+
+    return DagPlan(steps, slots[(id(op), 0)])
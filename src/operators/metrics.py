@@ -0,0 +1,99 @@
+from __future__ import annotations
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple
+from .base_arithmetic import ArithmeticOpBase, _RULE_COUNTERS
+from .combos import TwoFunctionsBase
+
+class TreeMetrics (NamedTuple):
+    """Measurements of the size of an operator tree.
+
+    nodes and types count the tree as it would be written out, so a subtree that
+    is used several times is counted every time. distinct counts each shared
+    subtree once, which is closer to how much memory the tree takes.
+    """
+    nodes: int
+    depth: int
+    distinct: int
+    types: Dict[str, int]
+
+def tree_metrics(op: ArithmeticOpBase) -> TreeMetrics:
+    """Returns the node count, depth, distinct subtree count, and node type histogram of op.
+
+    Visits each distinct subtree once with an explicit stack, so it is fast and
+    safe even for huge derivative trees whose expanded size is exponential.
+
+    Args:
+    :   op (ArithmeticOpBase) : the function to measure
+
+    Returns:
+    :   metrics (TreeMetrics) : the measurements of op
+    """
+    # postorder over the distinct nodes, so children come before their parents
+    order: List[ArithmeticOpBase] = []
+    seen = set()
+    work = [(op, False)]
+    while work:
+        node, expanded = work.pop()
+        if expanded:
+            order.append(node)
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, TwoFunctionsBase):
+            work.append((node, True))
+            work.append((node.second, False))
+            work.append((node.first, False))
+        else:
+            order.append(node)
+
+    sizes: Dict[int, int] = {}
+    depths: Dict[int, int] = {}
+    for node in order:
+        if isinstance(node, TwoFunctionsBase):
+            first, second = id(node.first), id(node.second)
+            sizes[id(node)] = 1 + sizes[first] + sizes[second]
+            depths[id(node)] = 1 + max(depths[first], depths[second])
+        else:
+            sizes[id(node)] = 1
+            depths[id(node)] = 1
+
+    # how many times each node appears in the expanded tree, from the root down
+    uses: Dict[int, int] = {id(op) : 1}
+    types: Counter = Counter()
+    for node in reversed(order):
+        count = uses[id(node)]
+        types[type(node).__name__] += count
+        if isinstance(node, TwoFunctionsBase):
+            for child in (node.first, node.second):
+                uses[id(child)] = uses.get(id(child), 0) + count
+
+    return TreeMetrics(sizes[id(op)], depths[id(op)], len(order), dict(types))
+
+@contextmanager
+def count_rules() -> Iterator[Counter]:
+    """Counts how often each construction-time simplification rule fires.
+
+    While the block runs, every time building a node is short-circuited by one
+    of the _simple_* methods (e.g. x * 1 becoming x), the counter yielded here
+    is incremented under the name of the method that fired, like
+    'const._simple_mul'. Counting is off outside of the block and costs nothing.
+    Blocks can be nested, and the counts are for every thread.
+
+    Args:
+    :   None
+
+    Returns:
+    :   counts (Counter) : maps each rule to the number of times it fired
+    """
+    counts: Counter = Counter()
+    _RULE_COUNTERS.append(counts)
+    try:
+        yield counts
+    finally:
+        # by identity, since an equal counter may belong to another block
+        for i, active in enumerate(_RULE_COUNTERS):
+            if active is counts:
+                del _RULE_COUNTERS[i]
+                break
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, Deque, Union, TYPE_CHECKING, Dict, Type, Set
+from typing import Any, Union, TYPE_CHECKING, Dict, Type, Set, List, Tuple
 if TYPE_CHECKING:
     from ..base_arithmetic import ArithmeticOpBase
 
@@ -62,10 +62,6 @@ def remove_whitespace(s: str) -> str:
     """Returns new string with no whitespace."""
     return ''.join(s.split())
 
-def _is_float_char(c: str) -> bool:
-    """Returns whether c could be in a float."""
-    return c in _FLOAT_CHARS
-
 def is_op_char(c: str) -> bool:
     """Returns whether c is a mathematical operator."""
     return c in _OP_CHARS
@@ -78,28 +74,6 @@ def _is_var(c: str) -> bool:
     """Returns whether c is a variable name."""
     return len(c) == 1 and c not in _VAR_CHARS_C
 
-def _check_tokens(tokens: Deque[str], expr: str) -> None:
-    """Checks that all the tokens are valid and errors otherwise."""
-    var_name = ''
-    for i, tok in enumerate(tokens):
-        if not tok:
-            raise ValueError(f'Internal error: empty token in {tokens}')
-
-        elif _is_var(tok):
-            if not var_name:
-                var_name = tok
-            elif tok != var_name:
-                raise SyntaxError(f'Only single-variable functions are supported: {expr}')
-
-        elif len(tok) > 1 and not (can_be_float(tok) or is_func_str(tok) or is_op_char(tok)):
-            raise SyntaxError(f'Variables can have just one letter, so {tok} is not allowed: {expr}')
-
-        elif len(tok) > 1 and _is_float_char(tok[0]) and not can_be_float(tok):
-            raise SyntaxError(f'Invalid number: {tok}')
-
-        elif i < len(tok) - 1 and is_op_char(tok) and is_op_char(tok[i + 1]):
-            raise SyntaxError(f'Expected expression between operators: {expr}')
-
 def _class_name(op: Any) -> str:
     """Returns the name of the class of this operator."""
     return type(op).__name__
@@ -116,18 +90,32 @@ def disp_operator(op: ArithmeticOpBase) -> str:
     return '\n' + _disp_helper(op, 0)
 
 def _disp_helper(op: ArithmeticOpBase, tabs: int) -> str:
-    """Displays the operator function tree."""
-    if isinstance(op, const):
-        return str(op.n)
-    if isinstance(op, identity):
-        return 'x'
-    if isinstance(op, TwoFunctionsBase):
-        tabs += 1
-        tab_str = '\t' * tabs
-        return f'{_class_name(op)} :\n{tab_str}{_disp_helper(op.first, tabs)} and\n{tab_str}{_disp_helper(op.second, tabs)}'
-    if isinstance(op, _single_arg):
-        return f'{_class_name(op)}(x)'
-    return f'{_class_name(op)} with n = {op.n}'
+    """Displays the operator function tree, using an explicit stack so deep trees are fine."""
+    parts = []
+    # items are either text ready to output or (node, tabs) still to display
+    work: List[Union[str, Tuple[ArithmeticOpBase, int]]] = [(op, tabs)]
+    while work:
+        item = work.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        node, tabs = item
+        if isinstance(node, const):
+            parts.append(str(node.n))
+        elif isinstance(node, identity):
+            parts.append('x')
+        elif isinstance(node, TwoFunctionsBase):
+            tabs += 1
+            tab_str = '\t' * tabs
+            parts.append(f'{_class_name(node)} :\n{tab_str}')
+            work.append((node.second, tabs))
+            work.append(f' and\n{tab_str}')
+            work.append((node.first, tabs))
+        elif isinstance(node, _single_arg):
+            parts.append(f'{_class_name(node)}(x)')
+        else:
+            parts.append(f'{_class_name(node)} with n = {node.n}')
+    return ''.join(parts)
 
 def can_be_float(thing: Any) -> bool:
     """Returns whether the thing can be casted as a float without erroring.
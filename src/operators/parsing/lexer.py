@@ -1,9 +1,121 @@
 from __future__ import annotations
-from typing import Deque, List
-from ._parse_utils import remove_whitespace, _is_float_char, is_func_str, is_op_char 
-from ._parse_utils import _check_tokens, PRIORITIES, _is_var, can_be_float
+from typing import Deque, Dict, List, NamedTuple, Tuple
+from ._parse_utils import remove_whitespace, is_func_str, PRIORITIES
 from collections import deque
+from itertools import accumulate
 from math import e
+import re
+
+class Lexeme (NamedTuple):
+    """A token of an expression along with what kind of token it is.
+
+    kind is one of 'num', 'var', 'func', 'op', 'lparen' or 'rparen', and pos is
+    the index of the token in the expression with its whitespace removed.
+    """
+    kind: str
+    text: str
+    pos: int
+
+# every character falls in exactly one token, so the matches cover the whole string
+_TOKEN_RE = re.compile(r'[0-9.]+|[-+*/^()]|[^-+*/^()0-9.]+')
+_NUMBER_RE = re.compile(r'[0-9]+\.?[0-9]*|\.[0-9]+')
+
+# the kind of token starting with each character, with anything else being a word
+_FIRST_CHAR_KINDS: Dict[str, str] = {
+    **{c : 'num' for c in '0123456789.'},
+    **{c : 'op' for c in '+-*/^'},
+    '(' : 'lparen',
+    ')' : 'rparen'
+}
+
+# kinds of tokens that end and start a value, with an implicit * between them
+_VALUE_END = frozenset(['num', 'var', 'rparen'])
+_VALUE_START = frozenset(['num', 'var', 'func', 'lparen'])
+
+_lexeme = Tuple[str, str, int]
+
+_E: str = str(e) #the base of ln
+
+def tokenize(expr: str) -> List[Lexeme]:
+    """Splits expr into typed tokens in a single pass.
+
+    Implicit multiplication becomes an explicit * (e.g. 2x or (x + 1)(x - 1)),
+    a unary minus becomes -1 *, ln becomes log with base e, and the base of log
+    comes right before it e.g. log2(x) becomes 2 log ( x ). Whitespace is
+    ignored, and syntax errors give the column of the offending token.
+
+    Args:
+    :   expr (str) : a string expression in infix form
+
+    Returns:
+    :   tokens (list) : the tokens of expr, as Lexemes
+    """
+    return list(map(Lexeme._make, _lex(expr)))
+
+def _lex(expr: str) -> List[_lexeme]:
+    """Returns the tokens of expr as plain (kind, text, pos) tuples. See tokenize."""
+    words = _TOKEN_RE.findall(remove_whitespace(expr))
+    # the words are contiguous, so the position of each is the length of the ones before it
+    starts = list(accumulate(map(len, words), initial = 0))
+    n = len(words)
+    kinds = _FIRST_CHAR_KINDS
+    value_end = _VALUE_END
+
+    res: List[_lexeme] = []
+    append = res.append
+    prev = '' #the kind of the last token
+    i = 0
+    while i < n:
+        tok = words[i]
+        pos = starts[i]
+        kind = kinds.get(tok[0], 'word')
+        i += 1
+        if kind == 'op':
+            if tok == '-' and prev not in value_end:
+                if i == n:
+                    raise _error('Expected expression after -', expr, pos)
+                append(('num', '-1', pos))
+                append(('op', '*', pos))
+            else:
+                if prev not in value_end:
+                    raise _error('Expected first argument to operator', expr, pos)
+                if i == n:
+                    raise _error('Expected second argument to operator', expr, pos)
+                append(('op', tok, pos))
+            prev = 'op'
+            continue
+
+        base = ''
+        if kind == 'num':
+            if not _NUMBER_RE.fullmatch(tok):
+                raise _error(f'Invalid number {tok}', expr, pos)
+        elif kind == 'word':
+            if tok == 'e':
+                kind, tok = 'num', _E
+            elif len(tok) == 1:
+                kind = 'var'
+            elif not is_func_str(tok):
+                raise _error(f'Variables can have just one letter, so {tok} is not allowed', expr, pos)
+            elif tok == 'log':
+                if i + 1 >= n or words[i + 1] != '(' or not _NUMBER_RE.fullmatch(words[i]):
+                    raise _error('Expected a base for log, like log2(x)', expr, pos)
+                base = words[i]
+                i += 1
+                kind = 'func'
+            elif i == n or words[i] != '(':
+                raise _error(f'Expected ( after {tok}', expr, pos)
+            else:
+                kind = 'func'
+                if tok == 'ln':
+                    base, tok = _E, 'log'
+
+        if prev in value_end and kind in _VALUE_START:
+            append(('op', '*', pos))
+        if base:
+            append(('num', base, pos))
+        append((kind, tok, pos))
+        prev = kind
+    return res
 
 def find_tokens(expr: str) -> Deque[str]:
     """Finds all the tokens in expr.
@@ -15,83 +127,21 @@ def find_tokens(expr: str) -> Deque[str]:
     :   tokens (list) : a list of tokens (all strings), each element being one of:
             a number, a variable, a function, an operator, or a parenthesis
     """
-    res: Deque[str] = deque()
-    if not expr: return res
-    is_num = _is_float_char(expr[0])
-    curr_word: Deque[str] = deque()
-    expr = remove_whitespace(expr)
-    i = 0
-    while i < len(expr):
-        c = expr[i]
-        if c == '-' and not curr_word:
-            if not res or res[-1] != ')':
-                res.append('-1')
-                res.append('*')
-            else:
-                res.append('-')
-            if i == len(expr) - 1:
-                raise SyntaxError(f'Expected expression after -: {expr}')
-            is_num = _is_float_char(expr[i + 1])
-
-        elif is_op_char(c):
-            if not (curr_word or (res and res[-1] == ')')):
-                raise SyntaxError(f'Expected first argument to operator: {expr}')
-            if curr_word: res.append(''.join(curr_word))
-            res.append(c)
-            curr_word = deque()
-            if i == len(expr) - 1:
-                raise SyntaxError(f'Expected second argument to operator: {expr}')
-            is_num = _is_float_char(expr[i + 1])
-
-        elif c == '(':
-            if len(res) >= 2 and res[-2] == 'log':
-                res.pop()
-                res.pop()
-                as_str = ''.join(curr_word)
-                if as_str and can_be_float(as_str):
-                    res.append(as_str)
-                else:
-                    raise SyntaxError(f'Unexpected log base {as_str} in {expr}')
-                res.append('log')
-
-            elif len(curr_word) == 2 and list(curr_word) == ['l', 'n']:
-                res.append(str(e))
-                res.append('log')
-
-            elif curr_word:
-                res.append(''.join(curr_word))
-                if not is_func_str(res[-1]):
-                    res.append('*')
-                        
-            res.append(c)
-            curr_word = deque()
-            if i < len(expr) - 1:
-                is_num = _is_float_char(expr[i + 1])
-
-        elif c == ')':
-            if curr_word:
-                res.append(''.join(curr_word))
-            res.append(c)
-            curr_word = deque()
-            if i < len(expr) - 1:
-                if not is_op_char(expr[i + 1]) and expr[i + 1] != ')':
-                    res.append('*')
-                is_num = _is_float_char(expr[i + 1])
-
-        elif _is_float_char(c) != is_num:
-            res.append(''.join(curr_word))
-            res.append('*')
-            curr_word = deque([c])
-            is_num = not is_num
-
-        else:
-            curr_word.append(c)
-        
-        i += 1
-
-    if curr_word: res.append(''.join(curr_word))
-    _check_tokens(res, expr)
-    return res
+    return deque(tok[1] for tok in _lex(expr))
+
+def _error(message: str, expr: str, pos: int) -> SyntaxError:
+    """Returns a SyntaxError pointing at the character pos of expr, not counting whitespace."""
+    col = pos
+    seen = -1
+    for col, c in enumerate(expr):
+        if not c.isspace():
+            seen += 1
+            if seen == pos:
+                break
+    err = SyntaxError(f'{message} at column {col + 1}: {expr}')
+    err.offset = col + 1
+    err.text = expr
+    return err
 
 def shunting_yard(expr: str) -> List[str]:
     """Parses the infix expression and turns it into a postfix list of tokens.
@@ -102,41 +152,43 @@ def shunting_yard(expr: str) -> List[str]:
     Returns:
     :   tokens (list) : a list of strings representing the tokens, in postfix order
     """
-    res: Deque[str] = deque()
-    operators: Deque[str] = deque()
-    tokens = find_tokens(expr)
-    for tok in tokens:
-        if can_be_float(tok) or _is_var(tok):
+    return [tok[1] for tok in _postfix(expr)]
+
+def _postfix(expr: str) -> List[_lexeme]:
+    """Returns the tokens of expr as (kind, text, pos) tuples, in postfix order. See shunting_yard."""
+    res: List[_lexeme] = []
+    operators: List[_lexeme] = []
+    for tok in _lex(expr):
+        kind, text, _ = tok
+        if kind == 'num' or kind == 'var':
             res.append(tok)
 
-        elif is_func_str(tok) or tok == '(':
+        elif kind == 'func' or kind == 'lparen':
             operators.append(tok)
 
-        elif is_op_char(tok):
-            tok_priority = PRIORITIES[tok]
-            while (operators and
-                   operators[-1] != '(' and 
-                   (PRIORITIES[operators[-1]] < tok_priority or
-                    (PRIORITIES[operators[-1]] == tok_priority and tok != '^'))):
+        elif kind == 'op':
+            tok_priority = PRIORITIES[text]
+            while operators and operators[-1][0] == 'op':
+                top_priority = PRIORITIES[operators[-1][1]]
+                if top_priority > tok_priority or (top_priority == tok_priority and text == '^'):
+                    break
                 res.append(operators.pop())
             operators.append(tok)
             
-        elif tok == ')':
-            if not operators:
-                raise SyntaxError(f'Unmatched right parenthesis in {expr}')
-            while operators[-1] != '(':
+        else:
+            while operators and operators[-1][0] != 'lparen':
                 res.append(operators.pop())
-                if not operators:
-                    raise SyntaxError(f'Unmatched right parenthesis in {expr}')
+            if not operators:
+                raise _error('Unmatched right parenthesis', expr, tok[2])
 
             operators.pop()
-            if operators and is_func_str(operators[-1]):
+            if operators and operators[-1][0] == 'func':
                 res.append(operators.pop())
 
     while operators:
-        to_add = operators.pop()
-        if to_add == '(':
-            raise SyntaxError(f'Unmatched left parenthesis in {expr}')
-        res.append(to_add)
+        tok = operators.pop()
+        if tok[0] == 'lparen':
+            raise _error('Unmatched left parenthesis', expr, tok[2])
+        res.append(tok)
 
-    return list(res)
+    return res
@@ -1,46 +1,134 @@
 from __future__ import annotations
-from typing import Deque, List
+from typing import Callable, Deque, Dict, List, Type
 from ..base_arithmetic import ArithmeticOpBase
-from .lexer import is_func_str, is_op_char, shunting_yard
+from .lexer import shunting_yard, remove_whitespace, _postfix, _error, _lexeme
 from .token_types import Token, Num, Var, Log, _BinOp, _Trig
-from ._parse_utils import _ONE_ARG, _BIN_OPS, _FUNC_COMBOS, _TRIG_MAP, _is_var, can_be_float
-from ..arithmetic import const, identity, log_base_n
-from ..combos import chain
+from ._parse_utils import _ONE_ARG, _BIN_OPS, _FUNC_COMBOS, _TRIG_MAP, _is_var, can_be_float, is_func_str, is_op_char
+from ..arithmetic import const, identity, variable, log_base_n
+from ..combos import TwoFunctionsBase, chain
+from ..caching import _EXPRESSIONS
 from collections import deque
 
-def parse_expr(expr: str) -> ArithmeticOpBase:
+# the functions built by each operator and one argument function, by their text
+_OP_NODES: Dict[str, Type[TwoFunctionsBase]] = {
+    op : _FUNC_COMBOS[tok] for op, tok in _BIN_OPS.items() if tok in _FUNC_COMBOS
+}
+_FUNC_LEAVES: Dict[str, Callable[[], ArithmeticOpBase]] = {
+    name : _TRIG_MAP[tok] for name, tok in _ONE_ARG.items()
+}
+
+def parse_expr(expr: str, via_tokens: bool = False) -> ArithmeticOpBase:
     """Parses the arithmetic function and returns a ArithmeticOpBase.
+
+    If expr uses a single variable, whatever its name, it becomes the input x
+    of the function, so parse_expr('3t^2')(2) == 12. If it uses several, x is
+    still the input, and every other variable is given by name when calling
+    the function e.g. parse_expr('x * y')(x = 2, y = 3). The letter e is
+    Euler's number rather than a variable. Results are cached by the expression
+    without whitespace, see set_expression_cache_size and clear_expression_cache.
     
     Args:
     :   expr (str) : a string representing a mathematical function
+    :   via_tokens (bool) : whether to build a tree of Tokens first and then
+            turn it into the function, instead of building the function straight
+            from the postfix tokens. The result is the same, but this is slower and
+            skips the cache, so it is only meant for debugging the parser
 
     Returns:
     :   func (ArithmeticOpBase) : an object that can be treated like a function
             with the same output as the given expr
     """
-    return _parse_tree(_str_to_tree(shunting_yard(expr), expr), expr)
+    if via_tokens:
+        postfix = shunting_yard(expr)
+        multi = len({tok for tok in postfix if _is_var(tok)}) > 1
+        return _parse_tree(_str_to_tree(postfix, expr), expr, multi)
+
+    # whitespace never changes the meaning, so all spacings share one entry
+    key = ('parse', remove_whitespace(expr))
+    res = _EXPRESSIONS.get(key)
+    if res is None:
+        res = _build(_postfix(expr), expr)
+        _EXPRESSIONS.put(key, res)
+    return res
+
+def token_tree(expr: str) -> Token:
+    """Returns the syntax tree of Tokens for expr, for debugging the parser.
+
+    Args:
+    :   expr (str) : a string representing a mathematical function
+
+    Returns:
+    :   tree (Token) : the root of the syntax tree
+    """
+    return _str_to_tree(shunting_yard(expr), expr)
+
+def _input_var(expr: str, var: str) -> str:
+    """Returns the variable of the parsed expr that stands for var.
+
+    That is x if var is the only variable in expr, since parse_expr makes it the
+    input, and var itself otherwise.
+    """
+    if var == 'x':
+        return var
+    names = {text for kind, text, _ in _postfix(expr) if kind == 'var'}
+    return 'x' if names == {var} else var
+
+def _build(postfix: List[_lexeme], expr: str) -> ArithmeticOpBase:
+    """Builds the function straight from its tokens in postfix order, with a stack of operands."""
+    if not postfix:
+        raise SyntaxError(f'Empty expression {expr}')
+
+    multi = len({text for kind, text, _ in postfix if kind == 'var'}) > 1
+    operands: List[ArithmeticOpBase] = []
+    for kind, text, pos in postfix:
+        if kind == 'num':
+            operands.append(const(float(text)))
+
+        elif kind == 'var':
+            operands.append(variable(text) if multi else identity())
+
+        elif kind == 'op' or text == 'log':
+            if len(operands) < 2:
+                raise _error(f'Arity mismatch. Expected two arguments for {text}', expr, pos)
+            r = operands.pop()
+            l = operands.pop()
+            if kind == 'op':
+                operands.append(_OP_NODES[text](l, r))
+            else:
+                # the lexer only allows numbers as the base
+                operands.append(chain(log_base_n(l.n), r))
+
+        else:
+            if not operands:
+                raise _error(f'Arity mismatch. Expected one argument for {text}', expr, pos)
+            operands.append(chain(_FUNC_LEAVES[text](), operands.pop()))
+
+    if len(operands) != 1:
+        raise ValueError(f'Internal error: wrong number of operands {operands} in {expr}')
+
+    return operands[0]
 
-def _parse_tree(tree: Token, expr: str) -> ArithmeticOpBase:
-    """Parses the tree into an ArithmeticOpBase."""
+def _parse_tree(tree: Token, expr: str, multi: bool = False) -> ArithmeticOpBase:
+    """Parses the tree into an ArithmeticOpBase, with named variables if multi is True."""
     typ = type(tree)
     if isinstance(tree, Num):
         return const(tree.n)
 
     if isinstance(tree, Var):
-        return identity()
+        return variable(tree.s) if multi else identity()
 
     if isinstance(tree, Log):
-        const_base = _parse_tree(tree.base, expr)
+        const_base = _parse_tree(tree.base, expr, multi)
         if not isinstance(const_base, const):
             raise SyntaxError(f'Expected scalar value for log base: {expr}')
-        return chain(log_base_n(const_base.n), _parse_tree(tree.expr, expr))
+        return chain(log_base_n(const_base.n), _parse_tree(tree.expr, expr, multi))
 
     if isinstance(tree, _BinOp):
-        return _FUNC_COMBOS[typ](_parse_tree(tree.l, expr),
-                                 _parse_tree(tree.r, expr))
+        return _FUNC_COMBOS[typ](_parse_tree(tree.l, expr, multi),
+                                 _parse_tree(tree.r, expr, multi))
 
     if isinstance(tree, _Trig):
-        return chain(_TRIG_MAP[typ](), _parse_tree(tree.expr, expr))
+        return chain(_TRIG_MAP[typ](), _parse_tree(tree.expr, expr, multi))
 
     raise ValueError(f'Internal error: invalid tree {tree} from {expr}')
 
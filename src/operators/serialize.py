@@ -0,0 +1,240 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple, Type, Union
+import struct
+import numpy as np
+from ..fractions import Fraction
+from ..utilities import number
+from .base_arithmetic import ArithmeticOpBase, _single_arg
+from .arithmetic import const, identity, variable
+from .combos import TwoFunctionsBase, chain
+from .bytecode import _LOAD_X, _CONST, _ENTER, _LOAD_VAR, _LEAF_OPS, _BINARY_OPS
+
+# refers back to an earlier combinator by its index, in the order they were written
+_REF = 28
+
+# tags for the type of a number
+_FLOAT = 0
+_INT = 1
+_BIG_INT = 2
+_FRACTION = 3
+
+_TREE_MAGIC: bytes = b'MLOT'
+_VERSION: int = 1
+_TREE_HEADER: struct.Struct = struct.Struct('<4sB')
+_DOUBLE: struct.Struct = struct.Struct('<d')
+
+_COMBO_CODES: Dict[Type[TwoFunctionsBase], int] = {chain : _ENTER, **_BINARY_OPS}
+_CODE_COMBOS: Dict[int, Type[TwoFunctionsBase]] = {code : typ for typ, code in _COMBO_CODES.items()}
+_CODE_LEAVES: Dict[int, Type[ArithmeticOpBase]] = {code : typ for typ, code in _LEAF_OPS.items()}
+
+_buffer = Union[bytes, bytearray, memoryview, Any]
+
+def tree_to_bytes(op: ArithmeticOpBase) -> bytes:
+    """Encodes the operator tree in a compact binary form. See ArithmeticOpBase.to_bytes.
+
+    The tree is written in prefix order, with the opcodes of to_program: each
+    node is one opcode byte followed by its number if it has one. A subtree that
+    appears again is written as a reference to its first appearance, so shared
+    subtrees (which derivatives have a lot of) are only stored once. Uses an
+    explicit stack, so deep trees are fine.
+
+    Args:
+    :   op (ArithmeticOpBase) : the function to encode
+
+    Returns:
+    :   data (bytes) : the encoded function
+    """
+    out = bytearray(_TREE_HEADER.pack(_TREE_MAGIC, _VERSION))
+    # the index of each combinator that was written, in the order they were written
+    slots: Dict[int, int] = {}
+    stack: List[Any] = [op]
+    while stack:
+        node = stack.pop()
+        typ = type(node)
+        if isinstance(node, TwoFunctionsBase):
+            slot = slots.get(id(node))
+            if slot is not None:
+                out.append(_REF)
+                _write_uint(out, slot)
+                continue
+            if typ not in _COMBO_CODES:
+                raise ValueError(f'Cannot encode {typ.__name__}')
+            slots[id(node)] = len(slots)
+            out.append(_COMBO_CODES[typ])
+            stack.append(node.second)
+            stack.append(node.first)
+
+        elif typ is identity:
+            out.append(_LOAD_X)
+
+        elif typ is variable:
+            out.append(_LOAD_VAR)
+            name = node.n.encode('utf-8')
+            _write_uint(out, len(name))
+            out += name
+
+        elif typ is const:
+            out.append(_CONST)
+            _write_number(out, node.n)
+
+        elif typ in _LEAF_OPS:
+            out.append(_LEAF_OPS[typ])
+            if not isinstance(node, _single_arg):
+                _write_number(out, node.n)
+
+        else:
+            raise ValueError(f'Cannot encode {getattr(typ, "__name__", typ)}')
+
+    return bytes(out)
+
+def tree_from_bytes(data: _buffer) -> ArithmeticOpBase:
+    """Decodes a tree written by tree_to_bytes. See ArithmeticOpBase.from_bytes.
+
+    The combinators are rebuilt without simplifying them again, since they were
+    already simplified when they were first built. Uses an explicit stack, so
+    deep trees are fine.
+
+    Args:
+    :   data (bytes | memoryview | mmap) : the encoded function. Anything that
+            supports the buffer protocol works, and isn't copied
+
+    Returns:
+    :   func (ArithmeticOpBase) : the decoded function
+    """
+    buf = memoryview(data)
+    if buf.format != 'B' or buf.ndim != 1:
+        buf = buf.cast('B')
+    end = len(buf)
+    if end < _TREE_HEADER.size:
+        raise ValueError('Truncated operator tree')
+    magic, version = _TREE_HEADER.unpack_from(buf)
+    if magic != _TREE_MAGIC:
+        raise ValueError('Not an operator tree')
+    if version != _VERSION:
+        raise ValueError(f'Unsupported operator tree version {version}')
+
+    pos = _TREE_HEADER.size
+    # each combinator that was started, in the order they were written
+    built: List[Union[ArithmeticOpBase, None]] = []
+    # the combinators waiting for their functions, as [type, slot, first]
+    pending: List[List[Any]] = []
+    try:
+        while True:
+            code = buf[pos]
+            pos += 1
+            if code in _CODE_COMBOS:
+                pending.append([_CODE_COMBOS[code], len(built), None])
+                built.append(None)
+                continue
+
+            if code == _REF:
+                slot, pos = _read_uint(buf, pos)
+                node = built[slot] if slot < len(built) else None
+                if node is None:
+                    raise ValueError(f'Invalid reference to node {slot} in operator tree')
+            elif code == _LOAD_X:
+                node = identity()
+            elif code == _LOAD_VAR:
+                size, pos = _read_uint(buf, pos)
+                if pos + size > end:
+                    raise IndexError
+                node = variable(bytes(buf[pos:pos + size]).decode('utf-8'))
+                pos += size
+            elif code == _CONST:
+                n, pos = _read_number(buf, pos)
+                node = const(n)
+            elif code in _CODE_LEAVES:
+                typ = _CODE_LEAVES[code]
+                if issubclass(typ, _single_arg):
+                    node = typ()
+                else:
+                    n, pos = _read_number(buf, pos)
+                    node = typ(n)
+            else:
+                raise ValueError(f'Invalid opcode {code} in operator tree')
+
+            # hand the finished node to the combinators waiting for it
+            while pending:
+                top = pending[-1]
+                if top[2] is None:
+                    top[2] = node
+                    break
+                pending.pop()
+                node = TwoFunctionsBase.__new__(top[0], top[2], node)
+                built[top[1]] = node
+            else:
+                if pos != end:
+                    raise ValueError(f'{end - pos} bytes of trailing data after operator tree')
+                return node
+    except (IndexError, struct.error):
+        raise ValueError('Truncated operator tree')
+
+def _write_uint(out: bytearray, n: int) -> None:
+    """Appends n as a varint, 7 bits per byte with the high bit meaning there are more."""
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _read_uint(buf: memoryview, pos: int) -> Tuple[int, int]:
+    """Returns the varint at pos and the position after it."""
+    res = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        res |= (b & 0x7f) << shift
+        if b < 0x80:
+            return res, pos
+        shift += 7
+
+def _write_int(out: bytearray, n: int) -> None:
+    """Appends the signed int n as a zigzag varint, so small negative numbers stay small."""
+    _write_uint(out, (n << 1) if n >= 0 else ((-n << 1) - 1))
+
+def _read_int(buf: memoryview, pos: int) -> Tuple[int, int]:
+    """Returns the zigzag varint at pos and the position after it."""
+    n, pos = _read_uint(buf, pos)
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+
+def _write_number(out: bytearray, n: number) -> None:
+    """Appends a tag byte for the type of n, then n itself."""
+    if isinstance(n, Fraction):
+        out.append(_FRACTION)
+        _write_int(out, n._num)
+        _write_int(out, n._den)
+    elif isinstance(n, (int, np.integer)) and not isinstance(n, bool):
+        n = int(n)
+        if -(1 << 63) <= n < (1 << 63):
+            out.append(_INT)
+            _write_int(out, n)
+        else:
+            # a varint would take time quadratic in the size of n to decode
+            raw = n.to_bytes((n.bit_length() + 8) // 8, 'little', signed = True)
+            out.append(_BIG_INT)
+            _write_uint(out, len(raw))
+            out += raw
+    elif isinstance(n, (float, np.floating)):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(n)
+    else:
+        raise ValueError(f'Cannot encode the number {n!r} of type {type(n).__name__}')
+
+def _read_number(buf: memoryview, pos: int) -> Tuple[number, int]:
+    """Returns the number written by _write_number at pos and the position after it."""
+    tag = buf[pos]
+    pos += 1
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(buf, pos)[0], pos + _DOUBLE.size
+    if tag == _INT:
+        return _read_int(buf, pos)
+    if tag == _BIG_INT:
+        size, pos = _read_uint(buf, pos)
+        if pos + size > len(buf):
+            raise IndexError
+        return int.from_bytes(buf[pos:pos + size], 'little', signed = True), pos + size
+    if tag == _FRACTION:
+        num, pos = _read_int(buf, pos)
+        den, pos = _read_int(buf, pos)
+        return Fraction(num, den), pos
+    raise ValueError(f'Invalid number type {tag} in operator tree')
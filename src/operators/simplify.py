@@ -0,0 +1,332 @@
+from __future__ import annotations
+from typing import Any, Dict, Hashable, List, Tuple
+from ..utilities import number
+from .base_arithmetic import ArithmeticOpBase
+from .arithmetic import const, identity, variable, add_n, sub_n, n_sub, mult_n, div_n, n_div, exp_n
+from .combos import TwoFunctionsBase, chain, f_plus_g, f_minus_g, f_times_g, f_divided_by_g, f_raised_to_g
+
+# a monomial is a tuple of (base key, exponent) sorted by when the base was first seen,
+# and a sum maps each monomial to its coefficient, with () holding the constant term
+_Monomial = Tuple[Tuple[Hashable, number], ...]
+_Sum = Dict[_Monomial, number]
+
+_X_KEY: Hashable = 'x'
+
+def simplify(op: ArithmeticOpBase) -> ArithmeticOpBase:
+    """Returns a simplified function with the same output as op.
+
+    The function is put in a normal form: a sum of terms, each a coefficient times
+    a product of powers of bases, where a base is x, a function that isn't a
+    polynomial (like sin(...) or log2(...)), or a sum that couldn't be multiplied
+    out. On the way, constants are folded, like terms are collected (2x + 3x = 5x),
+    powers of the same base are merged (x * x^2 = x^3, f / f = 1), and chains of
+    polynomials are substituted into each other. Sums are never multiplied
+    together, since that can blow up the size of repeated derivatives, so e.g.
+    (x + 1) * (x + 2) * (x + 3) stays a product of three factors, which can still
+    cancel against a division. A sum times a single term is multiplied out, like
+    2x * (x + 1) = 2x^2 + 2x, unless every term then shares a sum as a factor,
+    which is taken out again. The result is then rebuilt with the normal
+    constructors.
+
+    Note that cancelling (e.g. x / x = 1) can make the result defined at points
+    where op wasn't. Raises ZeroDivisionError if op divides by something that
+    is 0 everywhere, like 1 / (sin(x) - sin(x)).
+
+    Args:
+    :   op (ArithmeticOpBase) : the function to simplify
+
+    Returns:
+    :   simple (ArithmeticOpBase) : an equivalent, usually smaller, function
+    """
+    return _Simplifier().run(op)
+
+def _is_int(n: Any) -> bool:
+    """Returns whether n is a whole number."""
+    return isinstance(n, int) or (isinstance(n, float) and n.is_integer())
+
+def _num(n: number) -> number:
+    """Turns whole floats into ints so exponents print as x^2 rather than x^2.0."""
+    return int(n) if isinstance(n, float) and n.is_integer() else n
+
+class _Simplifier:
+    """Holds the state of one call to simplify."""
+    def __init__(self):
+        self.ranks: Dict[Hashable, int] = {_X_KEY : 0}
+        self.bases: Dict[Hashable, Any] = {_X_KEY : identity()}
+        self.built: Dict[Hashable, ArithmeticOpBase] = {}
+        self.memo: Dict[Tuple[int, int], _Sum] = {}
+        self.x: _Sum = {((_X_KEY, 1),) : 1}
+
+    def run(self, op: ArithmeticOpBase) -> ArithmeticOpBase:
+        return self.build(self.to_sum(op, self.x))
+
+    def base(self, key: Hashable, value: Any) -> Tuple[Tuple[Hashable, number], ...]:
+        """Registers a base and returns the monomial for it to the first power."""
+        if key not in self.ranks:
+            self.ranks[key] = len(self.ranks)
+            self.bases[key] = value
+        return ((key, 1),)
+
+    def atom(self, op: ArithmeticOpBase) -> _Sum:
+        """Returns the sum holding just op."""
+        if isinstance(op, const):
+            return self.constant(op.n)
+        if isinstance(op, identity):
+            return self.x
+        return {self.base(op, op) : 1}
+
+    def constant(self, n: number) -> _Sum:
+        return {(): n} if n != 0 else {}
+
+    def to_sum(self, op: ArithmeticOpBase, x: _Sum) -> _Sum:
+        """Returns the normal form of op, with x being the normal form of its input.
+
+        Works through the tree with an explicit stack, so deep trees are fine.
+        Results are memoized by the identity of the subtree and its input, which
+        stay unique because every input is either self.x or a memoized result.
+        """
+        # items are (node, its input, state), where state counts the visits
+        work: List[Tuple[Any, _Sum, int]] = [(op, x, 0)]
+        while work:
+            node, inp, state = work.pop()
+            key = (id(node), id(inp))
+            if state == 0 and key in self.memo:
+                continue
+            if type(node) is chain:
+                if state == 0:
+                    work.append((node, inp, 1))
+                    work.append((node.second, inp, 0))
+                elif state == 1:
+                    work.append((node, inp, 2))
+                    work.append((node.first, self.memo[(id(node.second), id(inp))], 0))
+                else:
+                    inner = self.memo[(id(node.second), id(inp))]
+                    self.memo[key] = self.memo[(id(node.first), id(inner))]
+            elif isinstance(node, TwoFunctionsBase):
+                if state == 0:
+                    work.append((node, inp, 1))
+                    work.append((node.second, inp, 0))
+                    work.append((node.first, inp, 0))
+                else:
+                    self.memo[key] = self.combine(node, self.memo[(id(node.first), id(inp))],
+                                                  self.memo[(id(node.second), id(inp))])
+            else:
+                self.memo[key] = self.leaf(node, inp)
+        return self.memo[(id(op), id(x))]
+
+    def leaf(self, op: ArithmeticOpBase, x: _Sum) -> _Sum:
+        """Returns the normal form of a leaf function applied to x."""
+        typ = type(op)
+        if typ is const:
+            return self.constant(op.n)
+        if typ is identity:
+            return x
+        if typ is variable:
+            return self.atom(op)
+        if typ is add_n:
+            return self.add(x, self.constant(op.n))
+        if typ is sub_n:
+            return self.add(x, self.constant(-op.n))
+        if typ is n_sub:
+            return self.add(self.constant(op.n), self.scale(x, -1))
+        if typ is mult_n:
+            return self.scale(x, op.n)
+        if typ is div_n:
+            return self.scale(x, 1 / op.n)
+        if typ is n_div:
+            return self.scale(self.power(x, -1), op.n)
+        if typ is exp_n:
+            return self.power(x, op.n)
+        # anything else is applied to its input as a black box
+        if x is self.x:
+            return self.atom(op)
+        return self.atom(chain(op, self.build(x)))
+
+    def combine(self, op: TwoFunctionsBase, f: _Sum, g: _Sum) -> _Sum:
+        """Returns the normal form of op, given the normal forms f and g of its two functions."""
+        typ = type(op)
+        if typ is f_plus_g:
+            return self.add(f, g)
+        if typ is f_minus_g:
+            return self.add(f, self.scale(g, -1))
+        if typ is f_times_g:
+            return self.mul(f, g)
+        if typ is f_divided_by_g:
+            return self.mul(f, self.power(g, -1))
+        if typ is f_raised_to_g and (not g or list(g) == [()]):
+            return self.power(f, g.get((), 0))
+        return self.atom(typ(self.build(f), self.build(g)))
+
+    def add(self, a: _Sum, b: _Sum) -> _Sum:
+        res = dict(a)
+        for mono, coeff in b.items():
+            total = res.get(mono, 0) + coeff
+            if total == 0:
+                res.pop(mono, None)
+            else:
+                res[mono] = total
+        return res
+
+    def scale(self, a: _Sum, n: number) -> _Sum:
+        if n == 0:
+            return {}
+        return {mono : coeff * n for mono, coeff in a.items()}
+
+    def mul_mono(self, a: _Monomial, b: _Monomial) -> _Monomial:
+        exps: Dict[Hashable, number] = dict(a)
+        for key, exp in b:
+            total = exps.get(key, 0) + exp
+            if total == 0:
+                del exps[key]
+            else:
+                exps[key] = total
+        return tuple(sorted(exps.items(), key = lambda item: self.ranks[item[0]]))
+
+    def mul(self, a: _Sum, b: _Sum) -> _Sum:
+        if len(a) > 1 and len(b) > 1:
+            # multiplying out two sums can blow up, so they become factors instead,
+            # except that a sum is still multiplied into one that divides by it
+            factor_a, factor_b = self.as_factor(a), self.as_factor(b)
+            if self.divides_by(b, factor_a):
+                a = factor_a
+            elif self.divides_by(a, factor_b):
+                b = factor_b
+            else:
+                a, b = factor_a, factor_b
+        res: _Sum = {}
+        for mono_a, coeff_a in a.items():
+            for mono_b, coeff_b in b.items():
+                res = self.add(res, {self.mul_mono(mono_a, mono_b) : coeff_a * coeff_b})
+        return self.pull_common(res)
+
+    def divides_by(self, a: _Sum, factor: _Sum) -> bool:
+        """Returns whether a term of a has the base of the single-base sum factor as a negative power."""
+        (((key, _),), _), = factor.items()
+        return any(base == key and exp < 0 for mono in a for base, exp in mono)
+
+    def pull_common(self, a: _Sum) -> _Sum:
+        """Takes the sums that are factors of every term of a out as a common factor.
+
+        e.g. (x + 1) * x + 3(x + 1) becomes (x + 1) * (x + 3), so that a product
+        of sums comes out the same whatever order it was multiplied in.
+        """
+        if len(a) <= 1:
+            return a
+        common: Dict[Hashable, number] = {}
+        for i, mono in enumerate(a):
+            exps = {key : exp for key, exp in mono if isinstance(key, frozenset) and exp > 0}
+            common = exps if i == 0 else {key : min(exp, exps[key]) for key, exp in common.items() if key in exps}
+            if not common:
+                return a
+        inverse = tuple((key, -exp) for key, exp in common.items())
+        rest = {self.mul_mono(mono, inverse) : coeff for mono, coeff in a.items()}
+        (mono, coeff), = self.as_factor(rest).items()
+        return {self.mul_mono(tuple(common.items()), mono) : coeff}
+
+    def factor_key(self, a: _Sum) -> Hashable:
+        """Registers a base equal to a and returns its key."""
+        if len(a) > 1:
+            key: Hashable = frozenset(a.items())
+            self.base(key, a)
+        else:
+            key = self.build(a)
+            self.base(key, key)
+        return key
+
+    def as_factor(self, a: _Sum) -> _Sum:
+        """Returns a single-term sum equal to a, wrapping a in a base if it has many terms."""
+        if len(a) <= 1:
+            return a
+        return {((self.factor_key(a), 1),) : 1}
+
+    def power(self, a: _Sum, n: number) -> _Sum:
+        """Returns a ** n for a constant exponent n."""
+        if n == 0:
+            return {(): 1}
+        if n == 1:
+            return a
+        if not a:
+            if n < 0:
+                # a is 0 everywhere, so this divides by zero wherever op is defined
+                raise ZeroDivisionError(f'Simplifying gives 0 to the power of {_num(n)}')
+            return {}
+        if len(a) == 1:
+            (mono, coeff), = a.items()
+            if _is_int(n):
+                # (c * b1^e1 * b2^e2) ^ n = c^n * b1^(e1 n) * b2^(e2 n)
+                n = _num(n)
+                return {tuple((key, _num(exp * n)) for key, exp in mono) : coeff ** n}
+            if coeff > 0 and not mono:
+                return {(): coeff ** n}
+            if coeff > 0 and len(mono) == 1 and mono[0][1] == 1:
+                # a lone base can be raised to any power
+                return {((mono[0][0], n),) : coeff ** n}
+        return {((self.factor_key(a), n),) : 1}
+
+    def build_base(self, key: Hashable) -> ArithmeticOpBase:
+        if key not in self.built:
+            value = self.bases[key]
+            self.built[key] = value if isinstance(value, ArithmeticOpBase) else self.build(value)
+        return self.built[key]
+
+    def build_factor(self, key: Hashable, exp: number) -> ArithmeticOpBase:
+        if key == _X_KEY:
+            return exp_n(_num(exp))
+        base = self.build_base(key)
+        return base if exp == 1 else f_raised_to_g(base, const(_num(exp)))
+
+    def build_product(self, mono: _Monomial, coeff: number) -> ArithmeticOpBase:
+        """Builds coeff times the product of the factors in mono."""
+        res: ArithmeticOpBase = const(_num(coeff))
+        for key, exp in mono:
+            factor = self.build_factor(key, exp)
+            res = factor if res == const(1) else res * factor
+        return res
+
+    def build_terms(self, terms: List[Tuple[_Monomial, number]]) -> ArithmeticOpBase:
+        """Builds a sum of terms, subtracting the ones with negative coefficients."""
+        positive = [i for i, (mono, coeff) in enumerate(terms) if coeff > 0]
+        if positive and positive[0] > 0:
+            # prefer n - x over (-x) + n
+            terms = [terms[positive[0]]] + terms[:positive[0]] + terms[positive[0] + 1:]
+        res: ArithmeticOpBase = const(0)
+        for i, (mono, coeff) in enumerate(terms):
+            if i > 0 and coeff < 0:
+                res = res - self.build_product(mono, -coeff)
+            else:
+                res = res + self.build_product(mono, coeff)
+        return res
+
+    def build(self, a: _Sum) -> ArithmeticOpBase:
+        """Turns the normal form back into an operator tree.
+
+        Terms are sorted by their bases and by decreasing powers, and terms with the
+        same negative powers are put over a common denominator.
+        """
+        order = lambda mono: [(self.ranks[key], -exp) for key, exp in mono]
+        groups: Dict[_Monomial, List[Tuple[_Monomial, number]]] = {}
+        for mono in sorted((mono for mono in a if mono), key = order):
+            num = tuple((key, exp) for key, exp in mono if exp > 0)
+            den = tuple((key, -exp) for key, exp in mono if exp < 0)
+            groups.setdefault(den, []).append((num, a[mono]))
+        if () in a:
+            groups.setdefault((), []).append(((), a[()]))
+
+        res: ArithmeticOpBase = const(0)
+        for i, (den, terms) in enumerate(sorted(groups.items(), key = lambda group: not group[0])):
+            if len(terms) > 1:
+                # the numerator may be one of the bases of the denominator
+                exps = dict(den)
+                key = frozenset(dict(terms).items())
+                if key in exps:
+                    exps[key] -= 1
+                    den = tuple((base, exp) for base, exp in exps.items() if exp != 0)
+                    terms = [((), 1)]
+            negate = i > 0 and len(terms) == 1 and terms[0][1] < 0
+            if negate:
+                terms = [(terms[0][0], -terms[0][1])]
+            part = self.build_terms(terms)
+            if den:
+                part = part / self.build_product(den, 1)
+            res = res - part if negate else res + part
+        return res
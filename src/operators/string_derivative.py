@@ -1,14 +1,25 @@
-from .parsing import parse_expr
+from .parsing import parse_expr, remove_whitespace
+from .parsing.parser import _input_var
+from .caching import _EXPRESSIONS
 
-def derivative(expr: str) -> str:
+def derivative(expr: str, var: str = 'x') -> str:
     """Finds the derivative of a string expression.
     
-    e.g. 3x + 4 or (x / 2) / (x^2), where ^ means exponent
+    e.g. 3x + 4 or (x / 2) / (x^2), where ^ means exponent. Results are
+    cached along with those of parse_expr.
 
     Args:
     :   expr (str) : a string representing an expression
+    :   var (str) : the variable to differentiate with respect to, if expr has
+            several. A lone variable is always the input x, whatever its name, so
+            either its name or x works
 
     Returns:
     :   f_prime (str) : a string representing the derivative of the expression
     """
-    return parse_expr(expr).derivative()
\ No newline at end of file
+    key = ('derivative', remove_whitespace(expr), var)
+    res = _EXPRESSIONS.get(key)
+    if res is None:
+        res = parse_expr(expr).derivative(_input_var(expr, var))
+        _EXPRESSIONS.put(key, res)
+    return res
\ No newline at end of file
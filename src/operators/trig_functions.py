@@ -1,15 +1,22 @@
 from __future__ import annotations
+import numpy as np
 from .arithmetic import const, exp_n
 from .base_arithmetic import ArithmeticOpBase, _single_arg
-from math import sin, cos, tan, asin, acos, atan
+from ..admath import sin, cos, tan, asin, acos, atan
 from ..utilities import number
 
 class sine (_single_arg):
     """Returns sin(x)."""
+    __slots__ = ()
+    _func_name: str = 'sin'
+
     def f(self, x: number) -> number:
         return sin(x)
+
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.sin(x)
     
-    def f_prime(self) -> ArithmeticOpBase:
+    def _f_prime(self) -> ArithmeticOpBase:
         return cosine()
 
     def __str__(self) -> str:
@@ -17,10 +24,16 @@ class sine (_single_arg):
 
 class cosine (_single_arg):
     """Returns cos(x)."""
+    __slots__ = ()
+    _func_name: str = 'cos'
+
     def f(self, x: number) -> number:
         return cos(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.cos(x)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(-1) * sine()
 
     def __str__(self) -> str:
@@ -28,10 +41,16 @@ class cosine (_single_arg):
 
 class tangent (_single_arg):
     """Returns tan(x)."""
+    __slots__ = ()
+    _func_name: str = 'tan'
+
     def f(self, x: number) -> number:
         return tan(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.tan(x)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return tangent() ** 2 + 1
 
     def __str__(self) -> str:
@@ -39,10 +58,16 @@ class tangent (_single_arg):
 
 class arcsine (_single_arg):
     """Returns sin^-1(x)."""
+    __slots__ = ()
+    _func_name: str = 'asin'
+
     def f(self, x: number) -> number:
         return asin(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.arcsin(x)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1) / (const(1) - exp_n(2)) ** 0.5
 
     def __str__(self) -> str:
@@ -50,10 +75,16 @@ class arcsine (_single_arg):
         
 class arccosine (_single_arg):
     """Returns cos^-1(x)."""
+    __slots__ = ()
+    _func_name: str = 'acos'
+
     def f(self, x: number) -> number:
         return acos(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.arccos(x)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(-1) / (const(1) - exp_n(2)) ** 0.5
 
     def __str__(self) -> str:
@@ -61,10 +92,16 @@ class arccosine (_single_arg):
 
 class arctangent (_single_arg):
     """Returns tan^-1(x)."""
+    __slots__ = ()
+    _func_name: str = 'atan'
+
     def f(self, x: number) -> number:
         return atan(x)
 
-    def f_prime(self) -> ArithmeticOpBase:
+    def f_array(self, x: np.ndarray) -> np.ndarray:
+        return np.arctan(x)
+
+    def _f_prime(self) -> ArithmeticOpBase:
         return const(1) / (const(1) + exp_n(2))
 
     def __str__(self) -> str:
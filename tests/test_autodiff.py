@@ -0,0 +1,55 @@
+from src import admath, Tape, RevValue, grad, jacobian, hessian_vector_product, part_derivative, close_enough
+import math
+import pytest
+
+def _func(a):
+    return a[0] ** 2 * a[1] + admath.sin(a[0] * a[1]) + 3 / a[1] + 2 ** a[0] - abs(a[1])
+
+def test_grad():
+    xs = [1.5, 0.7]
+    x, y = xs
+    expected = [2 * x * y + y * math.cos(x * y) + 2 ** x * math.log(2),
+                x * x + x * math.cos(x * y) - 3 / y ** 2 - 1]
+    assert all(math.isclose(a, b) for a, b in zip(grad(_func, xs), expected))
+    for i in range(len(xs)):
+        assert close_enough(grad(_func, xs)[i], part_derivative(_func, xs, i))
+
+    assert math.isclose(grad(lambda x: admath.log(x, 2) * admath.exp(x), 2.0),
+                        math.exp(2) / (2 * math.log(2)) + math.exp(2))
+    for f, df in [(admath.tan, lambda x: 1 / math.cos(x) ** 2), (admath.asin, lambda x: 1 / math.sqrt(1 - x * x)),
+                  (admath.acos, lambda x: -1 / math.sqrt(1 - x * x)), (admath.atan, lambda x: 1 / (1 + x * x)),
+                  (admath.sqrt, lambda x: 0.5 / math.sqrt(x)), (admath.cos, lambda x: -math.sin(x))]:
+        assert math.isclose(grad(f, 0.3), df(0.3))
+    assert grad(lambda a: sum(a), [1, 2, 3]) == [1, 1, 1]
+    assert grad(lambda a: 5, [1, 2]) == [0, 0]
+    assert grad(lambda a: a[0] * 2, [1, 2]) == [2, 0]
+    da, db = grad(lambda v: v[0] ** v[1], [-2.0, 2.0])
+    assert da == -4 and math.isnan(db)
+
+    with pytest.raises(TypeError):
+        grad(lambda x: math.sin(x), 1.0)
+
+def test_jacobian():
+    assert jacobian(lambda a: [a[0] * a[1], a[0] - a[1], 5], [2, 3]) == [[3, 2], [1, -1], [0, 0]]
+
+def test_hessian_vector_product():
+    xs = [1.5, 0.7]
+    x, y = xs
+    hxx = 2 * y - y * y * math.sin(x * y) + 2 ** x * math.log(2) ** 2
+    hxy = 2 * x + math.cos(x * y) - x * y * math.sin(x * y)
+    hyy = -x * x * math.sin(x * y) + 6 / y ** 3
+    for v, expected in [([1, 0], [hxx, hxy]), ([0, 1], [hxy, hyy]), ([2, -1], [2 * hxx - hxy, 2 * hxy - hyy])]:
+        hv = hessian_vector_product(_func, xs, v)
+        assert all(math.isclose(a, b) for a, b in zip(hv, expected)), (v, hv)
+    # the adjoint of x is x - 1, which is 0 at x = 1 but still has a derivative
+    assert hessian_vector_product(lambda a: (a[0] - 1) ** 2 / 2, [1.0], [1]) == [1]
+
+def test_tape():
+    tape = Tape()
+    x = tape.variable(3.0)
+    y = x * x + 1
+    assert isinstance(y, RevValue) and y.value == 10
+    assert y > 5 and y == 10
+    assert tape.backward(y)[x.index] == 6
+    with pytest.raises(ValueError):
+        Tape().backward(y)
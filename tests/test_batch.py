@@ -0,0 +1,30 @@
+from src import parse_many, derivative_many, derivative, parse_expr, BatchResult, chain, sine
+import pickle
+import sys
+
+_EXPRS = ['sin(x) + 2x', '(x', 'x^2 * y', '3 / x', 'foo(x)', 'ln(x) * x']
+
+def test_pickle_ops():
+    for expr in ['sin(x) + 2x * y - 3^x / ln(x)', 'x ^ ln(x)']:
+        func = parse_expr(expr)
+        for f in [func, func.f_prime(), func.f_prime().f_prime()]:
+            assert pickle.loads(pickle.dumps(f)) is f
+    deep = parse_expr('x')
+    for _ in range(sys.getrecursionlimit() * 2):
+        deep = chain(sine(), deep + 1)
+    assert pickle.loads(pickle.dumps(deep)) is deep
+
+def test_batch():
+    for workers in [1, 2]:
+        results = list(derivative_many(_EXPRS, workers = workers, chunksize = 2))
+        assert [r.expr for r in results] == _EXPRS
+        for r in results:
+            assert isinstance(r, BatchResult)
+            if r.expr in ['(x', 'foo(x)']:
+                assert r.value is None and r.error.startswith('SyntaxError')
+            else:
+                assert r.error is None and r.value == derivative(r.expr)
+
+    results = list(parse_many(iter(_EXPRS), workers = 2, chunksize = 4))
+    assert [r.value for r in results if r.error is None] == [parse_expr(e) for e in _EXPRS if e not in ['(x', 'foo(x)']]
+    assert [r.value for r in derivative_many(['x * y'], var = 'y')] == ['x']
@@ -0,0 +1,85 @@
+from src import parse_expr, identity, chain, sine, const, variable, to_program, run_program, Program, ArithmeticOpBase, Fraction
+import numpy as np
+import pickle
+import mmap
+from .test_parser import _similar_func
+
+def test_program():
+    domain = np.arange(0.1, 3, 0.2)
+    for expr in ['sin(3x) + x^2', '(x / 2) / x^2', 'x ^ ln(x)', '2^log3(x)', '-x + 5 - 3x', 'acos(x / 4) * 2']:
+        func = parse_expr(expr)
+        for f in [func, func.f_prime(), func.f_prime().f_prime()]:
+            program = to_program(f)
+            assert _similar_func(program, f, domain = domain), (expr, str(f))
+            assert np.allclose(run_program(program, domain), f.evaluate_array(domain))
+
+    assert np.array_equal(to_program(const(3))(np.zeros(4)), np.full(4, 3.0))
+
+def test_deep_program():
+    func = identity()
+    for i in range(5000):
+        func = chain(sine() + identity(), func)
+    program = to_program(func)
+    x = 0.3
+    for i in range(5000):
+        x = np.sin(x) + x
+    assert np.isclose(program(0.3), x)
+
+def test_program_bytes():
+    program = to_program(parse_expr('x ^ ln(x)').f_prime())
+    assert Program.from_bytes(program.to_bytes()) == program
+    assert pickle.loads(pickle.dumps(program)) == program
+    assert Program.from_bytes(program.to_bytes())(2.5) == program(2.5)
+
+def test_program_variables():
+    func = parse_expr('x * y - z^2')
+    program = to_program(func)
+    assert Program.from_bytes(program.to_bytes()) == program
+    assert program(2, y = 3, z = 1) == func(x = 2, y = 3, z = 1) == 5
+    assert np.allclose(program(np.array([1.0, 2.0]), y = 3, z = 1), [2, 5])
+    try:
+        program(2, y = 3)
+        assert False
+    except ValueError:
+        pass
+
+def test_tree_bytes(tmp_path):
+    funcs = []
+    for expr in ['sin(3x) + x^2 * y', 'x ^ ln(x)', '2^log3(x) / acos(x / 4)', '-x + 5 - 3x']:
+        func = parse_expr(expr)
+        funcs += [func, func.f_prime(), func.f_prime().f_prime()]
+    for func in funcs:
+        data = func.to_bytes()
+        assert ArithmeticOpBase.from_bytes(data) is func, str(func)
+        assert len(data) < len(pickle.dumps(func))
+
+    for n in [Fraction(1, 3), 10 ** 40, -10 ** 40, 2.5, -7]:
+        func = const(n) * identity() + variable('z')
+        res = ArithmeticOpBase.from_bytes(func.to_bytes())
+        assert str(res) == str(func)
+        assert res.first.n == n and type(res.first.n) is type(n)
+
+    deep = identity()
+    for _ in range(5000):
+        deep = chain(sine(), deep + 1)
+    assert ArithmeticOpBase.from_bytes(deep.to_bytes()) is deep
+
+    # several functions memory-mapped from one file
+    path = tmp_path / 'funcs.bin'
+    parts = [func.to_bytes() for func in funcs]
+    path.write_bytes(b''.join(parts))
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        pos = 0
+        for func, part in zip(funcs, parts):
+            assert ArithmeticOpBase.from_bytes(view[pos:pos + len(part)]) is func
+            pos += len(part)
+        view.release()
+
+    data = funcs[1].to_bytes()
+    for bad in [data[:-1], data + b'\0', b'MLOP' + data[4:], data[:3]]:
+        try:
+            ArithmeticOpBase.from_bytes(bad)
+            assert False, bad
+        except ValueError:
+            pass
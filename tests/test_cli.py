@@ -0,0 +1,32 @@
+from src.operators.cli import main
+from math import log
+from io import StringIO
+import json
+
+def test_cli(tmp_path):
+    path = tmp_path / 'exprs.txt'
+    path.write_text('sin(x) + 2x\n\n(x\nx^2 * y\n')
+
+    out, err = StringIO(), StringIO()
+    assert main([str(path)], out, err) == 1
+    assert out.getvalue().splitlines() == [
+        'cos(x) + 2', '', 'error: SyntaxError: Unmatched left parenthesis at column 1: (x', '2x * y'
+    ]
+    assert err.getvalue().startswith('3 expressions (1 errors)')
+
+    out = StringIO()
+    assert main([str(path), '--var', 'y', '--format', 'json', '--quiet', '--workers', '2'], out) == 1
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get('derivative') for r in records] == ['0', None, None, 'x^2']
+    assert records[1] == {'expr' : ''} and 'error' in records[2]
+
+    # a lone variable is the input, so it can be named by --var
+    path.write_text('3t^2\n')
+    out = StringIO()
+    assert main([str(path), '--var', 't', '--quiet'], out) == 0
+    assert out.getvalue() == '6x\n'
+
+    path.write_text('x^2\n\nln(x)\n')
+    out = StringIO()
+    assert main([str(path), '--order', '0', '--grid', '0', '2', '3', '--format', 'json', '--quiet'], out) == 0
+    assert [json.loads(line).get('values') for line in out.getvalue().splitlines()] == [[0, 1, 4], None, [None, 0, log(2)]]
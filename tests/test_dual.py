@@ -0,0 +1,48 @@
+from src import Dual, tangent_of, admath, parse_expr, diff_quo, get_root, to_program
+import numpy as np
+import math
+
+def test_dual_ops():
+    domain = np.arange(0.1, 0.95, 0.1)
+    for expr in ['sin(3x) + x^2', '(x / 2) / x^2', 'x ^ ln(x)', '2^log3(x)', '-x + 5 - 3x', 'acos(x / 4) * 2',
+                 'tan(x) / (x - 3)', 'asin(x) - atan(2x) * cos(x)', 'log2(x) + 3 / x']:
+        func = parse_expr(expr)
+        deriv = func.f_prime()
+        for x in domain:
+            y = func(Dual(x))
+            assert math.isclose(y.value, func(x)), (expr, x)
+            assert math.isclose(y.tangent, deriv(x)), (expr, x)
+            assert math.isclose(to_program(func)(Dual(x)).tangent, deriv(x)), (expr, x)
+            assert math.isclose(diff_quo(func, x, mode = 'forward'), deriv(x)), (expr, x)
+
+    second = Dual(Dual(2.0))
+    y = second ** 3
+    assert y.value.value == 8 and y.tangent.value == 12 and y.tangent.tangent == 12
+    zero = Dual(0.0, 1.0) ** 0
+    assert zero.value == 1 and zero.tangent == 0
+    # the part of the derivative from the exponent is nan for a negative base, like in grad
+    y = Dual(-2.0, np.array([1.0, 0.0])) ** Dual(2.0, np.array([0.0, 1.0]))
+    assert y.value == 4 and y.tangent[0] == -4 and math.isnan(y.tangent[1])
+    assert math.isnan(((-2.0) ** Dual(2.0)).tangent) and (-2.0) ** Dual(2.0, 0.0) == 4
+    assert tangent_of(5) == 0
+
+def test_dual_vector():
+    x, y = Dual.inputs([1.5, 0.7])
+    out = x ** 2 * y + admath.sin(x * y) + 3 / y + 2 ** x - abs(y)
+    a, b = 1.5, 0.7
+    expected = [2 * a * b + b * math.cos(a * b) + 2 ** a * math.log(2),
+                a * a + a * math.cos(a * b) - 3 / b ** 2 - 1]
+    assert np.allclose(out.tangent, expected)
+    assert np.allclose(Dual(2.0, [1, 2]).tangent * 3, [3, 6])
+    assert Dual(3.0) > 2 and Dual(3.0) == 3
+
+def test_forward_mode():
+    assert diff_quo(lambda n: 3 * n ** 2, 3, mode = 'forward') == 18
+    assert diff_quo(lambda n: 7, 3, mode = 'forward') == 0
+    assert math.fabs(get_root(lambda n: n ** 3 - 8, 3, mode = 'forward') - 2) < 1e-3
+    assert math.fabs(get_root(parse_expr('x^2 - 2'), 1, mode = 'forward') - math.sqrt(2)) < 1e-3
+    try:
+        diff_quo(lambda n: n, 1, mode = 'backward')
+        assert False
+    except ValueError:
+        pass
@@ -1,4 +1,12 @@
-from src import Fraction, close_enough, gcd, lcm, divide, frac_abs
+from src import Fraction, close_enough, gcd, lcm, divide, frac_abs, deferred_reduction, FractionArray, frac_sum, frac_dot, frac_mean, continued_fraction, convergents
+import fractions
+import operator
+import random
+import pickle
+import itertools
+import threading
+import math
+import numpy as np
 
 CHECK_STRS = False
 
@@ -144,4 +152,212 @@ def test_frac_abs():
     assert frac_abs(f) == f
     assert frac_abs(-f) == f
     assert frac_abs(Fraction(0, 2)) == 0
-    
\ No newline at end of file
+    
+def _as_std(n):
+    return fractions.Fraction(n._num, n._den) if isinstance(n, Fraction) else n
+
+def test_against_stdlib():
+    rng = random.Random(0)
+    ops = [operator.add, operator.sub, operator.mul, operator.truediv]
+    for deferred in [False, True]:
+        for _ in range(2000):
+            a, c = rng.randint(-30, 30), rng.randint(-30, 30)
+            b, d = rng.choice([-1, 1]) * rng.randint(1, 30), rng.choice([-1, 1]) * rng.randint(1, 30)
+            x, y = Fraction(a, b), Fraction(c, d)
+            op = rng.choice(ops)
+            for first, second in [(x, y), (x, c), (a, y)]:
+                if not isinstance(first, Fraction) and not isinstance(second, Fraction):
+                    continue
+                try:
+                    expected = op(_as_std(first), _as_std(second))
+                except ZeroDivisionError:
+                    continue
+                if deferred:
+                    with deferred_reduction():
+                        res = op(first, second)
+                else:
+                    res = op(first, second)
+                    # results are always in lowest terms, with whole numbers as ints
+                    assert isinstance(res, int) == (expected.denominator == 1)
+                assert _as_std(res) == expected
+                assert (res < 0) == (expected < 0)
+                if expected.denominator == 1:
+                    assert res == expected.numerator
+
+def test_deferred_reduction():
+    with deferred_reduction():
+        total = 0
+        for k in range(1, 20):
+            total = total + Fraction(1, k)
+        half = Fraction(1, 4) + Fraction(1, 4)
+        whole = half + half
+    assert isinstance(whole, Fraction)
+    assert whole == 1
+    assert whole.reduced() == 1 and isinstance(whole.reduced(), int)
+    assert half == Fraction(1, 2)
+    # reducing makes new ints rather than changing the fraction
+    assert repr(half) == 'Fraction(1, 2)' and hash(half) == hash(0.5) and (half._num, half._den) == (2, 4)
+    assert half.reduced() is not half and half.reduced()._den == 2
+    assert _as_std(total.reduced()) == sum(fractions.Fraction(1, k) for k in range(1, 20))
+    assert total.reduced()._den == sum(fractions.Fraction(1, k) for k in range(1, 20)).denominator
+    assert isinstance(Fraction(1, 2) + Fraction(1, 2), int)
+    assert Fraction(-2, 3).reciprocal() == Fraction(-3, 2)
+    assert Fraction(2, 3) ** -2 == Fraction(9, 4)
+
+    # other threads keep reducing while one is inside the block
+    results = []
+    other = threading.Thread(target = lambda: results.extend([Fraction(1, 2) + Fraction(1, 2), Fraction(1, 4) * 2]))
+    with deferred_reduction():
+        other.start()
+        other.join()
+        assert isinstance(Fraction(1, 2) + Fraction(1, 2), Fraction)
+    assert isinstance(results[0], int) and results[1]._den == 2
+
+    nan, inf = float('nan'), float('inf')
+    for op in [operator.lt, operator.le, operator.gt, operator.ge, operator.eq]:
+        assert not op(Fraction(1, 2), nan), op
+    assert Fraction(1, 2) < inf and Fraction(1, 2) <= inf and Fraction(1, 2) > -inf and Fraction(1, 2) >= -inf
+    assert not Fraction(1, 2) > inf and not Fraction(1, 2) >= inf and Fraction(1, 2) != inf
+
+def _array_as_std(arr):
+    return [fractions.Fraction(int(n), int(d)) for n, d in zip(arr.numerators, arr.denominators)]
+
+def test_fraction_array():
+    rng = random.Random(0)
+    for limit in [1000, 10 ** 25]:
+        nums = [[rng.randint(-limit, limit) for _ in range(200)] for _ in range(2)]
+        dens = [[rng.choice([-1, 1]) * rng.randint(1, limit) for _ in range(200)] for _ in range(2)]
+        x, y = FractionArray(nums[0], dens[0]), FractionArray(nums[1], dens[1])
+        sx = [fractions.Fraction(n, d) for n, d in zip(nums[0], dens[0])]
+        sy = [fractions.Fraction(n, d) for n, d in zip(nums[1], dens[1])]
+        assert x.numerators.dtype == (np.int64 if limit < 2 ** 62 else object)
+        assert _array_as_std(x) == sx
+        assert _array_as_std(x + y) == [a + b for a, b in zip(sx, sy)]
+        assert _array_as_std(x - y) == [a - b for a, b in zip(sx, sy)]
+        assert _array_as_std(x * y) == [a * b for a, b in zip(sx, sy)]
+        assert _array_as_std(x / y) == [a / b for a, b in zip(sx, sy)]
+        assert list(x < y) == [a < b for a, b in zip(sx, sy)]
+        assert list(x == y) == [a == b for a, b in zip(sx, sy)]
+        assert np.allclose(x.to_float(), [float(a) for a in sx])
+        total = x.sum()
+        assert _as_std(total) == sum(sx)
+
+    # int64 results that would overflow switch to Python ints, and back once they fit
+    big = FractionArray([2 ** 40, 3], [3, 2 ** 40])
+    assert (big * big).numerators.dtype == object
+    assert (big * big / big).numerators.dtype == np.int64
+    assert _array_as_std(big * big / big) == _array_as_std(big)
+
+    x = FractionArray([1, 2, 3], 4)
+    assert x[1] == Fraction(1, 2) and x[3 // 2 + 1] == Fraction(3, 4)
+    assert x.tolist() == [Fraction(1, 4), Fraction(1, 2), Fraction(3, 4)]
+    assert (x + x).tolist() == [Fraction(1, 2), 1, Fraction(3, 2)]
+    assert (1 - x).tolist() == [Fraction(3, 4), Fraction(1, 2), Fraction(1, 4)]
+    assert (Fraction(1, 3) + x).tolist() == [Fraction(7, 12), Fraction(5, 6), Fraction(13, 12)]
+    assert (np.array([1, 2, 3]) * x).tolist() == [Fraction(1, 4), 1, Fraction(9, 4)]
+    assert np.allclose(x + 0.5, [0.75, 1, 1.25])
+    assert x.sum() == Fraction(3, 2)
+    assert FractionArray([], []).sum() == 0
+    assert list(x >= Fraction(1, 2)) == [False, True, True]
+    assert list(Fraction(1, 2) < x) == [False, False, True] and list(Fraction(1, 2) <= x) == [False, True, True]
+    # floats are compared exactly, like with Fraction
+    assert not (FractionArray([1], [3]) == 1 / 3).any() and (FractionArray([1], [3]) > 1 / 3).all()
+    inf, nan = float('inf'), float('nan')
+    assert list(x < np.array([0.25, nan, inf])) == [False, False, True]
+    assert list(x >= np.array([0.25, nan, -inf])) == [True, False, True]
+    for bad in [lambda: FractionArray([1], [0]), lambda: x / FractionArray([0, 1, 1])]:
+        try:
+            bad()
+            assert False
+        except ZeroDivisionError:
+            pass
+
+def test_fraction_hash():
+    rng = random.Random(0)
+    for _ in range(2000):
+        num, den = rng.randint(-10 ** 20, 10 ** 20), rng.randint(1, 10 ** 20)
+        frac, std = Fraction(num, den), fractions.Fraction(num, den)
+        assert hash(frac) == hash(std)
+        assert frac == std and std == frac
+    for x in [0.5, 0.1, -2.75, 2.0 ** -60, 3.0]:
+        frac = Fraction(*x.as_integer_ratio())
+        assert frac == x and hash(frac) == hash(x)
+    # floats are compared exactly, since equal numbers need equal hashes
+    assert Fraction(1, 3) != 1 / 3
+    assert Fraction(1, 3) > 1 / 3
+
+    assert len({Fraction(1, 2), Fraction(2, 4), 0.5, fractions.Fraction(1, 2)}) == 1
+    assert {Fraction(3, 4) : 'a'}[fractions.Fraction(3, 4)] == 'a'
+    assert 'a' not in {Fraction(1, 2)}
+    with deferred_reduction():
+        whole = Fraction(1, 4) + Fraction(3, 4)
+    assert hash(whole) == hash(1) and {1 : 'a'}[whole] == 'a'
+
+    frac = Fraction(-2, 7)
+    assert not hasattr(frac, '__dict__')
+    assert frac.numerator == -2 and frac.denominator == 7
+    assert pickle.loads(pickle.dumps(frac)) == frac
+    assert repr(frac) == 'Fraction(-2, 7)'
+
+def test_frac_sum():
+    rng = random.Random(0)
+    values = [Fraction(rng.randint(-100, 100), rng.choice([2, 3, 4, 6, 7, 12])) for _ in range(2000)]
+    values += [rng.randint(-5, 5) for _ in range(100)]
+    rng.shuffle(values)
+    std = [_as_std(v) for v in values]
+    assert _as_std(frac_sum(values)) == sum(std)
+    assert _as_std(frac_sum(v for v in values)) == sum(std)
+    assert _as_std(frac_sum(Fraction(1, k) for k in range(1, 300))) == sum(fractions.Fraction(1, k) for k in range(1, 300))
+    assert _as_std(frac_dot(values, reversed(values))) == sum(a * b for a, b in zip(std, reversed(std)))
+    assert _as_std(frac_mean(values)) == sum(std) / len(std)
+    assert frac_sum([]) == 0 and frac_sum([Fraction(1, 2), Fraction(1, 2)]) == 1
+    assert isinstance(frac_sum([Fraction(1, 3)] * 3), int)
+    assert frac_sum(FractionArray([1, 2, 3], 4)) == Fraction(3, 2)
+    assert frac_mean([1, 2]) == Fraction(3, 2)
+    assert frac_sum([1, fractions.Fraction(1, 2)]) == Fraction(3, 2)
+
+    # floats are added exactly, then rounded once
+    assert frac_sum([0.1] * 10) == 1.0
+    assert frac_sum([1, Fraction(1, 2), 0.25]) == 1.75
+    assert frac_sum([float('inf'), Fraction(1, 2)]) == float('inf')
+    assert frac_dot([0.5, 2], [Fraction(1, 2), 3]) == 6.25
+    assert frac_dot([float('inf')], [-1]) == float('-inf') and frac_dot([-1, 2], [float('inf'), 1]) == float('-inf')
+    # exact totals too big for a float round to an infinity
+    assert frac_sum([1e308, 1e308]) == float('inf') and frac_sum([-1e308, -1e308]) == float('-inf')
+    assert frac_dot([1e200], [1e200]) == float('inf') and frac_mean([1e308, 1e308]) == 1e308
+
+    for bad in [lambda: frac_mean([]), lambda: frac_dot([1, 2], [1])]:
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+def test_rational_approximation():
+    rng = random.Random(0)
+    for _ in range(2000):
+        x, max_den = rng.uniform(-100, 100), rng.randint(1, 10 ** rng.randint(1, 8))
+        assert Fraction.from_float(x, max_den) == fractions.Fraction(x).limit_denominator(max_den)
+        num, den = rng.randint(-10 ** 12, 10 ** 12), rng.randint(2, 10 ** 12)
+        frac = Fraction(num, den)
+        if isinstance(frac, Fraction):
+            assert frac.limit_denominator(1000) == fractions.Fraction(num, den).limit_denominator(1000)
+    assert Fraction.from_float(math.pi, 1000) == Fraction(355, 113)
+    assert Fraction.from_float(0.1, 100) == Fraction(1, 10)
+    assert Fraction.from_float(0.1) == 0.1 and Fraction.from_float(0.1).denominator == 2 ** 55
+    assert Fraction.from_float(2.0) == 2 and isinstance(Fraction.from_float(2.0), int)
+    assert Fraction.from_float(0.333, 1) == 0
+    for bad in [lambda: Fraction.from_float(float('nan')), lambda: Fraction.from_float(0.5, 0)]:
+        try:
+            bad()
+            assert False
+        except ValueError:
+            pass
+
+    assert list(continued_fraction(Fraction(415, 93))) == [4, 2, 6, 7]
+    assert list(continued_fraction(-Fraction(7, 3))) == [-3, 1, 2]
+    assert list(continued_fraction(5)) == [5]
+    assert list(convergents(Fraction(415, 93))) == [4, Fraction(9, 2), Fraction(58, 13), Fraction(415, 93)]
+    assert list(itertools.islice(convergents(math.pi), 4)) == [3, Fraction(22, 7), Fraction(333, 106), Fraction(355, 113)]
+    sqrt2 = list(itertools.islice(convergents(itertools.chain([1], itertools.repeat(2))), 6))
+    assert sqrt2 == [1, Fraction(3, 2), Fraction(7, 5), Fraction(17, 12), Fraction(41, 29), Fraction(99, 70)]
@@ -1,9 +1,12 @@
 from src import add_n, sub_n, mult_n, div_n, n_div, n_sub, floordiv_n, n_floordiv, exp_n, n_exp, chain
 from src import sine, cosine, tangent, arctangent, arccosine, arcsine, identity, log_of_n, log_base_n
 from src import lt_n, le_n, gt_n, ge_n, get_n, set_n_to_val, derivative, parse_expr, invert
-from src import f_plus_g, f_minus_g, f_times_g, f_divided_by_g, mx_plus_b, const, f_raised_to_g
+from src import f_plus_g, f_minus_g, f_times_g, f_divided_by_g, mx_plus_b, const, f_raised_to_g, TwoFunctionsBase
 from math import log, sin, cos, tan, asin, acos, atan, sqrt
 import numpy as np
+from src import clear_derivative_cache, set_derivative_cache_size, derivative_cache_info, simplify
+from src import tree_metrics, count_rules, disp_operator, variable
+from src import clear_expression_cache, set_expression_cache_size, expression_cache_info
 from .test_parser import _similar_func
 
 _ITERS = 10
@@ -353,6 +356,259 @@ def test_arithmetic_simplify():
     assert isinstance(f_times_g(mult_n(5), n_div(10)), const)
     assert isinstance(f_divided_by_g(mult_n(5), identity()), const)
 
+def test_evaluate_array():
+    domain = np.arange(-0.95, 3, 0.1)
+    funcs = [const(3), identity(), add_n(2), sub_n(2), n_sub(2), mult_n(3), div_n(4), n_div(4),
+             floordiv_n(2), n_floordiv(2), exp_n(3), n_exp(2), log_base_n(2), log_of_n(3),
+             sine(), cosine(), tangent(), arcsine(), arccosine(), arctangent(),
+             chain(sine(), mult_n(2)), add_n(5) ** mult_n(3), parse_expr('(x / 2) / x^2 + ln(x)')]
+    for func in funcs:
+        for f in [func, func.f_prime()]:
+            with np.errstate(all = 'ignore'):
+                res = f.evaluate_array(domain)
+            assert res.shape == domain.shape
+            for x, y in zip(domain.tolist(), res.tolist()):
+                try:
+                    expected = f(x)
+                except (ValueError, ZeroDivisionError):
+                    continue
+                if isinstance(expected, complex):
+                    continue
+                assert np.isclose(y, expected), (str(f), x)
+
+    grid = np.linspace(1, 2, 12).reshape(3, 4)
+    assert parse_expr('3x^2 + 1').evaluate_array(grid).shape == (3, 4)
+    assert np.allclose(parse_expr('sin(x) + x').evaluate_array([0, 1]), [0, sin(1) + 1])
+
+def test_compile():
+    domain = np.arange(0.1, 3, 0.2)
+    for expr in ['sin(3x) + x^2', '(x / 2) / x^2', 'x ^ ln(x)', '2^log3(x)', '-x + 5 - 3x', 'acos(x / 4) * 2']:
+        func = parse_expr(expr)
+        for f in [func, func.f_prime(), func.f_prime().f_prime()]:
+            compiled = f.compile()
+            assert compiled is f.compile()
+            assert _similar_func(compiled, f, domain = domain), (expr, str(f))
+
+    assert chain(sine() + cosine(), mult_n(-2)).compile()(1.0) == sin(-2.0) + cos(-2.0)
+    assert n_exp(-2).compile()(2) == 4
+    assert _similar_func(n_floordiv(3).compile(), lambda x: 3 // x)
+
+def test_interning():
+    assert const(0) is const(0)
+    assert const(1) is not const(1.0)
+    assert identity() is identity()
+    assert exp_n(2) is exp_n(2)
+    assert sine() is sine()
+    assert parse_expr('sin(x) * x + 2^log3(x)') is parse_expr('sin(x) * x + 2^log3(x)')
+    assert identity() + sine() is sine() + identity()
+    assert f_times_g(sine(), cosine()) == f_times_g(sine(), cosine())
+    assert f_times_g(sine(), cosine()) != f_times_g(cosine(), sine())
+    assert hash(add_n(5) ** mult_n(3)) == hash(add_n(5) ** mult_n(3))
+    assert add_n(5) != sub_n(5)
+    assert const(2) != 2
+
+    def count(op, seen):
+        """Counts the nodes in op, counting each shared node once if seen is a set."""
+        if seen is not None:
+            if id(op) in seen:
+                return 0
+            seen.add(id(op))
+        children = [op.first, op.second] if isinstance(op, TwoFunctionsBase) else []
+        return 1 + sum(count(child, seen) for child in children)
+
+    # raw derivatives, since simplified ones have little left to share
+    func = parse_expr('(x / 2) / x^2')
+    for i in range(4):
+        func = func._f_prime()
+    assert count(func, set()) < count(func, None)
+
+def test_derivative_cache():
+    clear_derivative_cache()
+    func = parse_expr('sin(x) * x^3 + 2^log3(x)')
+    first = func.f_prime()
+    assert func.f_prime() is first
+    assert derivative_cache_info().hits >= 1
+    third = func.nth_derivative(3)
+    assert third is first.f_prime().f_prime()
+    assert func.nth_derivative(0) is func
+    assert _similar_func(func.nth_derivative(2), first.f_prime())
+
+    set_derivative_cache_size(5)
+    func.nth_derivative(4)
+    assert derivative_cache_info().currsize <= 5
+    set_derivative_cache_size(0)
+    assert derivative_cache_info().currsize == 0
+    assert _similar_func(func.f_prime(), first)
+    set_derivative_cache_size(10000)
+    clear_derivative_cache()
+    assert derivative_cache_info() == (0, 0, 10000, 0)
+
+def test_expression_cache():
+    clear_expression_cache()
+    func = parse_expr('sin(x) * x^2')
+    assert parse_expr('sin( x )*x ^ 2') is func
+    assert expression_cache_info().hits == 1
+    deriv = derivative('sin(x) * x^2')
+    assert derivative(' sin(x)*x^2') == deriv == func.derivative()
+    assert expression_cache_info().currsize == 2
+
+    set_expression_cache_size(1)
+    parse_expr('x + 1')
+    assert expression_cache_info().currsize == 1
+    set_expression_cache_size(0)
+    assert parse_expr('x + 1')(2) == 3
+    assert expression_cache_info().currsize == 0
+    set_expression_cache_size(4096)
+    clear_expression_cache()
+    assert expression_cache_info() == (0, 0, 4096, 0)
+
+def test_evaluate_dag():
+    domain = np.arange(0.1, 3, 0.2)
+    for expr in ['(x^2 + 1) / (sin(x) + 2)', 'x ^ ln(x)', '(x / 2) / x^2', '2^log3(x)', 'acos(x / 4) * 2']:
+        func = parse_expr(expr)
+        for order in range(4):
+            f = func.nth_derivative(order)
+            assert _similar_func(f.evaluate_dag, f, domain = domain), (expr, order)
+            assert np.allclose(f.evaluate_dag(domain), f.evaluate_array(domain))
+
+    shared = f_divided_by_g(sine(), cosine()).nth_derivative(2)
+    shared.evaluate_dag(1.0)
+    assert len(shared._dag_plan) < 20
+    assert np.array_equal(const(2).evaluate_dag(np.zeros(3)), np.full(3, 2.0))
+
+def test_simplify_engine():
+    x = parse_expr('x')
+    assert simplify(x / (x + 1) + const(1) / (x + 1)) == const(1)
+    assert simplify(x * x * 3 + x ** 2) == const(4) * exp_n(2)
+    assert simplify((x + 1) * (x + 1)) == (x + 1) ** 2
+    assert simplify(x - x) == const(0)
+    assert str(simplify(parse_expr('5 - x'))) == '5 - x'
+    # products of sums stay factored, whatever order they are multiplied in
+    for expr in ['(x + 1) * (x + 2) * (x + 3)', '(x + 3) * ((x + 1) * (x + 2))']:
+        assert str(simplify(parse_expr(expr))) == '(x + 1) * (x + 2) * (x + 3)'
+    assert str(simplify(parse_expr('(x + 1) * (x + 2) * (x + 3) / (x + 2)'))) == '(x + 1) * (x + 3)'
+    assert str(simplify(parse_expr('(x + 1) * (x + 2) / (x + 1)'))) == 'x + 2'
+    assert str(simplify(parse_expr('2x * (x + 1)'))) == '2(x^2) + 2x'
+    for bad in [lambda: simplify(const(1) / (sine() - sine())), lambda: simplify(x / (x * 2 - x - x)),
+                lambda: (x - x) ** const(-2)]:
+        try:
+            bad()
+            assert False
+        except ZeroDivisionError:
+            pass
+
+    domain = np.arange(0.1, 3, 0.2)
+    for expr in ['(x^2 + 1) / (sin(x) + 2)', 'x ^ ln(x)', '(x / 2) / x^2', '2^log3(x)', 'sin(x^2) * x^3']:
+        func = parse_expr(expr)
+        raw = func
+        for order in range(3):
+            raw = raw._f_prime()
+            func = func.f_prime()
+            assert _similar_func(func, raw, domain = domain), (expr, order)
+            assert _similar_func(simplify(raw), raw, domain = domain), (expr, order)
+    assert str(parse_expr('(x / 2) / x^2').nth_derivative(3)) == '-3 / x^4'
+
+def test_metrics():
+    func = f_plus_g(f_times_g(sine(), identity()), sine())
+    metrics = tree_metrics(func)
+    assert metrics.nodes == 5
+    assert metrics.depth == 3
+    assert metrics.distinct == 4
+    assert metrics.types == {'f_plus_g' : 1, 'f_times_g' : 1, 'sine' : 2, 'identity' : 1}
+    assert tree_metrics(const(2)) == (1, 1, 1, {'const' : 1})
+
+    raw = parse_expr('(x / 2) / x^2')
+    for i in range(6):
+        raw = raw._f_prime()
+    metrics = tree_metrics(raw)
+    assert metrics.distinct < metrics.nodes
+    assert sum(metrics.types.values()) == metrics.nodes
+
+    with count_rules() as counts:
+        sine() * 1
+        f_plus_g(sine(), const(0))
+        with count_rules() as inner:
+            const(2) + const(3)
+    assert counts == {'ArithmeticOpBase._simple_mul' : 1, 'ArithmeticOpBase._simple_add' : 1, 'const._simple_add' : 1}
+    assert inner == {'const._simple_add' : 1}
+    mult_n(3) * 1
+    assert sum(counts.values()) == 3
+
+def test_deep_trees():
+    import sys
+    depth = sys.getrecursionlimit() * 3
+    func = identity()
+    for i in range(depth):
+        func = f_plus_g(func, chain(sine(), mult_n(i + 2)))
+    assert np.isclose(func(0.5), 0.5 + sum(sin((i + 2) * 0.5) for i in range(depth)))
+    assert np.allclose(func.evaluate_array([0.5]), [func(0.5)])
+    assert str(func).startswith('sin(2x) + x + sin(3x)')
+    assert func == f_plus_g(func.first, func.second)
+    assert 'chain' in disp_operator(func)
+    deriv = func.f_prime()
+    assert np.isclose(deriv(0.5), 1 + sum((i + 2) * cos((i + 2) * 0.5) for i in range(depth)))
+    assert tree_metrics(deriv).depth > depth
+
+    nested = identity()
+    for i in range(depth):
+        nested = chain(sine(), nested)
+    assert str(nested) == 'sin(' * depth + 'x' + ')' * depth
+    value = 0.3
+    for i in range(depth):
+        value = sin(value)
+    assert np.isclose(nested(0.3), value)
+
+def test_render():
+    assert str(chain(exp_n(2), add_n(1))) == '(x + 1)^2'
+    assert str(chain(add_n(1), sine()) * identity()) == '(sin(x) + 1) * x'
+    assert str(chain(mult_n(5), n_exp(2))) == '5(2^x)'
+    assert str(chain(n_sub(3), f_minus_g(sine(), cosine()))) == '3 - (sin(x) - cos(x))'
+    assert str(f_minus_g(sine(), f_minus_g(cosine(), identity()))) == 'sin(x) - (cos(x) - x)'
+    assert str(chain(sine(), f_plus_g(exp_n(2), identity()))) == 'sin(x^2 + x)'
+    assert str(chain(add_n(1), mult_n(3))) == '3x + 1'
+    for func in [chain(exp_n(2), add_n(1)), chain(n_sub(3), f_minus_g(sine(), cosine())),
+                 f_divided_by_g(sine(), f_divided_by_g(cosine(), exp_n(2)))]:
+        assert _similar_func(parse_expr(str(func)), func), str(func)
+
+def test_multivariate():
+    f = parse_expr('x * y + sin(y)')
+    assert f.variables() == {'x', 'y'}
+    assert np.isclose(f(x = 2, y = 3), 6 + sin(3))
+    assert np.isclose(f({'x' : 2, 'y' : 3}), 6 + sin(3))
+    assert np.isclose(f.compile()(x = 2, y = 3), 6 + sin(3))
+    assert np.allclose(f.evaluate_array(x = [1, 2], y = [3, 4]), [3 + sin(3), 8 + sin(4)])
+    grad = f.gradient()
+    assert set(grad) == {'x', 'y'}
+    assert np.isclose(grad['x'](x = 2, y = 3), 3)
+    assert np.isclose(grad['y'](x = 2, y = 3), 2 + cos(3))
+    assert derivative('x * y + sin(y)', 'y') == str(grad['y'])
+
+    # y inside a chain counts as well as the x that is replaced
+    g = chain(sine() * variable('y'), mult_n(2) * variable('y'))
+    assert np.isclose(g.f_prime('y')(x = 1.5, y = 0.7), 3 * 0.7 * cos(2.1) + sin(2.1))
+    assert g.f_prime('z') == const(0)
+    assert variable('x') is identity()
+    # a lone variable is the input, whatever its name
+    assert parse_expr('t^2')(3) == 9 and parse_expr('3t^2')(2) == 12
+    assert parse_expr('sin(t)', via_tokens = True)(0) == 0
+    assert derivative('3t^2') == '6x' and derivative('sin(t)') == 'cos(x)'
+    assert derivative('y^2', 'y') == '2x' and parse_expr('y^2').variables() == {'x'}
+    # e is Euler's number
+    assert np.isclose(parse_expr('e^x')(1), np.e) and parse_expr('e^x').f_prime() == parse_expr('e^x')
+    assert parse_expr('e * y * x').variables() == {'x', 'y'}
+    # sin(x) * y at x = 2 can't become a number, since y isn't known yet
+    assert np.isclose(chain(sine() * variable('y'), const(2))(y = 3), 3 * sin(2))
+
+    h = parse_expr('y * z')
+    assert h.variables() == {'y', 'z'}
+    assert h(y = 2, z = 5) == 10
+    for call in [lambda: h(y = 2), lambda: f(2)]:
+        try:
+            call()
+            assert False
+        except ValueError:
+            pass
+
 def test_strs():
     if _TEST_STRS:
         print('\n')
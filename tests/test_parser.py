@@ -1,4 +1,4 @@
-from src import parse_expr, shunting_yard, find_tokens
+from src import parse_expr, shunting_yard, find_tokens, tokenize, Lexeme, token_tree, Plus, Times, Var, Num, Sin
 import numpy as np
 from math import log, sin, cos, tan, asin, acos, atan, e
 
@@ -53,6 +53,34 @@ def test_tokens():
     assert list(find_tokens('(x + 2) - (2x)')) == ['(', 'x', '+', '2', ')', '-', '(', '2', '*', 'x', ')']
     assert list(find_tokens('ln(x)')) == [str(e), 'log', '(', 'x', ')']
 
+def test_tokenize():
+    assert tokenize('2x - sin(x)') == [
+        Lexeme('num', '2', 0), Lexeme('op', '*', 1), Lexeme('var', 'x', 1), Lexeme('op', '-', 2),
+        Lexeme('func', 'sin', 3), Lexeme('lparen', '(', 6), Lexeme('var', 'x', 7), Lexeme('rparen', ')', 8)
+    ]
+    assert [tok.kind for tok in tokenize('-log2(x)')] == ['num', 'op', 'num', 'func', 'lparen', 'var', 'rparen']
+    # functions applied to parenthesis or other functions inside log
+    assert list(find_tokens('ln((x))')) == [str(e), 'log', '(', '(', 'x', ')', ')']
+    assert shunting_yard('log3(sin(x))') == ['3', 'x', 'sin', 'log']
+    assert list(find_tokens(' 2x')) == ['2', '*', 'x']
+
+    errors = {'x + * 2' : 5, '(x + 1' : 1, 'x + 1)' : 6, 'sin 2' : 1, '2 + 1.2.3' : 5, 'foo(x)' : 1, 'log(x)' : 1}
+    for expr, column in errors.items():
+        try:
+            shunting_yard(expr)
+            assert False, expr
+        except SyntaxError as err:
+            assert err.offset == column, (expr, err.offset)
+            assert f'column {column}' in str(err)
+
+def test_direct_parse():
+    exprs = ['2x + 1', '-x^2 / (3 - x)', 'sin(x)cos(x)', '5 + log2(2x + 2)', 'x ^ ln(x)', 'x * y - z', 'acos(x / 4) * 2']
+    for expr in exprs:
+        assert parse_expr(expr) is parse_expr(expr, via_tokens = True), expr
+    assert token_tree('2x + sin(x)') == Plus(Times(Num(2.0), Var('x')), Sin(Var('x')))
+    deep = '(' * 5000 + 'x' + ' + 1)' * 5000
+    assert parse_expr(deep)(1) == 5001
+
 def test_parser():
     assert _similar_func(lambda x: x + 1, lambda x: x + 1)
     assert _similar_func(lambda x: 1 / x, lambda x: 1 / x)